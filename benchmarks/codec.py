@@ -0,0 +1,55 @@
+"""
+Encode and decode time of JSON codecs over response fixtures in testdata/
+
+python -m benchmarks.codec
+"""
+import glob
+import os
+import time
+
+from getresponse.codec import CODECS, JSONCodec
+
+ROUNDS = 2000
+TESTDATA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'testdata')
+
+
+def load_fixtures():
+    """
+    :return: list of (raw bytes, decoded object) of every JSON fixture
+    """
+    fixtures = []
+    for path in sorted(glob.glob(os.path.join(TESTDATA, '*', '*.json'))):
+        with open(path, 'rb') as f:
+            raw = f.read()
+        try:
+            fixtures.append((raw, JSONCodec().loads(raw)))
+        except ValueError:
+            continue
+    return fixtures
+
+
+def bench(name, fixtures, call):
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        for fixture in fixtures:
+            call(fixture)
+    elapsed = time.perf_counter() - start
+    size = sum(len(raw) for raw, _ in fixtures) * ROUNDS
+    print('{:<16} {:>8.1f} MB/s'.format(name, size / elapsed / 2 ** 20))
+
+
+def main():
+    fixtures = load_fixtures()
+    print('{} fixtures, {} bytes, {} rounds'.format(len(fixtures), sum(len(raw) for raw, _ in fixtures), ROUNDS))
+    for name, codec_class in CODECS.items():
+        try:
+            codec = codec_class()
+        except RuntimeError:
+            print('{:<16} not installed'.format(name))
+            continue
+        bench(name + ' loads', fixtures, lambda fixture: codec.loads(fixture[0]))
+        bench(name + ' dumps', fixtures, lambda fixture: codec.dumps(fixture[1]))
+
+
+if __name__ == '__main__':
+    main()
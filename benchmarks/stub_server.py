@@ -0,0 +1,44 @@
+"""Local stub of GetResponse API used by benchmarks"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """
+    Answers every request with small JSON body and keeps connection alive
+    """
+    protocol_version = 'HTTP/1.1'
+    wbufsize = -1  # send headers and body in one segment, avoids delayed ACK stalls on keep-alive
+    disable_nagle_algorithm = True
+    body = json.dumps([{'campaignId': 'O', 'name': 'stub'}]).encode()
+
+    def _reply(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            self.rfile.read(length)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    do_GET = _reply
+    do_POST = _reply
+    do_DELETE = _reply
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server(handler=StubHandler):
+    """
+    Start stub server in background thread
+    :param handler: Request handler class
+    :return: (server, endpoint) endpoint can be passed as api_endpoint to clients
+    """
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, 'http://127.0.0.1:{}/v3'.format(server.server_port)
@@ -0,0 +1,36 @@
+"""
+Requests per second of per-call requests.get versus pooled GetresponseClient session
+
+python -m benchmarks.transport
+"""
+import time
+
+import requests
+
+from benchmarks.stub_server import start_stub_server
+from getresponse.getresponsev3 import GetresponseClient
+
+CALLS = 2000
+
+
+def bench(name, call):
+    start = time.perf_counter()
+    for _ in range(CALLS):
+        call()
+    elapsed = time.perf_counter() - start
+    print('{:<24} {:>8.0f} req/s'.format(name, CALLS / elapsed))
+
+
+def main():
+    server, endpoint = start_stub_server()
+    client = GetresponseClient(api_endpoint=endpoint, api_key='key')
+    try:
+        bench('requests.get per call', lambda: requests.get(endpoint + '/campaigns', headers=client.HEADERS).json())
+        bench('pooled session', lambda: client.get('/campaigns'))
+    finally:
+        client.close()
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
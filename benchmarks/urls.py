@@ -0,0 +1,51 @@
+"""
+Cost of building urls of list methods, string concatenation used before getresponse.urls against build_url
+
+python -m benchmarks.urls
+"""
+import time
+
+from getresponse.getresponsev3 import Contacts
+from getresponse.urls import build_url
+
+ROUNDS = 200000
+QUERY = ['email=@gmail.com', 'createdOn][from]=2017-03-10', 'campaignId=O']
+SORT = ['createdOn=desc']
+
+
+def concatenated_url(query: list = None, sort: list = None, **kwargs):
+    url = str('/contacts?')
+    if query:
+        for item in query:
+            query_data = str(item).split('=')
+            url = url + 'query[' + query_data[0] + ']=' + query_data[1] + '&'
+    if sort:
+        for item in sort:
+            sort_data = str(item).split('=')
+            url = url + 'sort[' + sort_data[0] + ']=' + sort_data[1] + '&'
+    if kwargs:
+        for key, value in kwargs.items():
+            url = url + str(key) + '=' + str(value) + '&'
+    url = url[:-1]  # get rid of last &
+    return url
+
+
+def bench(name, call):
+    start = time.perf_counter()
+    for page in range(ROUNDS):
+        call(page % 50 + 1)
+    elapsed = time.perf_counter() - start
+    print('{:<24} {:>8.2f} us/url'.format(name, elapsed / ROUNDS * 1e6))
+
+
+def main():
+    print('{} urls of pages 1-50 with {} filters and {} sort'.format(ROUNDS, len(QUERY), len(SORT)))
+    bench('concatenation', lambda page: concatenated_url(QUERY, SORT, fields='email,name', page=page, perPage=1000))
+    bench('build_url', lambda page: build_url('/contacts', QUERY, SORT,
+                                              {'fields': 'email,name', 'page': page, 'perPage': 1000}))
+    bench('Contacts._contacts_url', lambda page: Contacts._contacts_url(QUERY, SORT, fields='email,name', page=page,
+                                                                        perPage=1000))
+
+
+if __name__ == '__main__':
+    main()
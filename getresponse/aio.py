@@ -0,0 +1,362 @@
+"""Asyncio interface to the GetResponse API
+
+Sections reuse url and payload building of getresponsev3 classes, only transport is replaced,
+so every method of a section returns awaitable here and iter_* methods return async generators.
+Requires aiohttp
+"""
+import asyncio
+import json
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover
+    aiohttp = None
+
+from getresponse.codec import get_codec
+from getresponse.retry import RetryPolicy
+from getresponse.singleflight import AsyncSingleFlight
+from getresponse.getresponsev3 import _next_page, _call_timeout, _current_deadline, DeadlineExceeded, deadline, \
+    GetresponseError, GetresponseClient, GetResponse, Campaigns, FromFields, CustomFields, \
+    Newsletters, Contacts, SearchContacts, Imports
+
+
+class AsyncGetresponseClient:
+    """
+    Non blocking counterpart of GetresponseClient built on aiohttp
+    Number of requests in flight is bounded by semaphore
+    """
+    API_ENDPOINT = GetresponseClient.API_ENDPOINT
+    API_KEY = None
+    X_DOMAIN = None
+    X_TIME_ZONE = None
+    HEADERS = None
+    MAX_CONCURRENCY = 100
+
+    def __init__(self, api_endpoint: str, api_key: str, x_domain: str = None, x_time_zone: str = None,
+                 max_concurrency: int = None, rate_limiter=None, retry_policy: RetryPolicy = None, timeout=None,
+                 coalesce: bool = False, codec=None):
+        """
+        Initiation of Client object
+        :param api_endpoint: API Endpoint, see GetresponseClient
+        :param api_key: API key, see GetresponseClient
+        :param x_domain: Account url for GetResponse 360, see GetresponseClient
+        :param x_time_zone: Time zone of response data, see GetresponseClient
+        :param max_concurrency: Maximum number of requests in flight, default MAX_CONCURRENCY
+        :param rate_limiter: getresponse.ratelimit.RateLimiter pacing all calls, waiting does not block event loop
+        :param retry_policy: Policy for retrying transient failures, default RetryPolicy()
+        :param timeout: Default timeout of calls, see GetresponseClient
+        :param coalesce: Make identical get calls awaited concurrently share one request
+        :param codec: JSON codec for request and response bodies, see GetresponseClient
+        """
+        if aiohttp is None:
+            raise ImportError('aiohttp is required for asyncio client, install it with: pip install aiohttp')
+        self.API_ENDPOINT = api_endpoint
+        self.API_KEY = api_key
+        self.X_DOMAIN = x_domain
+        self.X_TIME_ZONE = x_time_zone
+        self.HEADERS = GetresponseClient._build_headers(api_key, x_domain)
+        self.max_concurrency = max_concurrency or self.MAX_CONCURRENCY
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.timeout = timeout or (GetresponseClient.CONNECT_TIMEOUT, GetresponseClient.READ_TIMEOUT)
+        self.single_flight = AsyncSingleFlight() if coalesce else None
+        self.codec = get_codec(codec)
+        self._session = None
+
+    def _get_session(self):
+        """
+        Session is created on first call so it is bound to running event loop
+        :return: aiohttp.ClientSession
+        """
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency)
+            self._session = aiohttp.ClientSession(connector=connector, headers=self.HEADERS)
+        return self._session
+
+    async def close(self):
+        """
+        Close all pooled connections
+        """
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def _request(self, method: str, url: str, idempotent: bool = None, timeout=None, **kwargs):
+        """
+        Make call within concurrency bound, waiting for rate limiter first when it is set
+        Transient failures are retried according to retry_policy, all attempts have to fit into current deadline
+        :param method: GET, POST or DELETE
+        :param url: Url relative to API_ENDPOINT
+        :param idempotent: Overrides idempotency derived from method, see RetryPolicy.should_retry
+        :param timeout: Overrides timeout of client and of current deadline
+        :return: tuple (aiohttp.ClientResponse, body bytes)
+        """
+        current = _current_deadline.get()
+        timeout = timeout or (current and current.timeout) or self.timeout
+        attempt = 1
+        while True:
+            if self.rate_limiter is not None:
+                await self.sleep(self.rate_limiter.reserve(), current)
+            try:
+                async with self._semaphore:
+                    remaining = current.check() if current else None
+                    connect, read = _call_timeout(timeout, remaining)
+                    client_timeout = aiohttp.ClientTimeout(total=remaining, connect=connect, sock_read=read)
+                    async with self._get_session().request(method, self.API_ENDPOINT + url, timeout=client_timeout,
+                                                           **kwargs) as r:
+                        body = await r.read()
+            except DeadlineExceeded:
+                raise
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                sent = not isinstance(e, aiohttp.ClientConnectorError)
+                if not self.retry_policy.should_retry(method, attempt, sent=sent, idempotent=idempotent,
+                                                      reason=type(e).__name__):
+                    raise
+                await self.sleep(self.retry_policy.delay(attempt), current)
+                attempt += 1
+                continue
+            if self.rate_limiter is not None:
+                self.rate_limiter.update(r.headers)
+            if not self.retry_policy.should_retry(method, attempt, status=r.status, idempotent=idempotent):
+                return r, body
+            await self.sleep(self.retry_policy.delay(attempt, r.headers.get('Retry-After')), current)
+            attempt += 1
+
+    @staticmethod
+    async def sleep(seconds: float, current=None):
+        """
+        Sleep unless it would outlast current deadline, in which case DeadlineExceeded is raised right away
+        Used for rate limiter waits, retry backoff and polling of sections, e.g. Imports.wait_import
+        :param seconds: Seconds to sleep
+        :param current: Deadline of caller or None
+        """
+        if current is not None:
+            current.check(seconds)
+        if seconds:
+            await asyncio.sleep(seconds)
+
+    def _json(self, r, body: bytes):
+        """
+        Decode JSON body with codec, raising GetresponseError when API answered with something else,
+        e.g. HTML error page
+        """
+        try:
+            return self.codec.loads(body)
+        except ValueError:
+            raise GetresponseError(body.decode('utf-8', 'replace'), r.status)
+
+    def _encode(self, data):
+        """
+        Encode body of request with codec, str and bytes are sent as they are
+        """
+        if data is None or isinstance(data, (str, bytes)):
+            return data
+        return self.codec.dumps(data)
+
+    async def get(self, url: str, timeout=None):
+        if self.single_flight is not None:
+            return await self.single_flight.do(url, lambda: self._get(url, timeout), _current_deadline.get())
+        return await self._get(url, timeout)
+
+    async def _get(self, url: str, timeout=None):
+        r, body = await self._request('GET', url, timeout=timeout)
+        return self._json(r, body)
+
+    async def get_page(self, url: str, timeout=None):
+        """
+        Get one page of list endpoint together with response headers which carry paging information
+        :param url: Url of page
+        :param timeout: Overrides timeout of client
+        :return: tuple (JSON response, headers)
+        """
+        r, body = await self._request('GET', url, timeout=timeout)
+        return self._json(r, body), r.headers
+
+    async def paginate(self, url_for_page, start_page: int = 1):
+        """
+        Asynchronous iteration over items of list endpoint, next page is requested while current one is consumed
+        :param url_for_page: Callable which returns url for given page number
+        :param start_page: Number of first page to fetch
+        :return: async generator of items
+        """
+        page = start_page
+        task = asyncio.ensure_future(self.get_page(url_for_page(page)))
+        try:
+            while task is not None:
+                items, headers = await task
+                next_page = _next_page(items, headers, page)
+                task = asyncio.ensure_future(self.get_page(url_for_page(next_page))) if next_page else None
+                for item in items:
+                    yield item
+                page = next_page
+        finally:
+            if task is not None:
+                task.cancel()
+
+    def iter_stream(self, url_for_page, start_page: int = 1):
+        """
+        Incremental decoding of pages is not supported, bodies are read whole by aiohttp transport
+        :raises ValueError: always, iter_* methods of sections have to be called with stream=False
+        """
+        raise ValueError('stream=True is not supported by asyncio client, call iter_* methods with stream=False')
+
+    async def fetch_pages(self, url_for_page, ordered: bool = True, max_in_flight: int = None):
+        """
+        Fetch all pages of list endpoint concurrently
+        First page tells how many pages there are, the rest are requested at once within max_in_flight window.
+        If API does not send TotalPages header pages are fetched one by one
+        :param url_for_page: Callable which returns url for given page number
+        :param ordered: Yield pages in page order if True, otherwise as soon as each page is fetched
+        :param max_in_flight: Maximum number of pages requested or waiting to be consumed, default max_concurrency
+        :return: async generator of tuples (page number, list of items)
+        """
+        items, headers = await self.get_page(url_for_page(1))
+        next_page = _next_page(items, headers, 1)
+        yield 1, items
+        total_pages = headers.get('TotalPages')
+        if total_pages is None:
+            while next_page:
+                page = next_page
+                items, headers = await self.get_page(url_for_page(page))
+                next_page = _next_page(items, headers, page)
+                yield page, items
+            return
+        pages = iter(range(2, int(total_pages) + 1))
+        max_in_flight = max_in_flight or self.max_concurrency
+        pending = {}
+        try:
+            while True:
+                for page in pages:
+                    pending[page] = asyncio.ensure_future(self.get_page(url_for_page(page)))
+                    if len(pending) >= max_in_flight:
+                        break
+                if not pending:
+                    return
+                if ordered:
+                    page = min(pending)
+                    await asyncio.wait([pending[page]])
+                else:
+                    await asyncio.wait(pending.values(), return_when=asyncio.FIRST_COMPLETED)
+                    page = next(page for page, task in pending.items() if task.done())
+                items, headers = pending.pop(page).result()
+                _next_page(items, headers, page)
+                yield page, items
+        finally:
+            for task in pending.values():
+                task.cancel()
+
+    async def fetch_all(self, url_for_page, max_workers: int = None, ordered: bool = True,
+                        max_in_flight: int = None):
+        """
+        Fetch all items of list endpoint with pages requested concurrently, see fetch_pages for arguments
+        :param max_workers: Not used, concurrency is bounded by max_concurrency of client
+        :return: async generator of items
+        """
+        async for _, items in self.fetch_pages(url_for_page, ordered=ordered, max_in_flight=max_in_flight):
+            for item in items:
+                yield item
+
+    async def post(self, url: str, data: json, idempotent: bool = False, timeout=None):
+        r, body = await self._request('POST', url, idempotent=idempotent, timeout=timeout, data=self._encode(data))
+        try:
+            result = self.codec.loads(body)
+        except ValueError:
+            result = body.decode('utf-8', 'replace')
+        return result
+
+    async def delete(self, url: str, data: json = None, timeout=None):
+        r, body = await self._request('DELETE', url, timeout=timeout, data=self._encode(data))
+        return body.decode('utf-8', 'replace')
+
+
+class _AsyncSection:
+    """
+    Mixin replacing blocking client of section with AsyncGetresponseClient
+    """
+
+    def __init__(self, api_endpoint: str = None, api_key: str = None, x_domain: str = None, x_time_zone: str = None,
+                 client: AsyncGetresponseClient = None):
+        super().__init__(client=client or AsyncGetresponseClient(api_endpoint=api_endpoint, api_key=api_key,
+                                                                 x_domain=x_domain, x_time_zone=x_time_zone))
+
+
+class AsyncCampaigns(_AsyncSection, Campaigns):
+    pass
+
+
+class AsyncFromFields(_AsyncSection, FromFields):
+    pass
+
+
+class AsyncCustomFields(_AsyncSection, CustomFields):
+    pass
+
+
+class AsyncNewsletters(_AsyncSection, Newsletters):
+    pass
+
+
+class AsyncContacts(_AsyncSection, Contacts):
+    pass
+
+
+class AsyncSearchContacts(_AsyncSection, SearchContacts):
+    pass
+
+
+class AsyncImports(_AsyncSection, Imports):
+    async def post_import_file(self, campaign_id: str, file, field_mapping: list = None, chunk_size: int = None):
+        with self._open_csv(file) as f:
+            field_mapping, rows = self._csv_rows(f, field_mapping)
+            return [await self._getresponse_client.post('/imports', data=payload)
+                    for payload in self._import_payloads(campaign_id, field_mapping, rows,
+                                                         chunk_size or self.CHUNK_SIZE)]
+
+    async def wait_import(self, import_id: str, timeout: float = None, interval: float = None,
+                          max_interval: float = None, progress=None):
+        url = str('/imports/' + import_id)
+        with deadline(timeout) as current:
+            attempt = 0
+            while True:
+                result, _ = await self._getresponse_client.get_page(url)
+                if progress is not None:
+                    progress(result)
+                if self._import_done(result):
+                    return result
+                await self._getresponse_client.sleep(self._poll_delay(attempt, interval, max_interval), current)
+                attempt += 1
+
+
+class AsyncGetResponse(GetResponse):
+    """
+    Account level entry point with awaitable sections sharing one AsyncGetresponseClient
+    """
+    CLIENT_CLASS = AsyncGetresponseClient
+    SECTION_CLASSES = {'campaigns': AsyncCampaigns, 'from_fields': AsyncFromFields,
+                       'custom_fields': AsyncCustomFields, 'newsletters': AsyncNewsletters,
+                       'contacts': AsyncContacts, 'search_contacts': AsyncSearchContacts, 'imports': AsyncImports}
+
+    async def close(self):
+        """
+        Close connections of shared client
+        """
+        await self.client.close()
+
+    def __enter__(self):
+        raise TypeError('AsyncGetResponse has to be used with "async with" instead of "with"')
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        raise TypeError('AsyncGetResponse has to be used with "async with" instead of "with"')
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
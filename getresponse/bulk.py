@@ -0,0 +1,267 @@
+"""Bulk operations on contacts built on top of single contact calls of the GetResponse API"""
+import re
+import threading
+from collections import Counter, namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from contextvars import copy_context
+from itertools import islice
+
+from getresponse.getresponsev3 import Contacts
+
+CREATED = 'created'
+QUEUED = 'queued'
+DUPLICATE = 'duplicate'
+UPDATED = 'updated'
+SKIPPED = 'skipped'
+FAILED = 'failed'
+
+BulkResult = namedtuple('BulkResult', ['index', 'key', 'status', 'reason'])
+BulkResult.__doc__ = '''Outcome of one record: position in input, email or contact id, status and reason of failure'''
+
+
+class BulkReport:
+    """
+    Per record results of bulk operation together with counts per status
+    """
+
+    def __init__(self, results: list):
+        self.results = sorted(results, key=lambda result: result.index)
+        self.counts = Counter(result.status for result in self.results)
+
+    @property
+    def failed(self):
+        """
+        :return: list of BulkResult which failed
+        """
+        return [result for result in self.results if result.status == FAILED]
+
+    def __repr__(self):
+        return 'BulkReport({})'.format(dict(self.counts))
+
+
+class BulkContacts:
+    """
+    Bulk operations on contacts section
+    Records are validated and serialized with codec of client in batches and dispatched from thread pool with
+    bounded number of calls in flight. Rate limiter, retry policy and deadline of client apply to every call.
+    Skipping of custom field updates which change nothing is opt-in: only values passed in custom_field_values,
+    stored with remember or written by earlier updates of this object are known
+        Examples:
+                bulk = BulkContacts(account.contacts)
+                bulk.remember(account.contacts.export_contacts(fields='customFieldValues'))
+                report = bulk.update_contact_customs(updates)
+    """
+    BATCH_SIZE = 500
+    MAX_WORKERS = 8
+    MERGE_WINDOW = 1000
+    EMAIL = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+
+    def __init__(self, contacts: Contacts, max_workers: int = None, batch_size: int = None,
+                 custom_field_values: dict = None):
+        """
+        :param contacts: Contacts section whose client is used for calls
+        :param max_workers: Number of calls in flight
+        :param batch_size: Number of records validated and serialized at once
+        :param custom_field_values: Known custom field values, {contact_id: {customFieldId: [values]}}.
+        Updates matching them are skipped and successful updates are stored back, so mapping can be reused by
+        later jobs. Can be filled from contacts with remember
+        """
+        self.contacts = contacts
+        self.max_workers = max_workers or self.MAX_WORKERS
+        self.batch_size = batch_size or self.BATCH_SIZE
+        self.custom_field_values = {} if custom_field_values is None else custom_field_values
+        self._lock = threading.Lock()
+
+    @property
+    def _client(self):
+        return self.contacts._getresponse_client
+
+    @staticmethod
+    def _reason(r):
+        """
+        Error message from API response
+        """
+        try:
+            body = r.json()
+        except ValueError:
+            return r.text or 'HTTP {}'.format(r.status_code)
+        if isinstance(body, dict) and body.get('message'):
+            return body['message']
+        return 'HTTP {}'.format(r.status_code)
+
+    def _dispatch(self, prepared, send):
+        """
+        Send prepared records from thread pool keeping at most twice max_workers calls pending
+        :param prepared: iterable of (index, key, payload) or BulkResult for records which failed validation
+        :param send: Callable (key, payload) -> (status, reason)
+        :return: generator of BulkResult in order of completion
+        """
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        pending = {}
+        try:
+            for item in prepared:
+                if isinstance(item, BulkResult):
+                    yield item
+                    continue
+                index, key, payload = item
+                pending[executor.submit(copy_context().run, send, key, payload)] = (index, key)
+                if len(pending) >= self.max_workers * 2:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    yield from self._collect(done, pending)
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                yield from self._collect(done, pending)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def _collect(done, pending):
+        for future in done:
+            index, key = pending.pop(future)
+            try:
+                status, reason = future.result()
+            except Exception as e:
+                status, reason = FAILED, '{}: {}'.format(type(e).__name__, e)
+            yield BulkResult(index, key, status, reason)
+
+    def _prepare_contacts(self, records, campaign_id: str = None):
+        """
+        Validate and serialize contact records batch by batch
+        :return: generator of (index, email, payload) or BulkResult for invalid records
+        """
+        records = enumerate(records)
+        while True:
+            batch = list(islice(records, self.batch_size))
+            if not batch:
+                return
+            for index, record in batch:
+                record = dict(record)
+                email = record.pop('email', None)
+                record_campaign_id = record.pop('campaignId', None) or campaign_id
+                if not email or not self.EMAIL.match(email):
+                    yield BulkResult(index, email, FAILED, 'Invalid email')
+                elif not record_campaign_id:
+                    yield BulkResult(index, email, FAILED, 'Missing campaignId')
+                elif not isinstance(record.get('customFieldValues', []), list):
+                    yield BulkResult(index, email, FAILED, 'customFieldValues should be list')
+                else:
+                    data = Contacts._contact_data(email, record_campaign_id, **record)
+                    yield index, email, self._client.codec.dumps(data)
+
+    def _send_contact(self, email: str, payload: str):
+        r = self._client.post_response('/contacts', data=payload)
+        if r.status_code == 201:
+            return CREATED, None
+        if r.status_code == 202:
+            return QUEUED, None
+        if r.status_code == 409:
+            return DUPLICATE, self._reason(r)
+        return FAILED, self._reason(r)
+
+    def iter_post_contacts(self, records, campaign_id: str = None):
+        """
+        Create contacts from stream of records, yielding result of each record as soon as it is known
+        :param records: Iterable of dicts with email and optionally campaignId, name, dayOfCycle,
+        customFieldValues, ipAddress - see Contacts.post_contacts
+            Examples:
+                    records = [{'email': 'a@test.com', 'name': 'A'}, {'email': 'b@test.com', 'campaignId': 'O'}]
+        :param campaign_id: Campaign for records without campaignId
+        :return: generator of BulkResult, status is created, queued, duplicate or failed
+        """
+        return self._dispatch(self._prepare_contacts(records, campaign_id), self._send_contact)
+
+    def post_contacts(self, records, campaign_id: str = None):
+        """
+        Create contacts from stream of records, see iter_post_contacts
+        :return: BulkReport
+        """
+        return BulkReport(list(self.iter_post_contacts(records, campaign_id)))
+
+    @staticmethod
+    def _values(value):
+        """
+        Custom field value in form used by API, list of strings
+        """
+        if isinstance(value, (list, tuple)):
+            return [str(item) for item in value]
+        return [str(value)]
+
+    def remember(self, contacts):
+        """
+        Store current custom field values of contacts, so that updates which would not change them are skipped
+        :param contacts: Iterable of contacts as returned by get_contact or export_contacts with customFieldValues
+        """
+        with self._lock:
+            for contact in contacts:
+                self.custom_field_values[contact['contactId']] = {
+                    field['customFieldId']: self._values(field.get('value', []))
+                    for field in contact.get('customFieldValues') or []}
+
+    def _prepare_custom_fields(self, merged: dict, start: int):
+        """
+        Drop values which are already known and serialize the rest
+        :param start: Index of first contact
+        :return: generator of (index, contact_id, (changed values, payload)) or BulkResult for skipped contacts
+        """
+        for index, (contact_id, fields) in enumerate(merged.items(), start):
+            known = self.custom_field_values.get(contact_id) or {}
+            changed = {}
+            for field_id, value in fields.items():
+                value = self._values(value)
+                if known.get(field_id) != value:
+                    changed[field_id] = value
+            if not changed:
+                yield BulkResult(index, contact_id, SKIPPED, None)
+                continue
+            data = {'customFieldValues': [{'customFieldId': field_id, 'value': value}
+                                          for field_id, value in changed.items()]}
+            yield index, contact_id, (changed, self._client.codec.dumps(data))
+
+    def _send_custom_fields(self, contact_id: str, payload: tuple):
+        changed, data = payload
+        r = self._client.post_response('/contacts/' + contact_id + '/custom-fields', data=data, idempotent=True)
+        if r.status_code >= 300:
+            return FAILED, self._reason(r)
+        with self._lock:
+            self.custom_field_values.setdefault(contact_id, {}).update(changed)
+        return UPDATED, None
+
+    def iter_update_contact_customs(self, updates, progress=None, window: int = None):
+        """
+        Update custom field values of many contacts, yielding result of each contact as soon as it is known
+        Updates are read in windows of window contacts. Updates of one contact within window are merged into one
+        call, later value of the same field wins. Calls of window are finished before calls of next one start,
+        so contact appearing again in later window is updated again after its earlier call.
+        Memory is bounded by window, pre-group updates per contact to get one call per contact
+        :param updates: Iterable of (contact_id, {customFieldId: value}), value is string or list of strings
+            Examples:
+                    updates = [('V', {'n': 'gold'}), ('W', {'n': 'silver', 'k': ['a', 'b']}), ('V', {'k': 'c'})]
+        :param progress: Callable (done, total) called after every contact, total is number of contacts read so far
+        :param window: Number of distinct contacts merged at once, default MERGE_WINDOW
+        :return: generator of BulkResult, index is position of contact in order of first appearance in its window,
+        counted across windows. Status is updated, skipped or failed
+        """
+        window = window or self.MERGE_WINDOW
+        updates = iter(updates)
+        done = total = 0
+        while True:
+            merged = {}
+            for contact_id, fields in updates:
+                merged.setdefault(contact_id, {}).update(fields)
+                if len(merged) >= window:
+                    break
+            if not merged:
+                return
+            start, total = total, total + len(merged)
+            for result in self._dispatch(self._prepare_custom_fields(merged, start), self._send_custom_fields):
+                done += 1
+                if progress is not None:
+                    progress(done, total)
+                yield result
+
+    def update_contact_customs(self, updates, progress=None, window: int = None):
+        """
+        Update custom field values of many contacts, see iter_update_contact_customs
+        :return: BulkReport
+        """
+        return BulkReport(list(self.iter_update_contact_customs(updates, progress, window)))
@@ -0,0 +1,401 @@
+"""Caching of GET responses of the GetResponse API
+
+ResponseCache decides what is cached and for how long, storage is delegated to backend:
+MemoryBackend keeps entries in process, SQLiteBackend keeps them in file shared by processes on one host
+"""
+import abc
+import json
+import threading
+import time
+from collections import OrderedDict
+from fnmatch import fnmatchcase
+
+from getresponse.database import SQLiteDatabase
+
+
+class _Entry:
+    __slots__ = ('path', 'value', 'size', 'expires', 'etag', 'last_modified')
+
+    def __init__(self, path: str, value, size: int, expires: float, etag: str = None, last_modified: str = None):
+        self.path = path
+        self.value = value
+        self.size = size
+        self.expires = expires
+        self.etag = etag
+        self.last_modified = last_modified
+
+
+class CacheBackend(abc.ABC):
+    """
+    Storage of cache entries
+    Backends have to be safe to use from several threads and bound their size by evicting least recently used entries
+    """
+
+    @abc.abstractmethod
+    def load(self, key: str):
+        """
+        Get entry and mark it as recently used
+        :param key: Key built by client from url and account
+        :return: _Entry or None
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def store(self, key: str, entry: _Entry):
+        """
+        Store entry replacing previous one
+        :return: Number of entries evicted to stay within bounds
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def touch(self, key: str, expires: float):
+        """
+        Set new expiration time of entry
+        :return: True if entry exists
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def delete(self, key: str):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def invalidate(self, segment: str):
+        """
+        Delete entries whose path contains given segment
+        :return: Number of deleted entries
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def clear(self):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def size(self):
+        """
+        :return: tuple (number of entries, total size of bodies in bytes)
+        """
+        raise NotImplementedError
+
+
+class MemoryBackend(CacheBackend):
+    """
+    Entries kept in process memory, cached objects are shared between callers so they should not be modified
+    """
+    MAX_ENTRIES = 1024
+    MAX_BYTES = 16 * 1024 * 1024
+
+    def __init__(self, max_entries: int = None, max_bytes: int = None):
+        """
+        :param max_entries: Maximum number of entries, default MAX_ENTRIES
+        :param max_bytes: Maximum total size of cached response bodies, default MAX_BYTES
+        """
+        self.max_entries = max_entries or self.MAX_ENTRIES
+        self.max_bytes = max_bytes or self.MAX_BYTES
+        self._entries = OrderedDict()  # key -> _Entry
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def _remove(self, key):
+        self._bytes -= self._entries.pop(key).size
+
+    def load(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def store(self, key: str, entry: _Entry):
+        if entry.size > self.max_bytes:
+            return 0
+        evicted = 0
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._bytes += entry.size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                evicted += 1
+        return evicted
+
+    def touch(self, key: str, expires: float):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False
+            entry.expires = expires
+            self._entries.move_to_end(key)
+            return True
+
+    def delete(self, key: str):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def invalidate(self, segment: str):
+        with self._lock:
+            keys = [key for key, entry in self._entries.items() if segment in entry.path.split('/')]
+            for key in keys:
+                self._remove(key)
+        return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def size(self):
+        with self._lock:
+            return len(self._entries), self._bytes
+
+
+class SQLiteBackend(CacheBackend):
+    """
+    Entries kept in SQLite database file which several processes on one host can share,
+    so short living workers read reference data locally instead of downloading it at start.
+    Loads only read, time of last use is written when it is older than USED_RESOLUTION seconds,
+    so eviction order is exact to that resolution
+    """
+    MAX_ENTRIES = 10000
+    MAX_BYTES = 256 * 1024 * 1024
+    BUSY_TIMEOUT = 30
+    USED_RESOLUTION = 60
+
+    def __init__(self, path: str, max_entries: int = None, max_bytes: int = None):
+        """
+        :param path: Database file, created when missing
+        :param max_entries: Maximum number of entries, default MAX_ENTRIES
+        :param max_bytes: Maximum total size of cached response bodies, default MAX_BYTES
+        """
+        self.path = path
+        self.max_entries = max_entries or self.MAX_ENTRIES
+        self.max_bytes = max_bytes or self.MAX_BYTES
+        self._database = SQLiteDatabase(path, self.BUSY_TIMEOUT)
+        with self._database.transaction() as db:
+            db.execute('CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, path TEXT NOT NULL, '
+                       'value TEXT NOT NULL, size INTEGER NOT NULL, expires REAL NOT NULL, etag TEXT, '
+                       'last_modified TEXT, used REAL NOT NULL)')
+            db.execute('CREATE INDEX IF NOT EXISTS entries_used ON entries (used)')
+
+    def load(self, key: str):
+        db = self._database.connection()
+        row = db.execute('SELECT path, value, size, expires, etag, last_modified, used FROM entries WHERE key = ?',
+                         (key,)).fetchone()
+        if row is None:
+            return None
+        path, value, size, expires, etag, last_modified, used = row
+        now = time.time()
+        if now - used >= self.USED_RESOLUTION:
+            db.execute('UPDATE entries SET used = ? WHERE key = ? AND used < ?', (now, key, now))
+        return _Entry(path, json.loads(value), size, expires, etag, last_modified)
+
+    def store(self, key: str, entry: _Entry):
+        if entry.size > self.max_bytes:
+            return 0
+        with self._database.transaction() as db:
+            db.execute('INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                       (key, entry.path, json.dumps(entry.value), entry.size, entry.expires, entry.etag,
+                        entry.last_modified, time.time()))
+            return self._evict(db)
+
+    def _evict(self, db):
+        """
+        Delete least recently used entries until both bounds are met
+        :return: Number of evicted entries
+        """
+        evicted = 0
+        count, total = db.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries').fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return evicted
+        for key, size in db.execute('SELECT key, size FROM entries ORDER BY used').fetchall():
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            db.execute('DELETE FROM entries WHERE key = ?', (key,))
+            count -= 1
+            total -= size
+            evicted += 1
+        return evicted
+
+    def touch(self, key: str, expires: float):
+        with self._database.transaction() as db:
+            return db.execute('UPDATE entries SET expires = ?, used = ? WHERE key = ?',
+                              (expires, time.time(), key)).rowcount > 0
+
+    def delete(self, key: str):
+        with self._database.transaction() as db:
+            db.execute('DELETE FROM entries WHERE key = ?', (key,))
+
+    def invalidate(self, segment: str):
+        with self._database.transaction() as db:
+            return db.execute("DELETE FROM entries WHERE '/' || path || '/' LIKE ? ESCAPE '\\'",
+                              ('%/' + segment.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '/%',
+                               )).rowcount
+
+    def clear(self):
+        with self._database.transaction() as db:
+            db.execute('DELETE FROM entries')
+
+    def size(self):
+        with self._database.transaction() as db:
+            return tuple(db.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries').fetchone())
+
+
+class ResponseCache:
+    """
+    Cache of decoded GET responses with per endpoint TTL, stored in backend with LRU eviction
+    Expired entries which have ETag or Last-Modified validators are kept until evicted,
+    so client can revalidate them with conditional request and reuse them on 304
+    """
+    DEFAULT_TTLS = OrderedDict([
+        ('/campaigns/statistics/*', 0),
+        ('/campaigns/*/*', 0),
+        ('/campaigns*', 300),
+        ('/custom-fields*', 300),
+        ('/from-fields*', 300),
+    ])
+    # first segment of written url: other segments whose entries it makes stale
+    RELATED_SEGMENTS = {
+        'contacts': ('statistics',),
+        'imports': ('contacts', 'statistics'),
+        'newsletters': ('statistics',),
+        'custom-fields': ('contacts',),
+        'from-fields': ('newsletters',),
+    }
+
+    def __init__(self, ttls: dict = None, default_ttl: float = None, max_entries: int = None, max_bytes: int = None,
+                 backend: CacheBackend = None):
+        """
+        :param ttls: Ordered mapping of path pattern (fnmatch, query string excluded) to TTL in seconds.
+        First matching pattern wins, TTL 0 disables caching. Default DEFAULT_TTLS
+            Examples:
+                    ttls = {'/campaigns*': 3600, '/custom-fields*': 86400}
+        :param default_ttl: TTL for paths not matching any pattern, by default they are not cached
+        :param max_entries: Maximum number of entries of default MemoryBackend
+        :param max_bytes: Maximum total size of response bodies of default MemoryBackend
+        :param backend: Storage of entries, default MemoryBackend. SQLiteBackend shares entries between processes
+        """
+        self.ttls = OrderedDict(self.DEFAULT_TTLS if ttls is None else ttls)
+        self.default_ttl = default_ttl
+        self.backend = backend or MemoryBackend(max_entries=max_entries, max_bytes=max_bytes)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.revalidations = 0
+        self._lock = threading.Lock()
+
+    def _count(self, **counters):
+        with self._lock:
+            for name, value in counters.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    @staticmethod
+    def _path(url: str):
+        return url.split('?', 1)[0]
+
+    def ttl_for(self, url: str):
+        """
+        :param url: Url relative to API endpoint
+        :return: TTL in seconds, None or 0 if url should not be cached
+        """
+        path = self._path(url)
+        for pattern, ttl in self.ttls.items():
+            if fnmatchcase(path, pattern):
+                return ttl
+        return self.default_ttl
+
+    def get(self, key):
+        """
+        :param key: Key built by client from url and account
+        :return: tuple (found, value), found is False for missing and expired entries
+        """
+        entry = self.backend.load(key)
+        if entry is None or entry.expires <= time.time():
+            if entry is not None and entry.etag is None and entry.last_modified is None:
+                self.backend.delete(key)
+            self._count(misses=1)
+            return False, None
+        self._count(hits=1)
+        return True, entry.value
+
+    def validators(self, key):
+        """
+        Headers for conditional request revalidating expired entry
+        :param key: Key built by client from url and account
+        :return: dict with If-None-Match and/or If-Modified-Since, empty if there is nothing to revalidate
+        """
+        entry = self.backend.load(key)
+        headers = {}
+        if entry is not None:
+            if entry.etag is not None:
+                headers['If-None-Match'] = entry.etag
+            if entry.last_modified is not None:
+                headers['If-Modified-Since'] = entry.last_modified
+        return headers
+
+    def refresh(self, key, url: str):
+        """
+        Mark entry as fresh again after API answered 304 Not Modified, which counts as hit instead of miss
+        :param key: Key built by client from url and account
+        :param url: Url relative to API endpoint
+        :return: tuple (found, value), found is False if entry was evicted meanwhile
+        """
+        ttl = self.ttl_for(url)
+        if not ttl or not self.backend.touch(key, time.time() + ttl):
+            return False, None
+        entry = self.backend.load(key)
+        if entry is None:
+            return False, None
+        self._count(misses=-1, hits=1, revalidations=1)
+        return True, entry.value
+
+    def set(self, key, url: str, value, size: int = 0, etag: str = None, last_modified: str = None):
+        """
+        Store value if url is cacheable, backend evicts least recently used entries when bounds are exceeded
+        :param key: Key built by client from url and account
+        :param url: Url relative to API endpoint, used for TTL and invalidation
+        :param value: Decoded response
+        :param size: Size of response body in bytes
+        :param etag: ETag header of response
+        :param last_modified: Last-Modified header of response
+        """
+        ttl = self.ttl_for(url)
+        if not ttl:
+            return
+        evicted = self.backend.store(key, _Entry(self._path(url), value, size, time.time() + ttl, etag,
+                                                 last_modified))
+        if evicted:
+            self._count(evictions=evicted)
+
+    def invalidate(self, url: str):
+        """
+        Drop entries related to written resource: every entry whose path contains first segment of url or one of
+        its RELATED_SEGMENTS, e.g. write to /contacts/a drops /contacts?..., /campaigns/O/contacts and
+        /campaigns/statistics/...
+        :param url: Url of successful POST or DELETE relative to API endpoint
+        """
+        segments = self._path(url).split('/')
+        if len(segments) < 2 or not segments[1]:
+            return
+        removed = sum(self.backend.invalidate(segment)
+                      for segment in (segments[1],) + self.RELATED_SEGMENTS.get(segments[1], ()))
+        if removed:
+            self._count(invalidations=removed)
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        """
+        :return: dict with hits, misses, revalidations (304 responses, included in hits), evictions, invalidations,
+        entries and bytes. Entries and bytes describe backend, other counters this process
+        """
+        entries, size = self.backend.size()
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'revalidations': self.revalidations,
+                    'evictions': self.evictions, 'invalidations': self.invalidations, 'entries': entries,
+                    'bytes': size}
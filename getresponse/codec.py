@@ -0,0 +1,108 @@
+"""JSON codecs for bodies of calls to the GetResponse API
+
+Standard library json is used unless client is given faster codec. orjson and ujson are optional
+"""
+import json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import ujson
+except ImportError:  # pragma: no cover
+    ujson = None
+
+
+class JSONCodec:
+    """
+    Codec built on standard library json, always available
+    Decoding errors are ValueError (JSONDecodeError) for all codecs
+    """
+    name = 'json'
+
+    def dumps(self, obj) -> bytes:
+        """
+        :param obj: Body of request
+        :return: UTF-8 encoded JSON
+        """
+        return json.dumps(obj).encode('utf-8')
+
+    def loads(self, data):
+        """
+        :param data: JSON as bytes or str
+        :return: Decoded object
+        """
+        return json.loads(data)
+
+    def decode_response(self, r):
+        """
+        Decode body of requests.Response
+        """
+        return r.json()
+
+
+class OrjsonCodec(JSONCodec):
+    """
+    Codec built on orjson, encodes straight to bytes and decodes from bytes without intermediate str
+    """
+    name = 'orjson'
+
+    def __init__(self):
+        if orjson is None:
+            raise RuntimeError('orjson codec requires orjson, install it with: pip install orjson')
+
+    def dumps(self, obj) -> bytes:
+        return orjson.dumps(obj)
+
+    def loads(self, data):
+        return orjson.loads(data)
+
+    def decode_response(self, r):
+        return orjson.loads(r.content)
+
+
+class UjsonCodec(JSONCodec):
+    """
+    Codec built on ujson
+    """
+    name = 'ujson'
+
+    def __init__(self):
+        if ujson is None:
+            raise RuntimeError('ujson codec requires ujson, install it with: pip install ujson')
+
+    def dumps(self, obj) -> bytes:
+        return ujson.dumps(obj, ensure_ascii=False).encode('utf-8')
+
+    def loads(self, data):
+        return ujson.loads(data)
+
+    def decode_response(self, r):
+        return ujson.loads(r.content)
+
+
+CODECS = {'json': JSONCodec, 'orjson': OrjsonCodec, 'ujson': UjsonCodec}
+
+
+def get_codec(codec=None):
+    """
+    Resolve codec argument of client
+    :param codec: None for standard library json, 'auto' for fastest installed one, name from CODECS or codec object
+    :return: codec object
+    """
+    if codec is None:
+        return JSONCodec()
+    if codec == 'auto':
+        if orjson is not None:
+            return OrjsonCodec()
+        if ujson is not None:
+            return UjsonCodec()
+        return JSONCodec()
+    if isinstance(codec, str):
+        try:
+            return CODECS[codec]()
+        except KeyError:
+            raise ValueError('Unknown codec {!r}, expected one of {}'.format(codec, ', '.join(CODECS))) from None
+    return codec
@@ -0,0 +1,56 @@
+"""SQLite database file shared by threads and processes on one host
+
+Used by SQLiteBackend of getresponse.cache and SQLiteContactIndex of getresponse.index.
+Every thread uses its own connection in autocommit mode, connections are opened again after fork.
+Reads run as single statements without locking, writes which have to be atomic run in immediate transaction
+"""
+import os
+import sqlite3
+import threading
+
+
+class SQLiteDatabase:
+    BUSY_TIMEOUT = 30
+
+    def __init__(self, path: str, busy_timeout: float = None):
+        """
+        :param path: Database file, created when missing
+        :param busy_timeout: Seconds writer waits for lock held by other connection, default BUSY_TIMEOUT
+        """
+        self.path = path
+        self.busy_timeout = self.BUSY_TIMEOUT if busy_timeout is None else busy_timeout
+        self._local = threading.local()
+
+    def connection(self):
+        """
+        :return: sqlite3.Connection of current thread, statements run outside transaction commit on their own
+        """
+        db = getattr(self._local, 'db', None)
+        if db is None or getattr(self._local, 'pid', None) != os.getpid():
+            db = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            self._local.db = db
+            self._local.pid = os.getpid()
+        return db
+
+    def transaction(self):
+        """
+        Immediate transaction, so read-modify-write sequences are atomic across processes
+            Examples:
+                    with database.transaction() as db:
+                        db.execute(...)
+        """
+        return _Transaction(self.connection())
+
+
+class _Transaction:
+    def __init__(self, db: sqlite3.Connection):
+        self.db = db
+
+    def __enter__(self):
+        self.db.execute('BEGIN IMMEDIATE')
+        return self.db
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.db.execute('ROLLBACK' if exc_type else 'COMMIT')
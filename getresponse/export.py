@@ -0,0 +1,304 @@
+"""Columnar export of records fetched from the GetResponse API
+
+Records are consumed one by one from any iterable, e.g. Contacts.export_contacts or iter_campaign_contacts with
+stream=True, and collected into column buffers of chunk_size rows. Every full chunk is written out before next one
+is collected, so export of millions of rows never holds them as list of dicts.
+Parquet and Arrow IPC files are written batch by batch with schema inferred from rows read ahead.
+CSV needs only standard library, Arrow and Parquet require pyarrow, NumPy and pandas output require numpy and pandas
+"""
+import csv
+import itertools
+import json
+import os
+import tempfile
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+try:
+    import pandas
+except ImportError:  # pragma: no cover
+    pandas = None
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:  # pragma: no cover
+    pyarrow = None
+
+CHUNK_SIZE = 10000
+SAMPLE_SIZE = 100000  # rows read ahead to infer schema of Parquet and Arrow IPC files
+
+
+def _require(module, name: str):
+    if module is None:
+        raise RuntimeError('{0} is required for this export, install it with: pip install {0}'.format(name))
+
+
+def flatten(record, prefix: str = ''):
+    """
+    Flatten nested objects into dotted keys, e.g. campaign.campaignId. Lists are kept as JSON strings
+    :param record: dict or model from getresponse.models
+    :return: dict of scalar values
+    """
+    if hasattr(record, 'to_dict'):
+        record = record.to_dict()
+    flat = {}
+    for key, value in record.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, prefix + key + '.'))
+        elif isinstance(value, list):
+            flat[prefix + key] = json.dumps(value)
+        else:
+            flat[prefix + key] = value
+    return flat
+
+
+def iter_statistics_rows(response, keys: tuple = ('campaignId', 'date')):
+    """
+    Turn nested statistics response into flat rows, levels of nested objects become key columns
+        Examples:
+                {'3': {'2017-03-10': {'import': 1}}} with keys ('campaignId', 'date') gives
+                {'campaignId': '3', 'date': '2017-03-10', 'import': 1}
+    :param response: JSON response of one of get_campaigns_statistics_* methods
+    :param keys: Names of nesting levels, objects below last level are flattened into dotted columns
+    :return: generator of dicts
+    """
+    for item in response if isinstance(response, list) else [response]:
+        yield from _statistics_rows(item, keys, {})
+
+
+def _statistics_rows(node: dict, keys: tuple, row: dict):
+    if not keys or not any(isinstance(value, dict) for value in node.values()):
+        yield dict(row, **flatten(node))
+        return
+    for key, value in node.items():
+        if isinstance(value, dict):
+            yield from _statistics_rows(value, keys[1:], dict(row, **{keys[0]: key}))
+
+
+def iter_columns(records, columns: list = None, chunk_size: int = None):
+    """
+    Collect records into column buffers
+    :param records: Iterable of dicts or models, nested objects are flattened, see flatten
+    :param columns: Columns to keep, by default columns of first record. Missing values are None
+    :param chunk_size: Number of rows per chunk, default CHUNK_SIZE
+    :return: generator of dicts {column: list of values}, all with the same columns
+    """
+    chunk_size = chunk_size or CHUNK_SIZE
+    buffers = None
+    size = 0
+    for record in records:
+        record = flatten(record)
+        if buffers is None:
+            columns = list(columns or record)
+            buffers = {column: [] for column in columns}
+        for column, values in buffers.items():
+            values.append(record.get(column))
+        size += 1
+        if size == chunk_size:
+            yield buffers
+            buffers, size = {column: [] for column in columns}, 0
+    if size:
+        yield buffers
+
+
+def to_csv(records, file, columns: list = None, chunk_size: int = None):
+    """
+    Write records to CSV file with header row
+    :param file: Path or open text file
+    :return: Number of rows written
+    """
+    f = open(file, 'w', newline='') if isinstance(file, str) else file
+    try:
+        writer = csv.writer(f)
+        rows = 0
+        for chunk in iter_columns(records, columns, chunk_size):
+            if not rows:
+                writer.writerow(chunk)
+            writer.writerows(zip(*chunk.values()))
+            rows += len(next(iter(chunk.values())))
+        return rows
+    finally:
+        if f is not file:
+            f.close()
+
+
+def _unify(schema, other):
+    """
+    :param other: Schema or record batch
+    :return: schema of previous chunks widened to hold other, null columns take type of values and int64 becomes
+    double next to floats. Other differences raise TypeError
+    """
+    other = getattr(other, 'schema', other)
+    if schema is None:
+        return other
+    try:
+        return pyarrow.unify_schemas([schema, other], promote_options='permissive')
+    except (pyarrow.ArrowTypeError, pyarrow.ArrowInvalid) as e:
+        raise TypeError('Records change column types between chunks, pass schema: {}'.format(e)) from None
+
+
+def _nulls_as_strings(schema):
+    return pyarrow.schema([field.with_type(pyarrow.string()) if pyarrow.types.is_null(field.type) else field
+                           for field in schema])
+
+
+def iter_record_batches(records, columns: list = None, chunk_size: int = None, schema=None):
+    """
+    Collect records into Arrow record batches
+    Without schema types are inferred chunk by chunk and widened as records go, so batches can get wider types
+    than batches before them: columns with nulls only are of null type until values come and int64 columns become
+    double when floats come. Values are never cast with loss, TypeError or pyarrow.ArrowInvalid is raised instead
+    :param schema: pyarrow.Schema of all batches
+    :return: generator of pyarrow.RecordBatch
+    """
+    _require(pyarrow, 'pyarrow')
+    inferred = None
+    for chunk in iter_columns(records, columns, chunk_size):
+        batch = pyarrow.RecordBatch.from_pydict(chunk)
+        if schema is None:
+            inferred = _unify(inferred, batch)
+        yield batch.cast(schema or inferred)
+
+
+def to_arrow(records, columns: list = None, chunk_size: int = None, schema=None):
+    """
+    Convenience for small exports, whole table is held in memory. Large exports are written incrementally by
+    to_parquet or to_ipc
+    :return: pyarrow.Table made of record batches, see iter_record_batches. Batches are cast to types of the widest
+    one, columns with nulls only are strings
+    """
+    batches = list(iter_record_batches(records, columns, chunk_size, schema))
+    if not batches:
+        return pyarrow.table({column: [] for column in columns or []}, schema=schema)
+    if schema is None:
+        schema = _nulls_as_strings(batches[-1].schema)
+    return pyarrow.Table.from_batches([batch.cast(schema) for batch in batches], schema=schema)
+
+
+def _file_batches(records, columns: list, chunk_size: int, schema, sample_size: int):
+    """
+    Read ahead sample_size rows to infer schema of file, unless schema is given
+    :return: tuple (schema of file, generator of batches cast to it), schema is None when there are no records
+    """
+    batches = iter_record_batches(records, columns, chunk_size, schema)
+    head, rows = [], 0
+    for batch in batches:
+        head.append(batch)
+        rows += batch.num_rows
+        if rows >= (sample_size or SAMPLE_SIZE):
+            break
+    if not head:
+        return schema, iter(())
+    schema = schema or _nulls_as_strings(head[-1].schema)
+    return schema, _cast_batches(itertools.chain(head, batches), schema)
+
+
+def _cast_batches(batches, schema):
+    """
+    Cast batches to schema of file, which has to hold their values without loss (null to any type, int64 to double)
+    """
+    rows = 0
+    for batch in batches:
+        for field in batch.schema:
+            expected = schema.field(field.name)
+            try:
+                widened = _unify(pyarrow.schema([expected]), pyarrow.schema([field])).field(0).type
+            except TypeError:
+                widened = None
+            if widened != expected.type:
+                raise TypeError('Column {} changed type from {} to {} after {} rows, pass schema or larger '
+                                'sample_size'.format(field.name, expected.type, field.type, rows))
+        rows += batch.num_rows
+        yield batch.cast(schema)
+
+
+def _write_file(records, path: str, columns: list, chunk_size: int, schema, sample_size: int, open_writer):
+    """
+    Write batches into temporary file next to path which replaces path only when all records were written,
+    so failed export leaves no partial file behind
+    :param open_writer: Callable (path, schema) -> writer with write_batch used as context manager
+    :return: Number of rows written
+    """
+    _require(pyarrow, 'pyarrow')
+    fd, temporary = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+    os.close(fd)
+    try:
+        file_schema, batches = _file_batches(records, columns, chunk_size, schema, sample_size)
+        if file_schema is None:
+            file_schema = pyarrow.schema([(column, pyarrow.string()) for column in columns or []])
+        rows = 0
+        with open_writer(temporary, file_schema) as writer:
+            for batch in batches:
+                writer.write_batch(batch)
+                rows += batch.num_rows
+        os.replace(temporary, path)
+        return rows
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+def to_parquet(records, path: str, columns: list = None, chunk_size: int = None, schema=None,
+               compression: str = 'snappy', sample_size: int = None):
+    """
+    Write records to Parquet file one record batch at a time
+    Schema of file is inferred from first sample_size rows, columns with nulls only there are strings.
+    When later records need other types TypeError is raised, pass schema then
+    :param path: Path of file, replaced only when all records were written
+    :param compression: Parquet compression codec
+    :param sample_size: Number of rows read ahead to infer schema, default SAMPLE_SIZE
+    :return: Number of rows written
+    """
+    return _write_file(records, path, columns, chunk_size, schema, sample_size,
+                       lambda temporary, file_schema: pyarrow.parquet.ParquetWriter(temporary, file_schema,
+                                                                                    compression=compression))
+
+
+def to_ipc(records, path: str, columns: list = None, chunk_size: int = None, schema=None, stream: bool = False,
+           sample_size: int = None):
+    """
+    Write records to Arrow IPC file one record batch at a time, schema is inferred as by to_parquet
+        Examples:
+                to_ipc(account.contacts.export_contacts(), 'contacts.arrow')
+                pyarrow.feather.read_table('contacts.arrow')
+    :param path: Path of file, replaced only when all records were written
+    :param stream: Write IPC stream format instead of file format (Feather V2) which allows random access
+    :param sample_size: Number of rows read ahead to infer schema, default SAMPLE_SIZE
+    :return: Number of rows written
+    """
+    _require(pyarrow, 'pyarrow')
+    return _write_file(records, path, columns, chunk_size, schema, sample_size,
+                       pyarrow.ipc.new_stream if stream else pyarrow.ipc.new_file)
+
+
+def to_numpy(records, columns: list = None, chunk_size: int = None):
+    """
+    :return: dict {column: numpy.ndarray}, numeric columns get numeric dtype, the rest object dtype
+    """
+    _require(numpy, 'numpy')
+    parts = {}
+    for chunk in iter_columns(records, columns, chunk_size):
+        for column, values in chunk.items():
+            parts.setdefault(column, []).append(numpy.asarray(values, dtype=_dtype(values)))
+    return {column: numpy.concatenate(arrays) for column, arrays in parts.items()}
+
+
+def _dtype(values: list):
+    if all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in values):
+        return None
+    return object
+
+
+def to_pandas(records, columns: list = None, chunk_size: int = None):
+    """
+    :return: pandas.DataFrame, built through Arrow when pyarrow is installed
+    """
+    _require(pandas, 'pandas')
+    if pyarrow is not None:
+        return to_arrow(records, columns, chunk_size).to_pandas()
+    return pandas.DataFrame(to_numpy(records, columns, chunk_size))
@@ -1,21 +1,161 @@
 """A library that provides a Python interface to the GetResponse API"""
+import csv
+import hashlib
+import time
 import requests
+from requests.adapters import HTTPAdapter
 from collections import defaultdict
 import json
-from json.decoder import JSONDecodeError
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar, copy_context
+from itertools import islice
+
+from getresponse.codec import get_codec
+from getresponse.models import convert, Campaign, Contact, CustomField, FromField, Newsletter
+from getresponse.retry import RetryPolicy
+from getresponse.singleflight import SingleFlight
+from getresponse.streaming import iter_json_array, CHUNK_SIZE
+from getresponse.urls import build_url
+
+
+class GetresponseError(Exception):
+    """
+    Raised when API answers with error instead of expected data
+    """
+
+    def __init__(self, response, status_code: int = None):
+        super().__init__(response)
+        self.response = response
+        self.status_code = status_code
+
+
+class DeadlineExceeded(TimeoutError):
+    """
+    Raised when calls made within deadline() could not finish in time
+    """
+
+
+class Deadline:
+    """
+    Point in time by which calls have to finish, optionally with own connect/read timeouts for these calls
+    """
+
+    def __init__(self, seconds: float = None, timeout=None):
+        """
+        :param seconds: Seconds from now, None for no deadline
+        :param timeout: Connect/read timeouts replacing default timeout of client, see GetresponseClient
+        """
+        self.expires = time.monotonic() + seconds if seconds is not None else None
+        self.timeout = timeout
+
+    def remaining(self):
+        """
+        :return: Seconds left or None when there is no deadline
+        """
+        return None if self.expires is None else self.expires - time.monotonic()
+
+    def check(self, wait: float = 0.0):
+        """
+        Raise DeadlineExceeded when deadline passes before given wait is over
+        :param wait: Seconds caller is going to wait
+        :return: Seconds left or None when there is no deadline
+        """
+        remaining = self.remaining()
+        if remaining is not None and remaining <= wait:
+            raise DeadlineExceeded('Deadline exceeded, {:.3f}s left, {:.3f}s needed'.format(max(remaining, 0), wait))
+        return remaining
+
+
+_current_deadline = ContextVar('getresponse_deadline', default=None)
+
+
+@contextmanager
+def deadline(seconds: float = None, timeout=None):
+    """
+    Bound all calls made inside with block, including retries, rate limiter waits and prefetched pages
+    Nested deadline can only make outer one shorter
+    Examples:
+            with deadline(600):
+                contacts = list(campaigns.iter_campaign_contacts('O'))
+            with deadline(timeout=(1, 5)):
+                contact = contacts.get_contact('a')
+    :param seconds: Seconds for whole block, None for no deadline
+    :param timeout: Connect/read timeouts for calls in block, either number or tuple (connect, read)
+    :return: Deadline
+    """
+    outer = _current_deadline.get()
+    current = Deadline(seconds, timeout)
+    if outer is not None:
+        if outer.expires is not None and (current.expires is None or outer.expires < current.expires):
+            current.expires = outer.expires
+        if timeout is None:
+            current.timeout = outer.timeout
+    token = _current_deadline.set(current)
+    try:
+        yield current
+    finally:
+        _current_deadline.reset(token)
+
+
+def _call_timeout(timeout, remaining: float = None):
+    """
+    Timeout for single call, bounded by time left until deadline
+    :param timeout: Number or tuple (connect, read)
+    :param remaining: Seconds left until deadline or None
+    :return: tuple (connect, read)
+    """
+    connect, read = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+    if remaining is not None:
+        connect, read = min(connect, remaining), min(read, remaining)
+    return connect, read
+
+
+def _next_page(items, headers, page: int):
+    """
+    Decide which page of list endpoint should be fetched after given one
+    TotalPages header is used when API sends it, otherwise empty page ends iteration
+    :param items: Decoded body of page
+    :param headers: Headers of page response
+    :param page: Number of fetched page
+    :return: Number of next page or None when fetched page was the last one
+    """
+    if not isinstance(items, list):
+        raise GetresponseError(items)
+    return _following_page(headers, page, empty=not items)
+
+
+def _following_page(headers, page: int, empty: bool):
+    """
+    Same as _next_page for page whose items were not kept, e.g. streamed ones
+    :param empty: True when page had no items
+    """
+    total_pages = headers.get('TotalPages')
+    if total_pages is not None:
+        return page + 1 if page < int(total_pages) else None
+    return None if empty else page + 1
 
 
 class GetresponseClient:
     """
     Base class which does requests calls
+    All calls go through one requests.Session so TCP/TLS connections to the API are kept alive and reused
     """
     API_ENDPOINT = 'https://api.getresponse.com/v3'
     API_KEY = None
     X_DOMAIN = None
     X_TIME_ZONE = None
     HEADERS = None
+    POOL_CONNECTIONS = 10
+    POOL_MAXSIZE = 10
+    CONNECT_TIMEOUT = 5
+    READ_TIMEOUT = 60
 
-    def __init__(self, api_endpoint: str, api_key: str, x_domain: str = None, x_time_zone: str = None):
+    def __init__(self, api_endpoint: str, api_key: str, x_domain: str = None, x_time_zone: str = None,
+                 pool_connections: int = None, pool_maxsize: int = None, pool_block: bool = False,
+                 rate_limiter=None, retry_policy: RetryPolicy = None, timeout=None, cache=None,
+                 coalesce: bool = False, codec=None):
         """
         Initiation of Client object
         :param api_endpoint: API Endpoint - http://apidocs.getresponse.com/v3
@@ -26,34 +166,342 @@ class GetresponseClient:
         Account url for GetResponse 360 without http,https and www
         :param x_time_zone: TZ column from https://en.wikipedia.org/wiki/List_of_tz_database_time_zones
         The default timezone in response data is UTC
+        :param pool_connections: Number of host pools to cache, default POOL_CONNECTIONS
+        :param pool_maxsize: Maximum number of keep-alive connections per host, default POOL_MAXSIZE.
+        Should be at least the number of threads sharing this client
+        :param pool_block: Block when no free connection is available instead of opening a throwaway one
+        :param rate_limiter: getresponse.ratelimit.RateLimiter or FileRateLimiter pacing all calls of this client
+        :param retry_policy: Policy for retrying transient failures, default RetryPolicy().
+        RetryPolicy(max_attempts=1) disables retries
+        :param timeout: Default timeout of calls in seconds, either number or tuple (connect, read).
+        Default (CONNECT_TIMEOUT, READ_TIMEOUT). Can be overridden per call or for block of calls with deadline()
+        :param cache: getresponse.cache.ResponseCache for responses of get, entries related to resource are
+        invalidated by successful post and delete. Expired entries are revalidated with ETag/Last-Modified
+        :param coalesce: Make identical get calls issued concurrently from several threads share one request.
+        Followers receive the same object as the first caller and are bound by its timeout
+        :param codec: JSON codec for request and response bodies, see getresponse.codec.get_codec.
+        Default is standard library json, 'auto' picks orjson or ujson when installed
         """
         self.API_ENDPOINT = api_endpoint
         self.API_KEY = api_key
         self.X_DOMAIN = x_domain
         self.X_TIME_ZONE = x_time_zone
+        self.HEADERS = self._build_headers(api_key, x_domain)
+        self.session = self._create_session(pool_connections or self.POOL_CONNECTIONS,
+                                            pool_maxsize or self.POOL_MAXSIZE, pool_block)
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.timeout = timeout or (self.CONNECT_TIMEOUT, self.READ_TIMEOUT)
+        self.cache = cache
+        self.single_flight = SingleFlight() if coalesce else None
+        self.codec = get_codec(codec)
+        self._cache_prefix = '{}|{}|{}'.format(x_domain or '', hashlib.sha256(api_key.encode()).hexdigest()[:16],
+                                               api_endpoint)
+
+    @staticmethod
+    def _build_headers(api_key: str, x_domain: str = None):
+        """
+        Headers sent with every call
+        :param api_key: API key
+        :param x_domain: Account url for GetResponse 360
+        :return: dict
+        """
         if x_domain:
-            self.HEADERS = {'X-Auth-Token': 'api-key ' + self.API_KEY, 'X-DOMAIN': self.X_DOMAIN,
-                            'Content-Type': 'application/json'}
-        else:
-            self.HEADERS = {'X-Auth-Token': 'api-key ' + self.API_KEY, 'Content-Type': 'application/json'}
+            return {'X-Auth-Token': 'api-key ' + api_key, 'X-DOMAIN': x_domain, 'Content-Type': 'application/json'}
+        return {'X-Auth-Token': 'api-key ' + api_key, 'Content-Type': 'application/json'}
+
+    @staticmethod
+    def _create_session(pool_connections: int, pool_maxsize: int, pool_block: bool):
+        """
+        Create session with pooled keep-alive adapter mounted for both schemes
+        :param pool_connections: Number of host pools to cache
+        :param pool_maxsize: Maximum number of connections per host
+        :param pool_block: Block when pool is exhausted
+        :return: requests.Session
+        """
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, pool_block=pool_block)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def close(self):
+        """
+        Close all pooled connections
+        """
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _request(self, method: str, url: str, idempotent: bool = None, timeout=None, headers: dict = None,
+                 **kwargs):
+        """
+        Make call through session, waiting for rate limiter first when it is set
+        Transient failures are retried according to retry_policy, all attempts have to fit into current deadline
+        :param method: get, post or delete
+        :param url: Url relative to API_ENDPOINT
+        :param idempotent: Overrides idempotency derived from method, see RetryPolicy.should_retry
+        :param timeout: Overrides timeout of client and of current deadline
+        :param headers: Extra headers for this call
+        :return: requests.Response
+        """
+        headers = dict(self.HEADERS, **headers) if headers else self.HEADERS
+        current = _current_deadline.get()
+        timeout = timeout or (current and current.timeout) or self.timeout
+        attempt = 1
+        while True:
+            if self.rate_limiter is not None:
+                self.sleep(self.rate_limiter.reserve(), current)
+            remaining = current.check() if current else None
+            try:
+                r = getattr(self.session, method)(self.API_ENDPOINT + url, headers=headers,
+                                                  timeout=_call_timeout(timeout, remaining), **kwargs)
+            except requests.exceptions.RequestException as e:
+                sent = not isinstance(e, requests.exceptions.ConnectTimeout)
+                if not self.retry_policy.should_retry(method, attempt, sent=sent, idempotent=idempotent,
+                                                      reason=type(e).__name__):
+                    raise
+                self.sleep(self.retry_policy.delay(attempt), current)
+                attempt += 1
+                continue
+            if self.rate_limiter is not None:
+                self.rate_limiter.update(r.headers)
+            if not self.retry_policy.should_retry(method, attempt, status=r.status_code, idempotent=idempotent):
+                return r
+            r.close()
+            self.sleep(self.retry_policy.delay(attempt, r.headers.get('Retry-After')), current)
+            attempt += 1
+
+    @staticmethod
+    def sleep(seconds: float, current: Deadline = None):
+        """
+        Sleep unless it would outlast current deadline, in which case DeadlineExceeded is raised right away
+        Used for rate limiter waits, retry backoff and polling of sections, e.g. Imports.wait_import
+        :param seconds: Seconds to sleep
+        :param current: Deadline of caller or None
+        """
+        if current is not None:
+            current.check(seconds)
+        if seconds:
+            time.sleep(seconds)
+
+    def _get(self, url: str, timeout=None, headers: dict = None):
+        return self._request('get', url, timeout=timeout, headers=headers)
+
+    def _json(self, r):
+        """
+        Decode JSON body with codec, raising GetresponseError when API answered with something else,
+        e.g. HTML error page
+        """
+        try:
+            return self.codec.decode_response(r)
+        except ValueError:
+            raise GetresponseError(r.text, r.status_code)
+
+    def _encode(self, data):
+        """
+        Encode body of request with codec, str and bytes are sent as they are
+        """
+        if data is None or isinstance(data, (str, bytes)):
+            return data
+        return self.codec.dumps(data)
+
+    def get(self, url: str, timeout=None):
+        if self.single_flight is not None:
+            return self.single_flight.do(url, lambda: self._get_cached(url, timeout), _current_deadline.get())
+        return self._get_cached(url, timeout)
+
+    def _get_cached(self, url: str, timeout=None):
+        if self.cache is None:
+            return self._json(self._get(url, timeout=timeout))
+        key = self._cache_prefix + url
+        found, result = self.cache.get(key)
+        if found:
+            return result
+        r = self._get(url, timeout=timeout, headers=self.cache.validators(key))
+        if r.status_code == 304:
+            found, result = self.cache.refresh(key, url)
+            if found:
+                return result
+            r = self._get(url, timeout=timeout)
+        result = self._json(r)
+        if r.status_code == 200:
+            self.cache.set(key, url, result, size=len(r.content), etag=r.headers.get('ETag'),
+                           last_modified=r.headers.get('Last-Modified'))
+        return result
+
+    def _invalidate(self, url: str, r):
+        """
+        Drop cached entries related to url after successful write
+        """
+        if self.cache is not None and r.status_code < 400:
+            self.cache.invalidate(url)
 
-    def get(self, url: str):
-        r = requests.get(self.API_ENDPOINT + url, headers=self.HEADERS)
-        return r.json()
+    def get_page(self, url: str, timeout=None):
+        """
+        Get one page of list endpoint together with response headers which carry paging information
+        :param url: Url of page
+        :param timeout: Overrides timeout of client
+        :return: tuple (JSON response, headers)
+        """
+        r = self._get(url, timeout=timeout)
+        return self._json(r), r.headers
+
+    def stream_page(self, url: str, timeout=None):
+        """
+        Get one page of list endpoint decoding body incrementally, so only one item is held in memory at a time
+        Response cache is bypassed. Connection is released once items are exhausted or generator is closed
+        :param url: Url of page
+        :param timeout: Overrides timeout of client
+        :return: tuple (generator of items, headers)
+        """
+        r = self._request('get', url, timeout=timeout, stream=True)
+        if r.status_code != 200:
+            try:
+                raise GetresponseError(self._json(r), r.status_code)
+            finally:
+                r.close()
+        return self._stream_items(r), r.headers
+
+    @staticmethod
+    def _stream_items(r):
+        try:
+            yield from iter_json_array(r.iter_content(CHUNK_SIZE))
+        finally:
+            r.close()
+
+    def iter_stream(self, url_for_page, start_page: int = 1):
+        """
+        Iterate over items of list endpoint decoding every page incrementally, see stream_page
+        Unlike paginate next page is not prefetched, peak memory is one item instead of two pages
+        :param url_for_page: Callable which returns url for given page number
+        :param start_page: Number of first page to fetch
+        :return: generator of items
+        """
+        page = start_page
+        while page:
+            items, headers = self.stream_page(url_for_page(page))
+            empty = True
+            for item in items:
+                empty = False
+                yield item
+            page = _following_page(headers, page, empty)
+
+    def _submit_page(self, executor: ThreadPoolExecutor, url: str):
+        """
+        Fetch page on executor thread, bounded by deadline of calling thread
+        :return: Future of get_page result
+        """
+        return executor.submit(copy_context().run, self.get_page, url)
+
+    def paginate(self, url_for_page, start_page: int = 1):
+        """
+        Iterate over items of list endpoint page by page
+        While caller consumes one page, next one is fetched in background, so at most two pages are held in memory
+        :param url_for_page: Callable which returns url for given page number
+        :param start_page: Number of first page to fetch
+        :return: generator of items
+        """
+        executor = ThreadPoolExecutor(max_workers=1)
+        try:
+            page = start_page
+            future = self._submit_page(executor, url_for_page(page))
+            while future is not None:
+                items, headers = future.result()
+                next_page = _next_page(items, headers, page)
+                future = self._submit_page(executor, url_for_page(next_page)) if next_page else None
+                yield from items
+                page = next_page
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def fetch_pages(self, url_for_page, max_workers: int = 8, ordered: bool = True, max_in_flight: int = None):
+        """
+        Fetch all pages of list endpoint in parallel
+        First page tells how many pages there are, the rest are spread over thread pool.
+        If API does not send TotalPages header pages are fetched one by one
+        :param url_for_page: Callable which returns url for given page number
+        :param max_workers: Number of threads fetching pages
+        :param ordered: Yield pages in page order if True, otherwise as soon as each page is fetched
+        :param max_in_flight: Maximum number of pages requested or waiting to be consumed, bounds memory.
+        Default is twice max_workers
+        :return: generator of tuples (page number, list of items)
+        """
+        items, headers = self.get_page(url_for_page(1))
+        next_page = _next_page(items, headers, 1)
+        yield 1, items
+        total_pages = headers.get('TotalPages')
+        if total_pages is None:
+            while next_page:
+                page = next_page
+                items, headers = self.get_page(url_for_page(page))
+                next_page = _next_page(items, headers, page)
+                yield page, items
+            return
+        pages = iter(range(2, int(total_pages) + 1))
+        max_in_flight = max_in_flight or max_workers * 2
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        pending = deque()
+        try:
+            while True:
+                for page in pages:
+                    pending.append((page, self._submit_page(executor, url_for_page(page))))
+                    if len(pending) >= max_in_flight:
+                        break
+                if not pending:
+                    return
+                if ordered:
+                    page, future = pending.popleft()
+                else:
+                    wait([future for _, future in pending], return_when=FIRST_COMPLETED)
+                    page, future = next((page, future) for page, future in pending if future.done())
+                    pending.remove((page, future))
+                items, headers = future.result()
+                _next_page(items, headers, page)
+                yield page, items
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def fetch_all(self, url_for_page, max_workers: int = 8, ordered: bool = True, max_in_flight: int = None):
+        """
+        Fetch all items of list endpoint with pages requested in parallel, see fetch_pages for arguments
+        :return: generator of items
+        """
+        for _, items in self.fetch_pages(url_for_page, max_workers=max_workers, ordered=ordered,
+                                         max_in_flight=max_in_flight):
+            yield from items
+
+    def post_response(self, url: str, data: json, idempotent: bool = False, timeout=None):
+        """
+        Same as post but returns requests.Response for callers which need status code of the call
+        :return: requests.Response
+        """
+        r = self._request('post', url, idempotent=idempotent, timeout=timeout, data=self._encode(data))
+        self._invalidate(url, r)
+        return r
 
-    def post(self, url: str, data: json):
-        r = requests.post(self.API_ENDPOINT + url, data=data, headers=self.HEADERS)
+    def post(self, url: str, data: json, idempotent: bool = False, timeout=None):
+        """
+        :param data: Body, either already serialized str or bytes, or object encoded with codec of client
+        :return: JSON response or text when response is not JSON
+        """
+        r = self.post_response(url, data, idempotent=idempotent, timeout=timeout)
         try:
-            result = r.json()
-        except JSONDecodeError:
+            result = self.codec.decode_response(r)
+        except ValueError:
             result = r.text
         return result
 
-    def delete(self, url: str, data: json = None):
+    def delete(self, url: str, data: json = None, timeout=None):
         if data:
-            r = requests.delete(self.API_ENDPOINT + url, data=data, headers=self.HEADERS)
+            r = self._request('delete', url, timeout=timeout, data=self._encode(data))
         else:
-            r = requests.delete(self.API_ENDPOINT + url, headers=self.HEADERS)
+            r = self._request('delete', url, timeout=timeout)
+        self._invalidate(url, r)
         return r.text
 
 
@@ -63,11 +511,23 @@ class Campaigns:
     http://apidocs.getresponse.com/v3/resources/campaigns
     """
 
-    def __init__(self, api_endpoint: str, api_key: str, x_domain: str = None, x_time_zone: str = None):
-        self._getresponse_client = GetresponseClient(api_endpoint=api_endpoint, api_key=api_key, x_domain=x_domain,
-                                                     x_time_zone=x_time_zone)
+    def __init__(self, api_endpoint: str = None, api_key: str = None, x_domain: str = None, x_time_zone: str = None,
+                 client: GetresponseClient = None):
+        """
+        :param client: Existing client to share, api_endpoint, api_key, x_domain and x_time_zone are ignored then
+        """
+        self._getresponse_client = client or GetresponseClient(api_endpoint=api_endpoint, api_key=api_key,
+                                                               x_domain=x_domain, x_time_zone=x_time_zone)
 
-    def get_campaigns(self, query: list = None, sort: list = None, **kwargs):
+    @staticmethod
+    def _campaigns_url(query: list = None, sort: list = None, **kwargs):
+        """
+        Build url for get_campaigns
+        :return: str
+        """
+        return build_url('/campaigns', query, sort, kwargs)
+
+    def get_campaigns(self, query: list = None, sort: list = None, model: bool = False, **kwargs):
         """
         Get all campaigns within account
         http://apidocs.getresponse.com/v3/resources/campaigns#campaigns.get.all
@@ -89,33 +549,35 @@ class Campaigns:
             - fields: List of fields that should be returned. Id is always returned. Fields should be separated by comma
             - page: Specify which page of results return. :type: int
             - perPage: Specify how many results per page should be returned :type: int
+        :param model: Return Campaign objects instead of dicts, see getresponse.models
         :return: JSON response
         """
-        url = str('/campaigns?')
-        if query:
-            for item in query:
-                query_data = str(item).split('=')
-                url = url + 'query[' + query_data[0] + ']=' + query_data[1] + '&'
-        if sort:
-            for item in sort:
-                sort_data = str(item).split('=')
-                url = url + 'sort[' + sort_data[0] + ']=' + sort_data[1] + '&'
-        if kwargs:
-            for key, value in kwargs.items():
-                url = url + str(key) + '=' + str(value) + '&'
-        url = url[:-1]  # get rid of last &
-        r = self._getresponse_client.get(url)
-        return r
+        r = self._getresponse_client.get(self._campaigns_url(query, sort, **kwargs))
+        return convert(r, model, Campaign)
+
+    def iter_campaigns(self, query: list = None, sort: list = None, per_page: int = 100, model: bool = False, **kwargs):
+        """
+        Iterate over all campaigns within account
+        Pages are fetched lazily and next page is prefetched while current one is consumed
+        :param per_page: Number of items fetched per call
+        :param model: Return Campaign objects instead of dicts, see getresponse.models
+        Other arguments are the same as for get_campaigns
+        :return: generator of items
+        """
+        r = self._getresponse_client.paginate(
+            lambda page: self._campaigns_url(query, sort, **dict(kwargs, page=page, perPage=per_page)))
+        return convert(r, model, Campaign)
 
-    def get_campaign(self, campaign_id: str):
+    def get_campaign(self, campaign_id: str, model: bool = False):
         """
         Get campaign details by id
         http://apidocs.getresponse.com/v3/resources/campaigns#campaigns.get
         :param campaign_id: Id of campaign
+        :param model: Return Campaign object instead of dict, see getresponse.models
         :return: JSON response
         """
         r = self._getresponse_client.get('/campaigns/' + campaign_id)
-        return r
+        return convert(r, model, Campaign)
 
     @staticmethod
     def _get_confirmation(from_field: dict, reply_to: dict, redirect_type: str, redirect_url: str = None):
@@ -214,7 +676,7 @@ class Campaigns:
         data['name'] = name
         for key, value in kwargs.items():
             data[key] = value
-        r = self._getresponse_client.post('/campaigns', data=json.dumps(data))
+        r = self._getresponse_client.post('/campaigns', data=data)
         return r
 
     def update_campaign(self, campaign_id: str, **kwargs):
@@ -236,10 +698,19 @@ class Campaigns:
         data = defaultdict()
         for key, value in kwargs.items():
             data[key] = value
-        r = self._getresponse_client.post('/campaigns/' + campaign_id, data=json.dumps(data))
+        r = self._getresponse_client.post('/campaigns/' + campaign_id, data=data, idempotent=True)
         return r
 
-    def get_campaign_contacts(self, campaign_id: str, query: list = None, sort: list = None, **kwargs):
+    @staticmethod
+    def _campaign_contacts_url(campaign_id: str, query: list = None, sort: list = None, **kwargs):
+        """
+        Build url for get_campaign_contacts
+        :return: str
+        """
+        return build_url('/campaigns/' + campaign_id + '/contacts', query, sort, kwargs)
+
+    def get_campaign_contacts(self, campaign_id: str, query: list = None, sort: list = None, model: bool = False,
+                              **kwargs):
         """
         Allows to retrieve all contacts from given campaigns. Standard sorting and filtering apply.
         http://apidocs.getresponse.com/v3/resources/campaigns#campaigns.contacts.get
@@ -267,23 +738,48 @@ class Campaigns:
             - fields: List of fields that should be returned. Id is always returned. Fields should be separated by comma
             - page: Specify which page of results return. :type: int
             - perPage: Specify how many results per page should be returned :type: int
+        :param model: Return Contact objects instead of dicts, see getresponse.models
         :return: JSON response
         """
-        url = str('/campaigns/' + campaign_id + '/contacts?')
-        if query:
-            for item in query:
-                query_data = str(item).split('=')
-                url = url + 'query[' + query_data[0] + ']=' + query_data[1] + '&'
-        if sort:
-            for item in sort:
-                sort_data = str(item).split('=')
-                url = url + 'sort[' + sort_data[0] + ']=' + sort_data[1] + '&'
-        if kwargs:
-            for key, value in kwargs.items():
-                url = url + str(key) + '=' + str(value) + '&'
-        url = url[:-1]  # get rid of last &
-        r = self._getresponse_client.get(url)
-        return r
+        r = self._getresponse_client.get(self._campaign_contacts_url(campaign_id, query, sort, **kwargs))
+        return convert(r, model, Contact)
+
+    def iter_campaign_contacts(self, campaign_id: str, query: list = None, sort: list = None, per_page: int = 100,
+                               stream: bool = False, model: bool = False, **kwargs):
+        """
+        Iterate over all contacts of given campaign
+        Pages are fetched lazily and next page is prefetched while current one is consumed
+        :param per_page: Number of items fetched per call
+        :param stream: Decode every page incrementally without prefetching, keeps one contact in memory instead of
+        two pages. Useful with large per_page, not supported by asyncio sections
+        :param model: Return Contact objects instead of dicts, see getresponse.models
+        Other arguments are the same as for get_campaign_contacts
+        :return: generator of items
+        """
+        client = self._getresponse_client
+        r = (client.iter_stream if stream else client.paginate)(
+            lambda page: self._campaign_contacts_url(campaign_id, query, sort,
+                                                     **dict(kwargs, page=page, perPage=per_page)))
+        return convert(r, model, Contact)
+
+    def export_campaign_contacts(self, campaign_id: str, query: list = None, sort: list = None, per_page: int = 1000,
+                                 max_workers: int = 8, ordered: bool = True, max_in_flight: int = None,
+                                 model: bool = False, **kwargs):
+        """
+        Fetch all contacts of given campaign with pages requested in parallel
+        :param per_page: Number of contacts fetched per call
+        :param max_workers: Number of threads fetching pages
+        :param ordered: Keep page order if True, otherwise yield pages as soon as they arrive
+        :param max_in_flight: Maximum number of pages requested or waiting to be consumed
+        :param model: Return Contact objects instead of dicts, see getresponse.models
+        Other arguments are the same as for get_campaign_contacts
+        :return: generator of contacts
+        """
+        r = self._getresponse_client.fetch_all(
+            lambda page: self._campaign_contacts_url(campaign_id, query, sort,
+                                                     **dict(kwargs, page=page, perPage=per_page)),
+            max_workers=max_workers, ordered=ordered, max_in_flight=max_in_flight)
+        return convert(r, model, Contact)
 
     def get_campaign_blacklist(self, campaign_id: str, mask: str):
         """
@@ -294,7 +790,7 @@ class Campaigns:
         :param mask: Blacklist mask to search for
         :return: JSON response
         """
-        r = self._getresponse_client.get('/campaigns/' + campaign_id + '/blacklists?query[mask]=' + mask)
+        r = self._getresponse_client.get(build_url('/campaigns/' + campaign_id + '/blacklists', ['mask=' + mask]))
         return r
 
     def post_campaign_blacklist(self, campaign_id: str, mask: list):
@@ -307,23 +803,21 @@ class Campaigns:
         :return: JSON response
         """
         data = {'masks': mask}
-        r = self._getresponse_client.post('/campaigns/' + campaign_id + '/blacklists', data=json.dumps(data))
+        r = self._getresponse_client.post('/campaigns/' + campaign_id + '/blacklists', data=data,
+                                          idempotent=True)
         return r
 
     @staticmethod
-    def _prepare_url_from_query(url: str, query: list, campaign_id: str):
+    def _statistics_url(name: str, query: list, campaign_id: str, fields: str = None):
         """
-        Method to populate url with query and campaign id
-        :param url: str
+        Build url for get_campaigns_statistics_* methods
+        :param name: Last segment of path, e.g. list-size
         :param query: list like this ['createdOn][from]=2017-03-10', 'groupBy=hour' ]
-        :param campaign_id: Id of campaign.
-        :return:
+        :param campaign_id: Id of campaign, or ids separated by comma
+        :return: str
         """
-        url = url + 'query[campaignId]=' + campaign_id + '&'
-        for item in query:
-            query_data = str(item).split('=')
-            url = url + 'query[' + query_data[0] + ']=' + query_data[1] + '&'
-        return url
+        return build_url('/campaigns/statistics/' + name, ['campaignId=' + campaign_id] + list(query),
+                         params={'fields': fields})
 
     def get_campaigns_statistics_list_size(self, query: list, campaign_id: str, fields: str = None):
         """
@@ -347,13 +841,7 @@ class Campaigns:
         :param campaign_id: Id of campaign. For multiple campaigns can be separated by comma like O,323fD,ddeE
         :return: JSON response
         """
-        url = str('/campaigns/statistics/list-size?')
-        url = Campaigns._prepare_url_from_query(url, query, campaign_id)
-        if fields:
-            url += 'fields=' + fields
-        else:
-            url = url[:-1]  # get rid of last &
-        r = self._getresponse_client.get(url)
+        r = self._getresponse_client.get(self._statistics_url('list-size', query, campaign_id, fields))
         return r
 
     def get_campaigns_statistics_locations(self, query: list, campaign_id: str, fields: str = None):
@@ -378,13 +866,7 @@ class Campaigns:
         :param campaign_id: Id of campaign. For multiple campaigns can be separated by comma like O,323fD,ddeE
         :return: JSON response
         """
-        url = str('/campaigns/statistics/locations?')
-        url = Campaigns._prepare_url_from_query(url, query, campaign_id)
-        if fields:
-            url += 'fields=' + fields
-        else:
-            url = url[:-1]  # get rid of last &
-        r = self._getresponse_client.get(url)
+        r = self._getresponse_client.get(self._statistics_url('locations', query, campaign_id, fields))
         return r
 
     def get_campaigns_statistics_origins(self, query: list, campaign_id: str, fields: str = None):
@@ -409,13 +891,7 @@ class Campaigns:
         :param campaign_id: Id of campaign. For multiple campaigns can be separated by comma like O,323fD,ddeE
         :return: JSON response
         """
-        url = str('/campaigns/statistics/origins?')
-        url = Campaigns._prepare_url_from_query(url, query, campaign_id)
-        if fields:
-            url += 'fields=' + fields
-        else:
-            url = url[:-1]  # get rid of last &
-        r = self._getresponse_client.get(url)
+        r = self._getresponse_client.get(self._statistics_url('origins', query, campaign_id, fields))
         return r
 
     def get_campaigns_statistics_removals(self, query: list, campaign_id: str, fields: str = None):
@@ -440,13 +916,7 @@ class Campaigns:
         :param campaign_id: Id of campaign. For multiple campaigns can be separated by comma like O,323fD,ddeE
         :return: JSON response
         """
-        url = str('/campaigns/statistics/removals?')
-        url = Campaigns._prepare_url_from_query(url, query, campaign_id)
-        if fields:
-            url += 'fields=' + fields
-        else:
-            url = url[:-1]  # get rid of last &
-        r = self._getresponse_client.get(url)
+        r = self._getresponse_client.get(self._statistics_url('removals', query, campaign_id, fields))
         return r
 
     def get_campaigns_statistics_subscriptions(self, query: list, campaign_id: str, fields: str = None):
@@ -471,13 +941,7 @@ class Campaigns:
         :param campaign_id: Id of campaign. For multiple campaigns can be separated by comma like O,323fD,ddeE
         :return: JSON response
         """
-        url = str('/campaigns/statistics/subscriptions?')
-        url = Campaigns._prepare_url_from_query(url, query, campaign_id)
-        if fields:
-            url += 'fields=' + fields
-        else:
-            url = url[:-1]  # get rid of last &
-        r = self._getresponse_client.get(url)
+        r = self._getresponse_client.get(self._statistics_url('subscriptions', query, campaign_id, fields))
         return r
 
     def get_campaigns_statistics_balance(self, query: list, campaign_id: str, fields: str = None):
@@ -502,13 +966,7 @@ class Campaigns:
         :param campaign_id: Id of campaign. For multiple campaigns can be separated by comma like O,323fD,ddeE
         :return: JSON response
         """
-        url = str('/campaigns/statistics/balance?')
-        url = Campaigns._prepare_url_from_query(url, query, campaign_id)
-        if fields:
-            url += 'fields=' + fields
-        else:
-            url = url[:-1]  # get rid of last &
-        r = self._getresponse_client.get(url)
+        r = self._getresponse_client.get(self._statistics_url('balance', query, campaign_id, fields))
         return r
 
     def get_campaigns_statistics_summary(self, campaign_id_list: str, fields: str = None):
@@ -519,13 +977,7 @@ class Campaigns:
         :param fields: List of fields that should be returned. Id is always returned. Fields should be separated by comma
         :return: JSON response
         """
-        url = str('/campaigns/statistics/summary?')
-        url = Campaigns._prepare_url_from_query(url, [], campaign_id_list)
-        if fields:
-            url += 'fields=' + fields
-        else:
-            url = url[:-1]  # get rid of last &
-        r = self._getresponse_client.get(url)
+        r = self._getresponse_client.get(self._statistics_url('summary', [], campaign_id_list, fields))
         return r
 
 
@@ -535,11 +987,24 @@ class FromFields(object):
     http://apidocs.getresponse.com/v3/resources/fromfields
     """
 
-    def __init__(self, api_endpoint: str, api_key: str, x_domain: str = None, x_time_zone: str = None):
-        self._getresponse_client = GetresponseClient(api_endpoint=api_endpoint, api_key=api_key, x_domain=x_domain,
-                                                     x_time_zone=x_time_zone)
+    def __init__(self, api_endpoint: str = None, api_key: str = None, x_domain: str = None, x_time_zone: str = None,
+                 client: GetresponseClient = None):
+        """
+        :param client: Existing client to share, api_endpoint, api_key, x_domain and x_time_zone are ignored then
+        """
+        self._getresponse_client = client or GetresponseClient(api_endpoint=api_endpoint, api_key=api_key,
+                                                               x_domain=x_domain, x_time_zone=x_time_zone)
 
-    def get_from_fields(self, query: list = None, **kwargs):
+    @staticmethod
+    def _from_fields_url(query: list = None, **kwargs):
+        """
+        Build url for get_from_fields
+        :return: str
+        """
+        return build_url('/from-fields', query, params={('sort[createdOn]' if key == 'sort' else key): value
+                                              for key, value in kwargs.items()})
+
+    def get_from_fields(self, query: list = None, model: bool = False, **kwargs):
         """
         Get all from fields within account
         http://apidocs.getresponse.com/v3/resources/fromfields#fromfields.get.all
@@ -564,35 +1029,36 @@ class FromFields(object):
                        Number results on page
                        - page: :type: int
                        Page number
+        :param model: Return FromField objects instead of dicts, see getresponse.models
         :return: JSON response
         """
-        url = '/from-fields?'
-        if query:
-            for item in query:
-                query_data = str(item).split('=')
-                url = url + 'query[' + query_data[0] + ']=' + query_data[1] + '&'
-        for key, value in kwargs.items():
-            if key == 'sort':
-                url = url + key + '[createdOn]=' + value + '&'
-            else:
-                url = url + key + '=' + value + '&'
-        url = url[:-1]  # get rid of last & or ?
-        r = self._getresponse_client.get(url)
-        return r
+        r = self._getresponse_client.get(self._from_fields_url(query, **kwargs))
+        return convert(r, model, FromField)
 
-    def get_from_field(self, field_id: str, fields: str = None):
+    def iter_from_fields(self, query: list = None, per_page: int = 100, model: bool = False, **kwargs):
+        """
+        Iterate over all from fields within account
+        Pages are fetched lazily and next page is prefetched while current one is consumed
+        :param per_page: Number of items fetched per call
+        :param model: Return FromField objects instead of dicts, see getresponse.models
+        Other arguments are the same as for get_from_fields
+        :return: generator of items
+        """
+        r = self._getresponse_client.paginate(
+            lambda page: self._from_fields_url(query, **dict(kwargs, page=str(page), perPage=str(per_page))))
+        return convert(r, model, FromField)
+
+    def get_from_field(self, field_id: str, fields: str = None, model: bool = False):
         """
         This method returns from field by fromfieldId.
         http://apidocs.getresponse.com/v3/resources/fromfields#fromfields.get
         :param field_id: Id of the field to return
         :param fields: List of fields that should be returned. Fields should be separated by comma
+        :param model: Return FromField object instead of dict, see getresponse.models
         :return: JSON response
         """
-        url = '/from-fields/' + field_id
-        if fields:
-            url += '?fields=' + fields
-        r = self._getresponse_client.get(url)
-        return r
+        r = self._getresponse_client.get(build_url('/from-fields/' + field_id, params={'fields': fields}))
+        return convert(r, model, FromField)
 
     def post_from_field(self, name: str, email: str):
         """
@@ -604,7 +1070,7 @@ class FromFields(object):
         """
         url = '/from-fields'
         data = {'name': name, 'email': email}
-        r = self._getresponse_client.post(url, data=json.dumps(data))
+        r = self._getresponse_client.post(url, data=data)
         return r
 
     def delete_or_replace_from_field(self, from_field_id: str, replace_id: str = None):
@@ -618,7 +1084,7 @@ class FromFields(object):
         url = '/from-fields/' + from_field_id
         if replace_id:
             data = {'fromFieldIdToReplaceWith': replace_id}
-            r = self._getresponse_client.delete(url, data=json.dumps(data))
+            r = self._getresponse_client.delete(url, data=data)
         else:
             r = self._getresponse_client.delete(url)
         return r
@@ -632,7 +1098,7 @@ class FromFields(object):
         :return: JSON response
         """
         url = '/from-fields/' + from_field_id + '/default'
-        r = self._getresponse_client.post(url, data=None)
+        r = self._getresponse_client.post(url, data=None, idempotent=True)
         return r
 
 
@@ -642,11 +1108,24 @@ class CustomFields:
     http://apidocs.getresponse.com/v3/resources/customfields
     """
 
-    def __init__(self, api_endpoint: str, api_key: str, x_domain: str = None, x_time_zone: str = None):
-        self._getresponse_client = GetresponseClient(api_endpoint=api_endpoint, api_key=api_key, x_domain=x_domain,
-                                                     x_time_zone=x_time_zone)
+    def __init__(self, api_endpoint: str = None, api_key: str = None, x_domain: str = None, x_time_zone: str = None,
+                 client: GetresponseClient = None):
+        """
+        :param client: Existing client to share, api_endpoint, api_key, x_domain and x_time_zone are ignored then
+        """
+        self._getresponse_client = client or GetresponseClient(api_endpoint=api_endpoint, api_key=api_key,
+                                                               x_domain=x_domain, x_time_zone=x_time_zone)
+
+    @staticmethod
+    def _custom_fields_url(**kwargs):
+        """
+        Build url for get_custom_fields
+        :return: str
+        """
+        return build_url('/custom-fields', params={('sort[name]' if key == 'sort' else key): value
+                                                   for key, value in kwargs.items()})
 
-    def get_custom_fields(self, **kwargs):
+    def get_custom_fields(self, model: bool = False, **kwargs):
         """
         Get custom fields
         http://apidocs.getresponse.com/v3/resources/customfields#customfields.get.all
@@ -662,31 +1141,36 @@ class CustomFields:
                 Number results on page
                 - page: :type: int
                 Page number
+        :param model: Return CustomField objects instead of dicts, see getresponse.models
         :return:
         """
-        url = '/custom-fields?'
-        for key, value in kwargs.items():
-            if key == 'sort':
-                url = url + key + '[name]=' + value + '&'
-            else:
-                url = url + key + '=' + value + '&'
-        url = url[:-1]  # get rid of last & or ?
-        r = self._getresponse_client.get(url)
-        return r
+        r = self._getresponse_client.get(self._custom_fields_url(**kwargs))
+        return convert(r, model, CustomField)
 
-    def get_custom_field(self, field_id: str, fields: str = None):
+    def iter_custom_fields(self, per_page: int = 100, model: bool = False, **kwargs):
+        """
+        Iterate over all custom fields within account
+        Pages are fetched lazily and next page is prefetched while current one is consumed
+        :param per_page: Number of items fetched per call
+        :param model: Return CustomField objects instead of dicts, see getresponse.models
+        Other arguments are the same as for get_custom_fields
+        :return: generator of items
+        """
+        r = self._getresponse_client.paginate(
+            lambda page: self._custom_fields_url(**dict(kwargs, page=str(page), perPage=str(per_page))))
+        return convert(r, model, CustomField)
+
+    def get_custom_field(self, field_id: str, fields: str = None, model: bool = False):
         """
         Get custom field by id
         http://apidocs.getresponse.com/v3/resources/customfields#customfields.get
         :param field_id: Id of custom field
         :param fields: List of fields that should be returned. Id is always returned. Fields should be separated by comma
+        :param model: Return CustomField object instead of dict, see getresponse.models
         :return: JSON Response
         """
-        url = '/custom-fields/' + field_id
-        if fields:
-            url += '?fields=' + fields
-        r = self._getresponse_client.get(url)
-        return r
+        r = self._getresponse_client.get(build_url('/custom-fields/' + field_id, params={'fields': fields}))
+        return convert(r, model, CustomField)
 
     def post_custom_field(self, name: str, custom_type: str, hidden: bool, values: list):
         """
@@ -706,7 +1190,7 @@ class CustomFields:
         """
         url = '/custom-fields'
         data = {'name': name, 'type': custom_type, 'hidden': hidden, 'values': values}
-        r = self._getresponse_client.post(url, data=json.dumps(data))
+        r = self._getresponse_client.post(url, data=data)
         return r
 
     def delete_custom_field(self, field_id: str):
@@ -733,7 +1217,7 @@ class CustomFields:
             data = {'hidden': hidden, 'values': values}
         else:
             data = {'hidden': hidden}
-        r = self._getresponse_client.post(url, data=json.dumps(data))
+        r = self._getresponse_client.post(url, data=data, idempotent=True)
         return r
 
 
@@ -743,11 +1227,24 @@ class Newsletters:
     http://apidocs.getresponse.com/v3/resources/newsletters
     """
 
-    def __init__(self, api_endpoint: str, api_key: str, x_domain: str = None, x_time_zone: str = None):
-        self._getresponse_client = GetresponseClient(api_endpoint=api_endpoint, api_key=api_key, x_domain=x_domain,
-                                                     x_time_zone=x_time_zone)
+    def __init__(self, api_endpoint: str = None, api_key: str = None, x_domain: str = None, x_time_zone: str = None,
+                 client: GetresponseClient = None):
+        """
+        :param client: Existing client to share, api_endpoint, api_key, x_domain and x_time_zone are ignored then
+        """
+        self._getresponse_client = client or GetresponseClient(api_endpoint=api_endpoint, api_key=api_key,
+                                                               x_domain=x_domain, x_time_zone=x_time_zone)
+
+    @staticmethod
+    def _newsletters_url(query: list = None, **kwargs):
+        """
+        Build url for get_newsletters
+        :return: str
+        """
+        return build_url('/newsletters', query, params={('sort[createdOn]' if key == 'sort' else key): value
+                                              for key, value in kwargs.items()})
 
-    def get_newsletters(self, query: list = None, **kwargs):
+    def get_newsletters(self, query: list = None, model: bool = False, **kwargs):
         """
         Get all newsletters within account
         http://apidocs.getresponse.com/v3/resources/newsletters#newsletters.get.all
@@ -783,36 +1280,37 @@ class Newsletters:
                        Number results on page
                        - page: :type: int
                        Page number
+        :param model: Return Newsletter objects instead of dicts, see getresponse.models
         :return: JSON response
         """
-        url = '/newsletters?'
-        if query:
-            for item in query:
-                query_data = str(item).split('=')
-                url = url + 'query[' + query_data[0] + ']=' + query_data[1] + '&'
-        for key, value in kwargs.items():
-            if key == 'sort':
-                url = url + key + '[createdOn]=' + value + '&'
-            else:
-                url = url + key + '=' + value + '&'
-        url = url[:-1]  # get rid of last & or ?
-        r = self._getresponse_client.get(url)
-        return r
+        r = self._getresponse_client.get(self._newsletters_url(query, **kwargs))
+        return convert(r, model, Newsletter)
 
-    def get_newsletter(self, newsletter_id: str, fields: str = None):
+    def iter_newsletters(self, query: list = None, per_page: int = 100, model: bool = False, **kwargs):
+        """
+        Iterate over all newsletters within account
+        Pages are fetched lazily and next page is prefetched while current one is consumed
+        :param per_page: Number of items fetched per call
+        :param model: Return Newsletter objects instead of dicts, see getresponse.models
+        Other arguments are the same as for get_newsletters
+        :return: generator of items
+        """
+        r = self._getresponse_client.paginate(
+            lambda page: self._newsletters_url(query, **dict(kwargs, page=str(page), perPage=str(per_page))))
+        return convert(r, model, Newsletter)
+
+    def get_newsletter(self, newsletter_id: str, fields: str = None, model: bool = False):
         """
         This method returns newsletter by newsletter_id
         http://apidocs.getresponse.com/v3/resources/newsletters#newsletters.get
         :param newsletter_id: Id of the newsletter to return
         :param fields: :type: str
         List of fields that should be returned. Fields should be separated by comma
+        :param model: Return Newsletter object instead of dict, see getresponse.models
         :return: JSON response
         """
-        url = '/newsletters/' + newsletter_id
-        if fields:
-            url += '?fields=' + fields
-        r = self._getresponse_client.get(url)
-        return r
+        r = self._getresponse_client.get(build_url('/newsletters/' + newsletter_id, params={'fields': fields}))
+        return convert(r, model, Newsletter)
 
     def get_newsletters_statistics(self, query: list, **kwargs):
         """
@@ -844,14 +1342,7 @@ class Newsletters:
                        Page number
         :return: JSON response
         """
-        url = '/newsletters/statistics?'
-        for item in query:
-            query_data = str(item).split('=')
-            url = url + 'query[' + query_data[0] + ']=' + query_data[1] + '&'
-        for key, value in kwargs.items():
-            url = url + key + '=' + value + '&'
-        url = url[:-1]  # get rid of last & or ?
-        r = self._getresponse_client.get(url)
+        r = self._getresponse_client.get(build_url('/newsletters/statistics', query, params=kwargs))
         return r
 
     @staticmethod
@@ -933,7 +1424,7 @@ class Newsletters:
         data = {'name': name, 'type': newsletter_type, 'subject': subject, 'flags': flags, 'editor': editor,
                 'campaign': campaign_id, 'content': content, 'fromField': from_field_id, 'replyTo': reply_to,
                 'attachments': attachments, 'sendSettings': send_settings}
-        r = self._getresponse_client.post(url, data=json.dumps(data))
+        r = self._getresponse_client.post(url, data=data)
         return r
 
 
@@ -943,11 +1434,23 @@ class Contacts:
     http://apidocs.getresponse.com/v3/resources/contacts
     """
 
-    def __init__(self, api_endpoint: str, api_key: str, x_domain: str = None, x_time_zone: str = None):
-        self._getresponse_client = GetresponseClient(api_endpoint=api_endpoint, api_key=api_key, x_domain=x_domain,
-                                                     x_time_zone=x_time_zone)
+    def __init__(self, api_endpoint: str = None, api_key: str = None, x_domain: str = None, x_time_zone: str = None,
+                 client: GetresponseClient = None):
+        """
+        :param client: Existing client to share, api_endpoint, api_key, x_domain and x_time_zone are ignored then
+        """
+        self._getresponse_client = client or GetresponseClient(api_endpoint=api_endpoint, api_key=api_key,
+                                                               x_domain=x_domain, x_time_zone=x_time_zone)
+
+    @staticmethod
+    def _contacts_url(query: list = None, sort: list = None, **kwargs):
+        """
+        Build url for get_contacts
+        :return: str
+        """
+        return build_url('/contacts', query, sort, kwargs)
 
-    def get_contacts(self, query: list = None, sort: list = None, **kwargs):
+    def get_contacts(self, query: list = None, sort: list = None, model: bool = False, **kwargs):
         """
         Allows to retrieve all contacts from given campaigns. Standard sorting and filtering apply.
         http://apidocs.getresponse.com/v3/resources/campaigns#campaigns.contacts.get
@@ -983,23 +1486,44 @@ class Contacts:
             Additional flags parameter with value 'exactMatch' will search contacts with exact value of email and 
             name provided in query string.
             Without that flag matching is done via standard 'like' comparison, what could be sometimes slow.
+        :param model: Return Contact objects instead of dicts, see getresponse.models
         :return: JSON response
         """
-        url = str('/contacts?')
-        if query:
-            for item in query:
-                query_data = str(item).split('=')
-                url = url + 'query[' + query_data[0] + ']=' + query_data[1] + '&'
-        if sort:
-            for item in sort:
-                sort_data = str(item).split('=')
-                url = url + 'sort[' + sort_data[0] + ']=' + sort_data[1] + '&'
-        if kwargs:
-            for key, value in kwargs.items():
-                url = url + str(key) + '=' + str(value) + '&'
-        url = url[:-1]  # get rid of last &
-        r = self._getresponse_client.get(url)
-        return r
+        r = self._getresponse_client.get(self._contacts_url(query, sort, **kwargs))
+        return convert(r, model, Contact)
+
+    def iter_contacts(self, query: list = None, sort: list = None, per_page: int = 100, stream: bool = False,
+                      model: bool = False, **kwargs):
+        """
+        Iterate over all contacts
+        Pages are fetched lazily and next page is prefetched while current one is consumed
+        :param per_page: Number of items fetched per call
+        :param stream: Decode every page incrementally without prefetching, see Campaigns.iter_campaign_contacts
+        :param model: Return Contact objects instead of dicts, see getresponse.models
+        Other arguments are the same as for get_contacts
+        :return: generator of items
+        """
+        client = self._getresponse_client
+        r = (client.iter_stream if stream else client.paginate)(
+            lambda page: self._contacts_url(query, sort, **dict(kwargs, page=page, perPage=per_page)))
+        return convert(r, model, Contact)
+
+    def export_contacts(self, query: list = None, sort: list = None, per_page: int = 1000, max_workers: int = 8,
+                        ordered: bool = True, max_in_flight: int = None, model: bool = False, **kwargs):
+        """
+        Fetch all contacts with pages requested in parallel
+        :param per_page: Number of contacts fetched per call
+        :param max_workers: Number of threads fetching pages
+        :param ordered: Keep page order if True, otherwise yield pages as soon as they arrive
+        :param max_in_flight: Maximum number of pages requested or waiting to be consumed
+        :param model: Return Contact objects instead of dicts, see getresponse.models
+        Other arguments are the same as for get_contacts
+        :return: generator of contacts
+        """
+        r = self._getresponse_client.fetch_all(
+            lambda page: self._contacts_url(query, sort, **dict(kwargs, page=page, perPage=per_page)),
+            max_workers=max_workers, ordered=ordered, max_in_flight=max_in_flight)
+        return convert(r, model, Contact)
 
     def post_contacts(self, email: str, campaign_id: str, **kwargs):
         """
@@ -1014,14 +1538,20 @@ class Contacts:
                 -ipAddress: IP address of a contact
         :return: JSON response
         """
-        data = defaultdict()
-        data['email'] = email
-        data['campaign'] = defaultdict()
-        data['campaign']['campaignId'] = campaign_id
+        data = self._contact_data(email, campaign_id, **kwargs)
+        r = self._getresponse_client.post('/contacts', data=data)
+        return r
+
+    @staticmethod
+    def _contact_data(email: str, campaign_id: str, **kwargs):
+        """
+        Body of post_contacts
+        :return: dict
+        """
+        data = {'email': email, 'campaign': {'campaignId': campaign_id}}
         for key, value in kwargs.items():
             data[key] = value
-        r = self._getresponse_client.post('/contacts', data=json.dumps(data))
-        return r
+        return data
 
     def update_contact_customs(self, contact_id: str, custom_fields: dict):
         """
@@ -1031,19 +1561,21 @@ class Contacts:
         :param custom_fields: Custom fields to update
         :return: JSON response
         """
-        r = self._getresponse_client.post('/contacts/' + contact_id + '/custom-fields', data=json.dumps(custom_fields))
+        r = self._getresponse_client.post('/contacts/' + contact_id + '/custom-fields', data=custom_fields,
+                                          idempotent=True)
         return r
 
-    def get_contact(self, contact_id: str):
+    def get_contact(self, contact_id: str, model: bool = False):
         """
         Get contact by ID
         http://apidocs.getresponse.com/v3/resources/contacts#contacts.get
         :param contact_id: id of contact
+        :param model: Return Contact object instead of dict, see getresponse.models
         :return: JSON response
         """
         url = str('/contacts/' + contact_id)
         r = self._getresponse_client.get(url)
-        return r
+        return convert(r, model, Contact)
 
 
 class SearchContacts:
@@ -1052,9 +1584,13 @@ class SearchContacts:
     http://apidocs.getresponse.com/v3/resources/search-contacts
     """
 
-    def __init__(self, api_endpoint: str, api_key: str, x_domain: str = None, x_time_zone: str = None):
-        self._getresponse_client = GetresponseClient(api_endpoint=api_endpoint, api_key=api_key, x_domain=x_domain,
-                                                     x_time_zone=x_time_zone)
+    def __init__(self, api_endpoint: str = None, api_key: str = None, x_domain: str = None, x_time_zone: str = None,
+                 client: GetresponseClient = None):
+        """
+        :param client: Existing client to share, api_endpoint, api_key, x_domain and x_time_zone are ignored then
+        """
+        self._getresponse_client = client or GetresponseClient(api_endpoint=api_endpoint, api_key=api_key,
+                                                               x_domain=x_domain, x_time_zone=x_time_zone)
 
     def get_contacts(self, search_contact_id: str):
         """
@@ -1083,10 +1619,18 @@ class Imports:
     Class represents imports section of API
     http://apidocs.getresponse.com/v3/resources/imports
     """
+    CHUNK_SIZE = 10000
+    POLL_INTERVAL = 1
+    MAX_POLL_INTERVAL = 30
+    FINISHED_STATUSES = ('finished', 'rejected')
 
-    def __init__(self, api_endpoint: str, api_key: str, x_domain: str = None, x_time_zone: str = None):
-        self._getresponse_client = GetresponseClient(api_endpoint=api_endpoint, api_key=api_key, x_domain=x_domain,
-                                                     x_time_zone=x_time_zone)
+    def __init__(self, api_endpoint: str = None, api_key: str = None, x_domain: str = None, x_time_zone: str = None,
+                 client: GetresponseClient = None):
+        """
+        :param client: Existing client to share, api_endpoint, api_key, x_domain and x_time_zone are ignored then
+        """
+        self._getresponse_client = client or GetresponseClient(api_endpoint=api_endpoint, api_key=api_key,
+                                                               x_domain=x_domain, x_time_zone=x_time_zone)
 
     def get_imports(self, query: str = None):
         """
@@ -1114,6 +1658,189 @@ class Imports:
         r = self._getresponse_client.get(url)
         return r
 
+    def post_import(self, campaign_id: str, field_mapping: list, contacts: list):
+        """
+        Create import of contacts into campaign
+        http://apidocs.getresponse.com/v3/resources/imports#imports.create
+        :param campaign_id: Campaign id
+        :param field_mapping: Meaning of columns, 'email', 'name' or custom field id
+            Examples:
+                    field_mapping = ['email', 'name', 'pE']
+        :param contacts: Rows with values in order of field_mapping
+            Examples:
+                    contacts = [['a@test.com', 'A', 'gold'], ['b@test.com', 'B', 'silver']]
+        :return: JSON response
+        """
+        data = {'campaign': {'campaignId': campaign_id}, 'fieldMapping': field_mapping, 'contacts': contacts}
+        r = self._getresponse_client.post('/imports', data=data)
+        return r
+
+    @staticmethod
+    def _import_payloads(campaign_id: str, field_mapping: list, rows, chunk_size: int):
+        """
+        Split rows into bodies of POST /imports, at most chunk_size rows each
+        :return: generator of dicts
+        """
+        rows = iter(rows)
+        while True:
+            chunk = [list(row) for row in islice(rows, chunk_size)]
+            if not chunk:
+                return
+            yield {'campaign': {'campaignId': campaign_id}, 'fieldMapping': field_mapping, 'contacts': chunk}
+
+    @staticmethod
+    def _open_csv(file):
+        """
+        :param file: Path or open text file
+        :return: Context manager giving open file, which is closed on exit only when it was opened here
+        """
+        return open(file, newline='') if isinstance(file, str) else nullcontext(file)
+
+    @staticmethod
+    def _csv_rows(f, field_mapping: list = None):
+        """
+        Read rows of CSV file lazily, first row is taken as field mapping when it is not given
+        :param f: Open text file
+        :return: tuple (field_mapping, generator of rows)
+        """
+        reader = csv.reader(f)
+        if field_mapping is None:
+            field_mapping = next(reader, [])
+        return field_mapping, (row for row in reader if row)
+
+    def post_import_file(self, campaign_id: str, file, field_mapping: list = None, chunk_size: int = None):
+        """
+        Import contacts from CSV file, which is read in chunks and never loaded into memory as a whole
+        Every chunk becomes one import, see post_import
+        :param campaign_id: Campaign id
+        :param file: Path or open text file
+        :param field_mapping: Meaning of columns, by default taken from first row of file
+        :param chunk_size: Number of contacts per import, default CHUNK_SIZE
+        :return: list of JSON responses, one per import
+        """
+        with self._open_csv(file) as f:
+            field_mapping, rows = self._csv_rows(f, field_mapping)
+            return [self._getresponse_client.post('/imports', data=payload)
+                    for payload in self._import_payloads(campaign_id, field_mapping, rows,
+                                                         chunk_size or self.CHUNK_SIZE)]
+
+    def _poll_delay(self, attempt: int, interval: float = None, max_interval: float = None):
+        """
+        Seconds to wait before next check of import, growing exponentially
+        """
+        interval = self.POLL_INTERVAL if interval is None else interval
+        return min(interval * 2 ** attempt, max_interval or self.MAX_POLL_INTERVAL)
+
+    def _import_done(self, result):
+        """
+        :param result: JSON response of get import
+        :return: True when import will not change any more
+        """
+        if not isinstance(result, dict):
+            raise GetresponseError(result)
+        return result.get('status') in self.FINISHED_STATUSES
+
+    def wait_import(self, import_id: str, timeout: float = None, interval: float = None, max_interval: float = None,
+                    progress=None):
+        """
+        Wait until import is finished, checking it with exponential backoff
+        Responses of client cache are bypassed
+        :param import_id: Import id
+        :param timeout: Seconds to wait, DeadlineExceeded is raised when import does not finish in time
+        :param interval: Seconds before second check, doubled after every check. Default POLL_INTERVAL
+        :param max_interval: Upper bound of wait between checks, default MAX_POLL_INTERVAL
+        :param progress: Callable receiving JSON response of every check, e.g. to report statistics
+        :return: JSON response of get import with final status
+        """
+        url = str('/imports/' + import_id)
+        with deadline(timeout) as current:
+            attempt = 0
+            while True:
+                result, _ = self._getresponse_client.get_page(url)
+                if progress is not None:
+                    progress(result)
+                if self._import_done(result):
+                    return result
+                self._getresponse_client.sleep(self._poll_delay(attempt, interval, max_interval), current)
+                attempt += 1
+
+
+class GetResponse:
+    """
+    Account level entry point
+    Owns single GetresponseClient and exposes all sections of API sharing it, so connections are reused account wide
+    """
+    CLIENT_CLASS = GetresponseClient
+    SECTION_CLASSES = {'campaigns': Campaigns, 'from_fields': FromFields, 'custom_fields': CustomFields,
+                       'newsletters': Newsletters, 'contacts': Contacts, 'search_contacts': SearchContacts,
+                       'imports': Imports}
+
+    def __init__(self, api_endpoint: str = None, api_key: str = None, x_domain: str = None, x_time_zone: str = None,
+                 client: GetresponseClient = None, **client_kwargs):
+        """
+        :param api_endpoint: API Endpoint, see GetresponseClient
+        :param api_key: API key, see GetresponseClient
+        :param x_domain: Account url for GetResponse 360, see GetresponseClient
+        :param x_time_zone: Time zone of response data, see GetresponseClient
+        :param client: Existing client to use instead of creating new one
+        :param client_kwargs: Extra arguments for GetresponseClient, e.g. pool_maxsize
+        """
+        self.client = client or self.CLIENT_CLASS(api_endpoint=api_endpoint, api_key=api_key, x_domain=x_domain,
+                                                  x_time_zone=x_time_zone, **client_kwargs)
+        self._sections = {}
+
+    def _section(self, name: str):
+        """
+        Create section on first access and cache it
+        :param name: Key of SECTION_CLASSES
+        :return: Instance of section class bound to shared client
+        """
+        section = self._sections.get(name)
+        if section is None:
+            section = self._sections.setdefault(name, self.SECTION_CLASSES[name](client=self.client))
+        return section
+
+    @property
+    def campaigns(self) -> Campaigns:
+        return self._section('campaigns')
+
+    @property
+    def from_fields(self) -> FromFields:
+        return self._section('from_fields')
+
+    @property
+    def custom_fields(self) -> CustomFields:
+        return self._section('custom_fields')
+
+    @property
+    def newsletters(self) -> Newsletters:
+        return self._section('newsletters')
+
+    @property
+    def contacts(self) -> Contacts:
+        return self._section('contacts')
+
+    @property
+    def search_contacts(self) -> SearchContacts:
+        return self._section('search_contacts')
+
+    @property
+    def imports(self) -> Imports:
+        return self._section('imports')
+
+    def close(self):
+        """
+        Close connections of shared client
+        """
+        self.client.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
 if __name__ == '__main__':
     import doctest
 
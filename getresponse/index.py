@@ -0,0 +1,322 @@
+"""Local index of contacts of the GetResponse API
+
+ContactLookup answers email -> contact and campaign -> contact ids from local index and asks API only on miss.
+Storage is delegated to index: MemoryContactIndex keeps hash maps in process, SQLiteContactIndex keeps them in file
+shared by processes on one host. Index is filled from paginated export and kept fresh with getresponse.sync
+"""
+import abc
+import threading
+import time
+from collections import OrderedDict
+
+from getresponse.database import SQLiteDatabase
+from getresponse.getresponsev3 import Contacts, GetresponseError
+
+ALL = '*'
+
+
+def _record(contact: dict):
+    """
+    :return: tuple (contact id, lowercase email, campaign id) of contact as returned by API
+    """
+    campaign = contact.get('campaign') or {}
+    return contact['contactId'], (contact.get('email') or '').lower(), campaign.get('campaignId')
+
+
+def _contact(contact_id: str, email: str, campaign_id: str):
+    return {'contactId': contact_id, 'email': email, 'campaign': {'campaignId': campaign_id}}
+
+
+class ContactIndex(abc.ABC):
+    """
+    Storage of contact ids, emails and campaigns
+    Email is unique within campaign only, so one email can map to several contacts.
+    Indexes have to be safe to use from several threads
+    """
+
+    @abc.abstractmethod
+    def add(self, contacts):
+        """
+        Add or replace contacts
+        :param contacts: Iterable of dicts with contactId, email and campaign
+        :return: Number of contacts added
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def remove(self, contact_ids):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def by_email(self, email: str):
+        """
+        :return: list of tuples (contact id, email, campaign id) with given email, compared case insensitively
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def ids_for_campaign(self, campaign_id: str):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def mark_loaded(self, campaign_id: str):
+        """
+        Remember that all contacts of campaign are in index, ALL stands for whole account
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def is_loaded(self, campaign_id: str):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def clear(self):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def __len__(self):
+        raise NotImplementedError
+
+
+class MemoryContactIndex(ContactIndex):
+    """
+    Dicts in process memory
+    """
+
+    def __init__(self):
+        self._contacts = {}
+        self._emails = {}
+        self._campaigns = {}
+        self._loaded = set()
+        self._lock = threading.Lock()
+
+    def _discard(self, contact_id: str):
+        previous = self._contacts.pop(contact_id, None)
+        if previous is not None:
+            email, campaign_id = previous
+            self._emails[email].discard(contact_id)
+            self._campaigns[campaign_id].discard(contact_id)
+
+    def add(self, contacts):
+        count = 0
+        for contact in contacts:
+            contact_id, email, campaign_id = _record(contact)
+            with self._lock:
+                self._discard(contact_id)
+                self._contacts[contact_id] = (email, campaign_id)
+                self._emails.setdefault(email, set()).add(contact_id)
+                self._campaigns.setdefault(campaign_id, set()).add(contact_id)
+            count += 1
+        return count
+
+    def remove(self, contact_ids):
+        with self._lock:
+            for contact_id in contact_ids:
+                self._discard(contact_id)
+
+    def by_email(self, email: str):
+        with self._lock:
+            return [(contact_id, email.lower(), self._contacts[contact_id][1])
+                    for contact_id in self._emails.get(email.lower(), ())]
+
+    def ids_for_campaign(self, campaign_id: str):
+        with self._lock:
+            return list(self._campaigns.get(campaign_id, ()))
+
+    def mark_loaded(self, campaign_id: str):
+        with self._lock:
+            self._loaded.add(campaign_id)
+
+    def is_loaded(self, campaign_id: str):
+        return campaign_id in self._loaded or ALL in self._loaded
+
+    def clear(self):
+        with self._lock:
+            self._contacts.clear()
+            self._emails.clear()
+            self._campaigns.clear()
+            self._loaded.clear()
+
+    def __len__(self):
+        return len(self._contacts)
+
+
+class SQLiteContactIndex(ContactIndex):
+    """
+    Table in SQLite database file with indexes on email and campaign.
+    Every thread uses its own connection, concurrent writers are serialized by SQLite locking
+    """
+    BUSY_TIMEOUT = 30
+    BATCH_SIZE = 10000
+
+    def __init__(self, path: str):
+        """
+        :param path: Database file, created when missing
+        """
+        self.path = path
+        self._database = SQLiteDatabase(path, self.BUSY_TIMEOUT)
+        with self._database.transaction() as db:
+            db.execute('CREATE TABLE IF NOT EXISTS contacts (contact_id TEXT PRIMARY KEY, email TEXT NOT NULL, '
+                       'campaign_id TEXT)')
+            db.execute('CREATE INDEX IF NOT EXISTS contacts_email ON contacts (email)')
+            db.execute('CREATE INDEX IF NOT EXISTS contacts_campaign ON contacts (campaign_id)')
+            db.execute('CREATE TABLE IF NOT EXISTS loaded (campaign_id TEXT PRIMARY KEY)')
+
+    def add(self, contacts):
+        count = 0
+        batch = []
+        for contact in contacts:
+            batch.append(_record(contact))
+            if len(batch) == self.BATCH_SIZE:
+                count += self._insert(batch)
+                batch = []
+        return count + self._insert(batch) if batch else count
+
+    def _insert(self, records: list):
+        with self._database.transaction() as db:
+            db.executemany('INSERT OR REPLACE INTO contacts VALUES (?, ?, ?)', records)
+        return len(records)
+
+    def remove(self, contact_ids):
+        with self._database.transaction() as db:
+            db.executemany('DELETE FROM contacts WHERE contact_id = ?', [(contact_id,) for contact_id in contact_ids])
+
+    def by_email(self, email: str):
+        db = self._database.connection()
+        return db.execute('SELECT contact_id, email, campaign_id FROM contacts WHERE email = ?',
+                          (email.lower(),)).fetchall()
+
+    def ids_for_campaign(self, campaign_id: str):
+        db = self._database.connection()
+        return [row[0] for row in db.execute('SELECT contact_id FROM contacts WHERE campaign_id = ?', (campaign_id,))]
+
+    def mark_loaded(self, campaign_id: str):
+        with self._database.transaction() as db:
+            db.execute('INSERT OR IGNORE INTO loaded VALUES (?)', (campaign_id,))
+
+    def is_loaded(self, campaign_id: str):
+        db = self._database.connection()
+        return db.execute('SELECT 1 FROM loaded WHERE campaign_id IN (?, ?)', (campaign_id, ALL)).fetchone() is not None
+
+    def clear(self):
+        with self._database.transaction() as db:
+            db.execute('DELETE FROM contacts')
+            db.execute('DELETE FROM loaded')
+
+    def __len__(self):
+        return self._database.connection().execute('SELECT COUNT(*) FROM contacts').fetchone()[0]
+
+
+class ContactLookup:
+    """
+    Lookups of contacts answered from local index with fallback to API on miss
+    Contacts found through API are added to index, so every email or campaign costs at most one call.
+    API is not asked when index holds all contacts of campaign or account, emails which API does not know are
+    remembered for NEGATIVE_TTL seconds
+        Examples:
+                lookup = ContactLookup(account.contacts, SQLiteContactIndex('contacts.db'))
+                lookup.load()
+                lookup.get_contact_by_email('john@example.com')['contactId']
+    """
+    FIELDS = 'email,campaign'
+    PER_PAGE = 1000
+    NEGATIVE_TTL = 300
+    NEGATIVE_MAX = 100000
+
+    def __init__(self, contacts: Contacts, index: ContactIndex = None, negative_ttl: float = None):
+        """
+        :param contacts: Contacts section used to fill index and on misses
+        :param index: Storage, default MemoryContactIndex
+        :param negative_ttl: Seconds unknown email is answered without API, default NEGATIVE_TTL
+        """
+        self.contacts = contacts
+        self.index = MemoryContactIndex() if index is None else index
+        self.negative_ttl = self.NEGATIVE_TTL if negative_ttl is None else negative_ttl
+        self._negative = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def load(self, campaign_id: str = None, per_page: int = None, max_workers: int = 8):
+        """
+        Fill index from paginated export with pages requested in parallel
+        :param campaign_id: Load only contacts of given campaign, whole account if None
+        :return: Number of contacts loaded
+        """
+        query = ['campaignId=' + campaign_id] if campaign_id else []
+        count = self.index.add(self.contacts.export_contacts(query=query, per_page=per_page or self.PER_PAGE,
+                                                             max_workers=max_workers, fields=self.FIELDS))
+        self.index.mark_loaded(campaign_id or ALL)
+        return count
+
+    def refresh(self, sync, campaign_id: str = None):
+        """
+        Apply changes found by incremental sync
+        :param sync: getresponse.sync.ContactSync, fetching at least email and campaign fields
+        :return: Number of contacts added or updated
+        """
+        return self.index.add(event.contact for event in sync.iter_changes(campaign_id))
+
+    def get_contact_by_email(self, email: str, campaign_id: str = None):
+        """
+        :param email: Email of contact, compared case insensitively
+        :param campaign_id: Campaign of contact, any campaign if None
+        :return: dict with contactId, email and campaign, or None when API does not know the contact either
+        :raises GetresponseError: API answered with error
+        """
+        records = self.index.by_email(email)
+        if campaign_id is not None:
+            records = [record for record in records if record[2] == campaign_id]
+        if records:
+            self.hits += 1
+            return _contact(*records[0])
+        key = (email.lower(), campaign_id)
+        if self.index.is_loaded(campaign_id or ALL) or self._known_missing(key):
+            self.hits += 1
+            return None
+        self.misses += 1
+        query = ['email=' + email] + (['campaignId=' + campaign_id] if campaign_id else [])
+        found = self.contacts.get_contacts(query=query, additionalFlags='exactMatch', fields=self.FIELDS)
+        if not isinstance(found, list):
+            raise GetresponseError(found, found.get('httpStatus') if isinstance(found, dict) else None)
+        self.index.add(found)
+        for contact in found:
+            if (contact.get('email') or '').lower() == key[0]:
+                return _contact(*_record(contact))
+        with self._lock:
+            self._negative[key] = time.monotonic() + self.negative_ttl
+            self._negative.move_to_end(key)
+            if len(self._negative) > self.NEGATIVE_MAX:
+                self._negative.popitem(last=False)
+        return None
+
+    def _known_missing(self, key: tuple):
+        """
+        :return: True if API did not know email within last negative_ttl seconds
+        """
+        with self._lock:
+            expires = self._negative.get(key)
+            if expires is None:
+                return False
+            if expires > time.monotonic():
+                return True
+            del self._negative[key]
+            return False
+
+    def get_contact_ids_for_campaign(self, campaign_id: str):
+        """
+        Campaign which is not in index yet is loaded from API first
+        :return: list of contact ids
+        """
+        if self.index.is_loaded(campaign_id):
+            self.hits += 1
+        else:
+            self.misses += 1
+            self.load(campaign_id)
+        return self.index.ids_for_campaign(campaign_id)
+
+    def forget(self, contact_ids):
+        """
+        Remove contacts from index, e.g. ones deleted from account or moved to other campaign
+        """
+        self.index.remove(contact_ids)
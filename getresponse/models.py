@@ -0,0 +1,410 @@
+"""Compact record classes for resources of the GetResponse API
+
+Sections return plain dicts by default, methods listing or getting resources accept model=True to get these
+objects instead. Every record keeps its values in __slots__, nested objects and dates are kept as received and
+parsed on first access, so large working sets take a fraction of memory of dicts and attribute access is fast.
+Projection narrows model to fields caller asked API for
+"""
+import inspect
+import sys
+import threading
+import warnings
+from collections import Counter
+from datetime import datetime
+
+DATE_FORMAT = '%Y-%m-%dT%H:%M:%S%z'
+SHARED_MAX = 100000
+
+
+def _share(value, shared: dict):
+    """
+    Return one shared instance for equal values of fields which repeat across records, e.g. time zone or
+    reference to campaign. Strings are interned, dicts are shared among records of one conversion only
+    :param shared: Table of dicts seen by current conversion or None, no more are added once it has SHARED_MAX
+    """
+    if isinstance(value, str):
+        return sys.intern(value)
+    if isinstance(value, dict) and shared is not None:
+        try:
+            key = tuple(value.items())
+            return shared[key]
+        except KeyError:
+            if len(shared) < SHARED_MAX:
+                shared[key] = value
+        except TypeError:
+            pass
+    return value
+
+
+def parse_date(value: str):
+    """
+    :param value: Date as sent by API, e.g. 2017-03-13T19:24:59+0000
+    :return: timezone aware datetime, or value itself when it is not in expected format
+    """
+    try:
+        return datetime.strptime(value, DATE_FORMAT)
+    except ValueError:
+        return value
+
+
+def format_date(value):
+    return value.strftime(DATE_FORMAT) if isinstance(value, datetime) else value
+
+
+class _Lazy:
+    """
+    Attribute whose raw value is parsed on first access and the result replaces raw value in the slot
+    """
+
+    def __init__(self, slot: str, raw_type: type, parse, dump):
+        """
+        :param slot: Slot holding raw or parsed value
+        :param raw_type: Type of raw value, other values are considered parsed already
+        :param parse: Callable raw -> parsed
+        :param dump: Callable parsed -> raw, used by to_dict
+        """
+        self.slot = slot
+        self.raw_type = raw_type
+        self.parse = parse
+        self.dump = dump
+        self.member = None
+
+    def __set_name__(self, owner, name):
+        self.member = owner.__dict__[self.slot]
+
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return self
+        value = self.member.__get__(obj, owner)
+        if isinstance(value, self.raw_type):
+            value = self.parse(value)
+            self.member.__set__(obj, value)
+        return value
+
+    def __set__(self, obj, value):
+        self.member.__set__(obj, value)
+
+
+def _copy(value):
+    if isinstance(value, dict):
+        return {key: _copy(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_copy(item) for item in value]
+    return value
+
+
+def _date(slot: str):
+    return _Lazy(slot, str, parse_date, format_date)
+
+
+def _nested(slot: str, model_name: str):
+    """
+    Nested object parsed into model given by name, so that models can refer to each other
+    """
+    return _Lazy(slot, dict, lambda value: MODELS[model_name].from_dict(value), lambda value: value.to_dict())
+
+
+class _FieldValues(dict):
+    """
+    Custom field values as dict {customFieldId: values} which keeps entries of API it was parsed from
+    """
+    __slots__ = ('entries',)
+
+
+def _parse_field_values(entries: list):
+    values = _FieldValues((entry['customFieldId'], entry.get('value', entry.get('values'))) for entry in entries)
+    values.entries = entries
+    return values
+
+
+def _dump_field_values(values: dict):
+    """
+    :return: Entries as received for values which were not changed, new entries for the rest
+    """
+    entries = {entry['customFieldId']: entry for entry in getattr(values, 'entries', ())}
+    dumped = []
+    for field_id, value in values.items():
+        entry = entries.get(field_id)
+        if entry is None or entry.get('value', entry.get('values')) != value:
+            entry = {'customFieldId': field_id, 'value': value}
+        dumped.append(entry)
+    return dumped
+
+
+class Model:
+    """
+    Base of record classes
+    FIELDS maps keys of API to slots, keys which are not listed there are kept in extra dict.
+    Values of SHARED keys repeat across records and equal ones are stored once per conversion.
+    Missing keys and nulls are both None
+    """
+    __slots__ = ('extra',)
+    FIELDS = ()
+    SHARED = ()
+
+    def __init__(self, **kwargs):
+        """
+        :param kwargs: Values by slot name
+        """
+        for _, slot in self.FIELDS:
+            setattr(self, slot, kwargs.pop(slot.lstrip('_'), None))
+        self.extra = kwargs or None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._setters = tuple((key, cls.__dict__[slot].__set__, key in cls.SHARED) for key, slot in cls.FIELDS)
+        cls._keys = frozenset(key for key, _ in cls.FIELDS)
+        cls._lazy = {value.slot: value for value in cls.__dict__.values() if isinstance(value, _Lazy)}
+
+    @classmethod
+    def from_dict(cls, data: dict, shared: dict = None):
+        """
+        :param data: Resource as returned by API
+        :param shared: Table of values shared by records converted together, see _share
+        :return: Instance of model
+        """
+        obj = cls.__new__(cls)
+        get = data.get
+        for key, setter, is_shared in cls._setters:
+            setter(obj, _share(get(key), shared) if is_shared else get(key))
+        obj.extra = None if cls._keys.issuperset(data) else {key: value for key, value in data.items()
+                                                              if key not in cls._keys}
+        return obj
+
+    def to_dict(self):
+        """
+        :return: Resource in form used by API, keys with None values are left out.
+        Nested dicts are copies, so changing them changes neither record nor records sharing values with it
+        """
+        data = {}
+        for key, slot in self.FIELDS:
+            value = getattr(self, slot)
+            if value is None:
+                continue
+            lazy = self._lazy.get(slot)
+            if lazy is not None and not isinstance(value, lazy.raw_type):
+                value = lazy.dump(value)
+            data[key] = _copy(value)
+        if self.extra:
+            data.update((key, _copy(value)) for key, value in self.extra.items())
+        return data
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+        slot = self.FIELDS[0][1]
+        return '{}({}={!r}, name={!r})'.format(type(self).__name__, slot, getattr(self, slot),
+                                               getattr(self, 'name', None))
+
+
+class Campaign(Model):
+    """
+    http://apidocs.getresponse.com/v3/resources/campaigns
+    """
+    __slots__ = ('campaign_id', 'href', 'name', 'tech_name', 'description', 'language_code', 'is_default',
+                 '_created_on', 'profile', 'postal', 'optin_types', 'confirmation', 'subscription_notifications')
+    FIELDS = (('campaignId', 'campaign_id'), ('href', 'href'), ('name', 'name'), ('techName', 'tech_name'),
+              ('description', 'description'), ('languageCode', 'language_code'), ('isDefault', 'is_default'),
+              ('createdOn', '_created_on'), ('profile', 'profile'), ('postal', 'postal'),
+              ('optinTypes', 'optin_types'), ('confirmation', 'confirmation'),
+              ('subscriptionNotifications', 'subscription_notifications'))
+    SHARED = ('languageCode', 'isDefault')
+    created_on = _date('_created_on')
+
+
+class Contact(Model):
+    """
+    http://apidocs.getresponse.com/v3/resources/contacts
+    custom_field_values is parsed into dict {customFieldId: list of values}, entries of unchanged values are given
+    back by to_dict as received
+    """
+    __slots__ = ('contact_id', 'href', 'name', 'email', 'note', 'origin', 'day_of_cycle', 'time_zone', 'ip_address',
+                 'activities', 'scoring', 'engagement_score', 'tags', 'geolocation', '_campaign', '_created_on',
+                 '_changed_on', '_custom_field_values')
+    FIELDS = (('contactId', 'contact_id'), ('href', 'href'), ('name', 'name'), ('email', 'email'), ('note', 'note'),
+              ('origin', 'origin'), ('dayOfCycle', 'day_of_cycle'), ('timeZone', 'time_zone'),
+              ('ipAddress', 'ip_address'), ('activities', 'activities'), ('scoring', 'scoring'),
+              ('engagementScore', 'engagement_score'), ('tags', 'tags'), ('geolocation', 'geolocation'),
+              ('campaign', '_campaign'), ('createdOn', '_created_on'), ('changedOn', '_changed_on'),
+              ('customFieldValues', '_custom_field_values'))
+    SHARED = ('origin', 'dayOfCycle', 'timeZone', 'campaign')
+    campaign = _nested('_campaign', 'Campaign')
+    created_on = _date('_created_on')
+    changed_on = _date('_changed_on')
+    custom_field_values = _Lazy('_custom_field_values', list, _parse_field_values, _dump_field_values)
+
+
+class Newsletter(Model):
+    """
+    http://apidocs.getresponse.com/v3/resources/newsletters
+    """
+    __slots__ = ('newsletter_id', 'href', 'name', 'type', 'status', 'editor', 'subject', 'flags', 'send_metrics',
+                 'send_settings', 'content', 'attachments', 'from_field', 'reply_to', '_campaign', '_created_on',
+                 '_send_on')
+    FIELDS = (('newsletterId', 'newsletter_id'), ('href', 'href'), ('name', 'name'), ('type', 'type'),
+              ('status', 'status'), ('editor', 'editor'), ('subject', 'subject'), ('flags', 'flags'),
+              ('sendMetrics', 'send_metrics'), ('sendSettings', 'send_settings'), ('content', 'content'),
+              ('attachments', 'attachments'), ('fromField', 'from_field'), ('replyTo', 'reply_to'),
+              ('campaign', '_campaign'), ('createdOn', '_created_on'), ('sendOn', '_send_on'))
+    SHARED = ('type', 'status', 'editor', 'flags', 'fromField', 'replyTo', 'campaign')
+    campaign = _nested('_campaign', 'Campaign')
+    created_on = _date('_created_on')
+    send_on = _date('_send_on')
+
+
+class FromField(Model):
+    """
+    http://apidocs.getresponse.com/v3/resources/fromfields
+    """
+    __slots__ = ('from_field_id', 'href', 'name', 'email', 'is_default', 'is_active', '_created_on')
+    FIELDS = (('fromFieldId', 'from_field_id'), ('href', 'href'), ('name', 'name'), ('email', 'email'),
+              ('isDefault', 'is_default'), ('isActive', 'is_active'), ('createdOn', '_created_on'))
+    created_on = _date('_created_on')
+
+
+class CustomField(Model):
+    """
+    http://apidocs.getresponse.com/v3/resources/customfields
+    """
+    __slots__ = ('custom_field_id', 'href', 'name', 'type', 'field_type', 'value_type', 'format', 'hidden',
+                 'values')
+    FIELDS = (('customFieldId', 'custom_field_id'), ('href', 'href'), ('name', 'name'), ('type', 'type'),
+              ('fieldType', 'field_type'), ('valueType', 'value_type'), ('format', 'format'), ('hidden', 'hidden'),
+              ('values', 'values'))
+
+
+MODELS = {model.__name__: model for model in (Campaign, Contact, Newsletter, FromField, CustomField)}
+
+
+class UnrequestedFieldWarning(UserWarning):
+    """
+    Code read field of projected record which was not requested from API, value is always None
+    """
+
+
+class _Projected(Model):
+    """
+    Base of classes made by Projection, records keep only requested fields
+    """
+    __slots__ = ()
+    _projection = None
+    _extra_keys = frozenset()
+    _unrequested = frozenset()
+
+    @classmethod
+    def from_dict(cls, data: dict, shared: dict = None):
+        obj = cls.__new__(cls)
+        get = data.get
+        for key, setter, is_shared in cls._setters:
+            setter(obj, _share(get(key), shared) if is_shared else get(key))
+        obj.extra = {key: data[key] for key in cls._extra_keys if key in data} or None
+        return obj
+
+    def __getattr__(self, name):
+        if name in self._unrequested:
+            self._projection.count(name)
+            return None
+        raise AttributeError('{!r} object has no attribute {!r}'.format(type(self).__name__, name))
+
+    def __repr__(self):
+        return '{}({})'.format(type(self).__name__, ', '.join('{}={!r}'.format(slot.lstrip('_'), getattr(self, slot))
+                                                             for _, slot in self.FIELDS))
+
+
+class Projection:
+    """
+    Fields of resource declared once and used both for fields parameter of request and for compact record class
+    Records have slots for requested fields only. Reading attribute of full model which was not requested returns
+    None, is counted in unrequested and warns with UnrequestedFieldWarning once per field
+        Examples:
+                emails = Projection(Contact, ['email'])
+                for contact in emails(account.contacts.iter_contacts, query=['campaignId=O'], per_page=1000):
+                    send(contact.contact_id, contact.email)
+    """
+
+    def __init__(self, model: type, fields):
+        """
+        :param model: Model class, e.g. Contact
+        :param fields: Keys of API as list or comma separated str, id of resource is always added
+        """
+        keys = fields.split(',') if isinstance(fields, str) else list(fields)
+        keys = list(dict.fromkeys([model.FIELDS[0][0]] + [key.strip() for key in keys if key.strip()]))
+        self.fields = ','.join(keys)
+        self.unrequested = Counter()
+        self._lock = threading.Lock()
+        selected = tuple((key, slot) for key, slot in model.FIELDS if key in keys)
+        namespace = {'__slots__': tuple(slot for _, slot in selected), 'FIELDS': selected,
+                     'SHARED': tuple(key for key in model.SHARED if key in keys), '__module__': __name__}
+        names = {slot for _, slot in model.FIELDS if not slot.startswith('_')}
+        for name, value in vars(model).items():
+            if isinstance(value, _Lazy):
+                names.add(name)
+                if value.slot in namespace['__slots__']:
+                    namespace[name] = _Lazy(value.slot, value.raw_type, value.parse, value.dump)
+        self.model = type(model.__name__ + 'Projection', (_Projected,), namespace)
+        self.model._projection = self
+        self.model._extra_keys = frozenset(keys) - model._keys
+        self.model._unrequested = frozenset(names - set(namespace) - set(namespace['__slots__']))
+
+    def count(self, name: str):
+        with self._lock:
+            self.unrequested[name] += 1
+            first = self.unrequested[name] == 1
+        if first:
+            warnings.warn('{} was not requested, add it to fields of projection'.format(name), UnrequestedFieldWarning,
+                          stacklevel=3)
+
+    def __call__(self, method, *args, **kwargs):
+        """
+        Call section method with fields of projection and get projected records
+        :param method: Method accepting fields and model arguments, e.g. Contacts.iter_contacts or get_contacts
+        :return: Result of method
+        """
+        return method(*args, fields=self.fields, model=self.model, **kwargs)
+
+
+def _from_json(result, model: type):
+    if isinstance(result, list):
+        shared = {}
+        return [model.from_dict(item, shared) if isinstance(item, dict) else item for item in result]
+    if isinstance(result, dict) and 'httpStatus' not in result:
+        return model.from_dict(result)
+    return result
+
+
+async def _from_awaitable(result, model: type):
+    return _from_json(await result, model)
+
+
+async def _from_async_iterator(items, model: type):
+    shared = {}
+    async for item in items:
+        yield model.from_dict(item, shared)
+
+
+def _from_iterator(items, model: type):
+    shared = {}
+    for item in items:
+        yield model.from_dict(item, shared)
+
+
+def convert(result, model, default: type):
+    """
+    Turn result of section method into models when caller asked for them
+    Error responses are passed through as they are
+    :param result: JSON response, generator of items, or their asyncio counterparts
+    :param model: False for dicts, True for default model, or model class
+    :param default: Model class used for model=True
+    :return: result with resources replaced by models
+    """
+    if not model:
+        return result
+    model = default if model is True else model
+    if inspect.isawaitable(result):
+        return _from_awaitable(result, model)
+    if inspect.isasyncgen(result):
+        return _from_async_iterator(result, model)
+    if isinstance(result, (list, dict)):
+        return _from_json(result, model)
+    return _from_iterator(result, model)
@@ -0,0 +1,185 @@
+"""Client side throttling of calls to the GetResponse API
+
+GetResponse limits number of calls per account and reports the budget in X-RateLimit-* headers
+http://apidocs.getresponse.com/v3/limits
+"""
+import struct
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+
+class RateLimiter:
+    """
+    Token bucket shared by all threads using one client
+    Calls are paced at the rate which spends budget left in current window evenly until the window resets,
+    so throughput stays just under the limit instead of bursting into 429 responses
+    """
+    LIMIT = 30000
+    PERIOD = 600
+    SAFETY = 0.95
+
+    def __init__(self, limit: int = None, period: float = None, burst: int = 10, safety: float = None):
+        """
+        :param limit: Number of calls allowed per period, default LIMIT. Replaced by X-RateLimit-Limit once seen
+        :param period: Length of limit window in seconds, default PERIOD
+        :param burst: Number of calls which can be made back to back before pacing starts
+        :param safety: Fraction of budget actually used, leaves room for clock drift and other clients
+        """
+        self.limit = limit or self.LIMIT
+        self.period = period or self.PERIOD
+        self.burst = burst
+        self.safety = safety or self.SAFETY
+        self.rate = self.limit * self.safety / self.period
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._not_before = 0.0
+        self._lock = threading.Lock()
+
+    def _take(self, tokens: float, updated: float, rate: float, now: float, not_before: float):
+        """
+        Refill bucket and take one token from it, token count goes negative when call has to wait.
+        No call is made before not_before, waiters for the reset share it and are paced from there
+        :return: tuple (tokens, time bucket was refilled to, seconds to wait)
+        """
+        start = max(now, not_before)
+        tokens = min(float(self.burst), tokens + max(start - updated, 0.0) * rate) - 1
+        return tokens, start, (start - now) + (-tokens / rate if tokens < 0 else 0.0)
+
+    def reserve(self):
+        """
+        Reserve slot for one call
+        :return: Seconds caller has to wait before making the call
+        """
+        with self._lock:
+            self._tokens, self._updated, delay = self._take(self._tokens, self._updated, self.rate, time.monotonic(),
+                                                            self._not_before)
+        return delay
+
+    def acquire(self):
+        """
+        Block until one call can be made
+        """
+        delay = self.reserve()
+        if delay:
+            time.sleep(delay)
+
+    @staticmethod
+    def _parse_headers(headers):
+        """
+        :param headers: Response headers
+        :return: tuple (limit, left, seconds to reset) or None when headers are missing
+        """
+        try:
+            limit = int(headers['X-RateLimit-Limit'])
+            left = int(headers['X-RateLimit-Left'])
+            reset = float(str(headers['X-RateLimit-Reset']).split()[0])
+        except (KeyError, TypeError, ValueError, IndexError):
+            return None
+        return limit, left, max(reset, 1.0)
+
+    def _rate_for(self, limit: int, left: int, reset: float):
+        """
+        Rate which spends what is left of budget evenly until reset, or full budget over period once nothing is left
+        """
+        if left <= 0:
+            return limit * self.safety / self.period
+        return left * self.safety / reset
+
+    @staticmethod
+    def _adjust(tokens: float, updated: float, not_before: float, left: int, reset: float, now: float):
+        """
+        Bucket never holds more tokens than calls left. When nothing is left, calls wait until window resets
+        and bucket starts refilling only then, so waiters go one by one at new rate
+        :return: tuple (tokens, updated, not_before)
+        """
+        if left <= 0:
+            if not_before > now:
+                return tokens, max(updated, not_before), not_before
+            not_before = now + reset
+            return 1.0, not_before, not_before
+        return min(tokens, float(left)), updated, not_before
+
+    def update(self, headers):
+        """
+        Adjust pacing to budget reported by API
+        When nothing is left, next calls wait until window resets and are paced from there
+        :param headers: Response headers
+        """
+        parsed = self._parse_headers(headers)
+        if parsed is None:
+            return
+        limit, left, reset = parsed
+        with self._lock:
+            self.limit = limit
+            self.rate = self._rate_for(limit, left, reset)
+            self._tokens, self._updated, self._not_before = self._adjust(self._tokens, self._updated, self._not_before,
+                                                                         left, reset, time.monotonic())
+
+
+class FileRateLimiter(RateLimiter):
+    """
+    Token bucket kept in small file so that several processes on one host share one budget
+    File is locked with flock for every reservation, so it works on POSIX systems only
+    """
+    _STATE = struct.Struct('dddd')  # tokens, updated (wall clock), rate, not before (wall clock)
+
+    def __init__(self, path: str, limit: int = None, period: float = None, burst: int = 10, safety: float = None):
+        """
+        :param path: File holding state of bucket, created when missing
+        Other arguments are the same as for RateLimiter
+        """
+        if fcntl is None:
+            raise RuntimeError('FileRateLimiter requires fcntl, which is not available on this platform')
+        super().__init__(limit=limit, period=period, burst=burst, safety=safety)
+        self.path = path
+
+    def _locked(self, change):
+        """
+        Read state, apply change and write it back while holding exclusive lock on file
+        :param change: Callable (tokens, updated, rate, not_before, now) -> (tokens, updated, rate, not_before, result)
+        :return: result of change
+        """
+        with self._lock, open(self.path, 'a+b') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                data = f.read(self._STATE.size)
+                now = time.time()
+                if len(data) == self._STATE.size:
+                    tokens, updated, rate, not_before = self._STATE.unpack(data)
+                else:
+                    tokens, updated, rate, not_before = float(self.burst), now, self.rate, 0.0
+                tokens, updated, rate, not_before, result = change(tokens, updated, rate, not_before, now)
+                f.seek(0)
+                f.truncate()
+                f.write(self._STATE.pack(tokens, updated, rate, not_before))
+                f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+        return result
+
+    def reserve(self):
+        def take(tokens, updated, rate, not_before, now):
+            tokens, updated, delay = self._take(tokens, updated, rate, now, not_before)
+            return tokens, updated, rate, not_before, delay
+
+        return self._locked(take)
+
+    def update(self, headers):
+        parsed = self._parse_headers(headers)
+        if parsed is None:
+            return
+        limit, left, reset = parsed
+        self.limit = limit
+        new_rate = self._rate_for(limit, left, reset)
+
+        def adjust(tokens, updated, rate, not_before, now):
+            tokens, updated, not_before = self._adjust(tokens, updated, not_before, left, reset, now)
+            return tokens, updated, new_rate, not_before, None
+
+        self._locked(adjust)
@@ -0,0 +1,92 @@
+"""Retry policy for transient failures of calls to the GetResponse API"""
+import random
+import threading
+from collections import Counter
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+
+class RetryPolicy:
+    """
+    Decides whether failed call is retried and how long to wait before next attempt
+    Waiting uses exponential backoff with full jitter, Retry-After header of response takes precedence.
+    Calls which are not idempotent (POST) are retried only when API certainly did not process them,
+    i.e. on 429 or when connection could not be established
+    """
+    MAX_ATTEMPTS = 3
+    BACKOFF = 0.5
+    MAX_BACKOFF = 30
+    STATUSES = (429, 500, 502, 503, 504)
+    UNPROCESSED_STATUSES = (429,)
+    IDEMPOTENT_METHODS = ('GET', 'DELETE', 'HEAD', 'OPTIONS', 'PUT')
+
+    def __init__(self, max_attempts: int = None, backoff: float = None, max_backoff: float = None,
+                 statuses: tuple = None):
+        """
+        :param max_attempts: Number of attempts including the first one, 1 disables retries. Default MAX_ATTEMPTS
+        :param backoff: Base of exponential backoff in seconds, default BACKOFF
+        :param max_backoff: Upper bound of single wait in seconds, also caps Retry-After. Default MAX_BACKOFF
+        :param statuses: HTTP statuses which are retried, default STATUSES
+        """
+        self.max_attempts = max_attempts or self.MAX_ATTEMPTS
+        self.backoff = self.BACKOFF if backoff is None else backoff
+        self.max_backoff = max_backoff or self.MAX_BACKOFF
+        self.statuses = statuses or self.STATUSES
+        self.counters = Counter()
+        self._lock = threading.Lock()
+
+    def _count(self, *keys):
+        with self._lock:
+            self.counters.update(keys)
+
+    def should_retry(self, method: str, attempt: int, status: int = None, sent: bool = True,
+                     idempotent: bool = None, reason: str = None):
+        """
+        :param method: HTTP method of failed call
+        :param attempt: Number of attempt which failed, starting from 1
+        :param status: HTTP status of response, None when call failed without response
+        :param sent: False when request surely did not reach API, e.g. connection could not be established
+        :param idempotent: Overrides idempotency derived from method, e.g. True for POST which upserts
+        :param reason: Name of failure counted in counters when status is None
+        :return: bool
+        """
+        if idempotent is None:
+            idempotent = method.upper() in self.IDEMPOTENT_METHODS
+        if status is None:
+            retryable = idempotent or not sent
+        else:
+            retryable = status in self.statuses and (idempotent or status in self.UNPROCESSED_STATUSES)
+        if not retryable:
+            return False
+        if attempt >= self.max_attempts:
+            self._count('exhausted')
+            return False
+        self._count('retries', status or reason or 'error')
+        return True
+
+    def delay(self, attempt: int, retry_after: str = None):
+        """
+        Seconds to wait before next attempt
+        :param attempt: Number of attempt which failed, starting from 1
+        :param retry_after: Value of Retry-After header, either seconds or HTTP date
+        :return: float
+        """
+        if retry_after:
+            try:
+                seconds = float(retry_after)
+            except ValueError:
+                try:
+                    seconds = (parsedate_to_datetime(retry_after) - datetime.now(timezone.utc)).total_seconds()
+                except (TypeError, ValueError):
+                    seconds = None
+            if seconds is not None:
+                return min(max(seconds, 0.0), self.max_backoff)
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** (attempt - 1)))
+
+    def stats(self):
+        """
+        Counters for monitoring: 'retries' and 'exhausted' totals plus retries per status or failure name
+        :return: dict
+        """
+        with self._lock:
+            return dict(self.counters)
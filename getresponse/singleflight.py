@@ -0,0 +1,93 @@
+"""Coalescing of identical concurrent calls
+
+When several callers ask for the same key at once, only the first one makes the call
+and the rest wait for its result. Results are shared, so they should not be modified
+"""
+import asyncio
+import threading
+
+
+class _Call:
+    __slots__ = ('event', 'result', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalescing for threads
+    """
+
+    def __init__(self):
+        self.coalesced = 0
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, deadline=None):
+        """
+        Call fn unless call with the same key is already in flight, in which case wait for its outcome
+        :param key: Identity of call, e.g. full url
+        :param fn: Callable without arguments
+        :param deadline: getresponse.getresponsev3.Deadline of caller, waiting for call of other caller stops with
+        DeadlineExceeded when it passes
+        :return: Result of fn, exception of fn is raised in every waiting caller
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.coalesced += 1
+        if not leader:
+            if deadline is None:
+                call.event.wait()
+            else:
+                while not call.event.wait(deadline.check()):
+                    pass  # check raises DeadlineExceeded once deadline passes
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+        return call.result
+
+
+class AsyncSingleFlight:
+    """
+    Coalescing for coroutines of one event loop
+    Call runs in its own task, so cancelling one of waiting callers does not cancel it for the others
+    """
+
+    def __init__(self):
+        self.coalesced = 0
+        self._tasks = {}
+
+    async def do(self, key, coroutine_fn, deadline=None):
+        """
+        Await coroutine_fn() unless call with the same key is already in flight, in which case await its outcome
+        :param key: Identity of call, e.g. full url
+        :param coroutine_fn: Callable without arguments returning coroutine
+        :param deadline: Deadline of caller, see SingleFlight.do
+        :return: Result of coroutine
+        """
+        task = self._tasks.get(key)
+        if task is None:
+            task = self._tasks[key] = asyncio.ensure_future(coroutine_fn())
+            task.add_done_callback(lambda done: self._tasks.pop(key, None))
+        else:
+            self.coalesced += 1
+        if deadline is not None:
+            while not task.done():
+                await asyncio.wait([task], timeout=deadline.check())
+        return await asyncio.shield(task)
@@ -0,0 +1,333 @@
+"""Vectorised aggregation of campaign statistics of the GetResponse API
+
+Responses of get_campaigns_statistics_* methods are normalised into StatisticsFrame, NumPy array of
+keys (campaigns) x time buckets x metrics. Rollups over time and campaigns are array operations.
+fetch_many splits long lists of campaign ids into batches which fit into URL and requests them concurrently.
+Requires numpy
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+from getresponse.export import iter_statistics_rows
+from getresponse.getresponsev3 import GetresponseError
+
+# kind: (method of Campaigns, nesting levels of response, key column, time column)
+KINDS = {
+    'list_size': ('get_campaigns_statistics_list_size', (), 'campaignId', 'createdOn'),
+    'subscriptions': ('get_campaigns_statistics_subscriptions', ('campaignId', 'date'), 'campaignId', 'date'),
+    'removals': ('get_campaigns_statistics_removals', ('campaignId', 'date'), 'campaignId', 'date'),
+    'balance': ('get_campaigns_statistics_balance', ('date',), 'campaignId', 'date'),
+    'origins': ('get_campaigns_statistics_origins', ('date',), 'campaignId', 'date'),
+    'locations': ('get_campaigns_statistics_locations', ('countryCode',), 'countryCode', 'date'),
+}
+UNITS = {'hour': 'h', 'day': 'D', 'month': 'M', 'year': 'Y'}
+BATCH_SIZE = 100  # campaign ids per call
+MAX_IDS_LENGTH = 1500  # characters of comma separated campaign ids per call, keeps URL well below 2000 characters
+MAX_WORKERS = 8
+
+
+def _parse_buckets(values):
+    """
+    Parse time buckets, values which are not dates (e.g. 'total') become NaT. Every distinct value is parsed once
+    :param values: list of str or None
+    :return: tuple (numpy datetime64[s] array of distinct buckets, index of distinct bucket for every value)
+    """
+    distinct, inverse = numpy.unique(numpy.array(['' if value is None else str(value) for value in values]),
+                                     return_inverse=True)
+    parsed = numpy.empty(len(distinct), dtype='datetime64[s]')
+    for i, value in enumerate(distinct):
+        try:
+            parsed[i] = numpy.datetime64(value[:19].replace(' ', 'T'), 's')
+        except ValueError:
+            parsed[i] = numpy.datetime64('NaT')
+    return parsed, inverse
+
+
+class StatisticsFrame:
+    """
+    Statistics as NumPy array values[key, bucket, metric]
+    Keys are campaign ids (country codes for locations), buckets are sorted datetime64[s].
+    Values of rows without time bucket, e.g. of groupBy=total, are kept apart in totals[key, metric].
+    Missing values are 0 and present[key, bucket, metric] tells which values came from rows
+    """
+
+    def __init__(self, keys, buckets, metrics, values, present=None, totals=None):
+        """
+        :param keys: numpy array of key labels
+        :param buckets: numpy datetime64 array of time buckets
+        :param metrics: tuple of metric names
+        :param values: float array of shape (len(keys), len(buckets), len(metrics))
+        :param present: bool array of the same shape, all values are present if None
+        :param totals: float array of shape (len(keys), len(metrics)) of rows without time bucket, zeros if None
+        """
+        if numpy is None:
+            raise RuntimeError('numpy is required for statistics, install it with: pip install numpy')
+        self.keys = keys
+        self.buckets = buckets
+        self.metrics = tuple(metrics)
+        self.values = values
+        self.present = numpy.ones(values.shape, dtype=bool) if present is None else present
+        self.totals = numpy.zeros((len(keys), len(self.metrics))) if totals is None else totals
+
+    @classmethod
+    def from_rows(cls, rows, key: str = 'campaignId', time: str = 'date', default_key: str = ''):
+        """
+        :param rows: Iterable of flat dicts, see getresponse.export.iter_statistics_rows.
+        Values which are not numbers are ignored
+        :param key: Column with key
+        :param default_key: Key of rows without key column
+        :param time: Column with time bucket, rows without it or with value which is not date go to totals
+        :return: StatisticsFrame
+        """
+        if numpy is None:
+            raise RuntimeError('numpy is required for statistics, install it with: pip install numpy')
+        keys, times, metric_index, values = [], [], [], []
+        metrics = {}
+        for row in rows:
+            row_key, row_time = row.get(key), row.get(time)
+            for name, value in row.items():
+                if name == key or name == time:
+                    continue
+                try:
+                    value = float(value)
+                except (TypeError, ValueError):
+                    continue
+                keys.append(default_key if row_key is None else str(row_key))
+                times.append(row_time)
+                metric_index.append(metrics.setdefault(name, len(metrics)))
+                values.append(value)
+        key_labels, key_index = numpy.unique(numpy.array(keys, dtype=str), return_inverse=True)
+        parsed, bucket_index = _parse_buckets(times)
+        times = parsed[bucket_index]
+        metric_index, values = numpy.array(metric_index, dtype=int), numpy.array(values)
+        timed = ~numpy.isnat(times)
+        buckets, bucket_index = numpy.unique(times[timed], return_inverse=True)
+        index = (key_index[timed], bucket_index, metric_index[timed])
+        array = numpy.zeros((len(key_labels), len(buckets), len(metrics)))
+        numpy.add.at(array, index, values[timed])
+        present = numpy.zeros(array.shape, dtype=bool)
+        present[index] = True
+        totals = numpy.zeros((len(key_labels), len(metrics)))
+        numpy.add.at(totals, (key_index[~timed], metric_index[~timed]), values[~timed])
+        return cls(key_labels, buckets, list(metrics), array, present, totals)
+
+    @classmethod
+    def concat(cls, frames: list):
+        """
+        Merge frames, e.g. of batches of campaigns, into one over union of their keys, buckets and metrics.
+        Values of the same key, bucket and metric are summed
+        :return: StatisticsFrame
+        """
+        if numpy is None:
+            raise RuntimeError('numpy is required for statistics, install it with: pip install numpy')
+        keys = numpy.unique(numpy.concatenate([numpy.array([], dtype=str)] + [frame.keys for frame in frames]))
+        buckets = numpy.unique(numpy.concatenate([numpy.array([], dtype='datetime64[s]')] +
+                                                 [frame.buckets for frame in frames]))
+        metrics = list(dict.fromkeys(metric for frame in frames for metric in frame.metrics))
+        values = numpy.zeros((len(keys), len(buckets), len(metrics)))
+        present = numpy.zeros(values.shape, dtype=bool)
+        totals = numpy.zeros((len(keys), len(metrics)))
+        for frame in frames:
+            key_index = numpy.searchsorted(keys, frame.keys)
+            metric_index = [metrics.index(metric) for metric in frame.metrics]
+            index = numpy.ix_(key_index, numpy.searchsorted(buckets, frame.buckets), metric_index)
+            numpy.add.at(values, index, frame.values)
+            numpy.logical_or.at(present, index, frame.present)
+            numpy.add.at(totals, numpy.ix_(key_index, metric_index), frame.totals)
+        return cls(keys, buckets, metrics, values, present, totals)
+
+    @classmethod
+    def from_response(cls, response, kind: str, default_key: str = ''):
+        """
+        :param response: JSON response of get_campaigns_statistics_* method
+        :param kind: Key of KINDS telling which method response comes from
+        :param default_key: Key of rows when response is not split by campaign, e.g. balance
+        :return: StatisticsFrame
+        """
+        _, levels, key, time = KINDS[kind]
+        if isinstance(response, dict) and 'httpStatus' in response:
+            raise GetresponseError(response, response.get('httpStatus'))
+        return cls.from_rows(iter_statistics_rows(response, levels), key=key, time=time, default_key=default_key)
+
+    def metric(self, name: str):
+        """
+        :return: array keys x buckets of one metric
+        """
+        return self.values[:, :, self.metrics.index(name)]
+
+    def select(self, keys: list = None, metrics: list = None):
+        """
+        :return: StatisticsFrame limited to given keys and metrics, in given order
+        """
+        key_index = numpy.arange(len(self.keys)) if keys is None else \
+            numpy.array([numpy.flatnonzero(self.keys == k)[0] for k in keys], dtype=int)
+        metric_index = list(range(len(self.metrics))) if metrics is None else [self.metrics.index(m) for m in metrics]
+        return StatisticsFrame(self.keys[key_index], self.buckets, [self.metrics[i] for i in metric_index],
+                               self.values[key_index][:, :, metric_index], self.present[key_index][:, :, metric_index],
+                               self.totals[key_index][:, metric_index])
+
+    def _merge_buckets(self, unique, how: str):
+        buckets, inverse = unique
+        shape = (len(self.keys), len(buckets), len(self.metrics))
+        present = numpy.zeros(shape, dtype=bool)
+        numpy.logical_or.at(present, (slice(None), inverse), self.present)
+        if how == 'last':
+            # position of last bucket of every group in which key has value of metric, -1 if there is none
+            positions = numpy.where(self.present, numpy.arange(len(self.buckets))[None, :, None], -1)
+            last = numpy.full(shape, -1)
+            numpy.maximum.at(last, (slice(None), inverse), positions)
+            values = numpy.take_along_axis(self.values, numpy.maximum(last, 0), axis=1)
+            return StatisticsFrame(self.keys, buckets, self.metrics, numpy.where(present, values, 0), present,
+                                   self.totals)
+        values = numpy.zeros(shape)
+        numpy.add.at(values, (slice(None), inverse), self.values)
+        if how == 'mean':
+            counts = numpy.zeros(shape)
+            numpy.add.at(counts, (slice(None), inverse), self.present)
+            values = numpy.divide(values, counts, out=numpy.zeros(shape), where=counts != 0)
+        elif how != 'sum':
+            raise ValueError('Unknown aggregation {!r}, expected sum, mean or last'.format(how))
+        return StatisticsFrame(self.keys, buckets, self.metrics, values, present, self.totals)
+
+    def resample(self, unit: str, how: str = 'sum'):
+        """
+        Aggregate time buckets into coarser ones, e.g. hours into days
+        :param unit: hour, day, month or year
+        :param how: sum for flows (subscriptions, removals), last for levels (totalSubscribers) which takes last value
+        every key has in bucket, or mean of values present
+        :return: StatisticsFrame
+        """
+        coarse = self.buckets.astype('datetime64[{}]'.format(UNITS[unit])).astype('datetime64[s]')
+        return self._merge_buckets(numpy.unique(coarse, return_inverse=True), how)
+
+    def total(self):
+        """
+        :return: array keys x metrics summed over all buckets and totals
+        """
+        return self.values.sum(axis=1) + self.totals
+
+    def combined(self):
+        """
+        :return: array buckets x metrics summed over all keys
+        """
+        return self.values.sum(axis=0)
+
+    def delta(self):
+        """
+        :return: array keys x buckets-1 x metrics of change between consecutive buckets
+        """
+        return numpy.diff(self.values, axis=1)
+
+    def growth(self):
+        """
+        :return: array keys x buckets-1 x metrics of relative change between consecutive buckets, NaN after 0
+        """
+        previous = self.values[:, :-1, :]
+        return numpy.divide(self.delta(), previous, out=numpy.full(previous.shape, numpy.nan), where=previous != 0)
+
+    def rolling_mean(self, window: int):
+        """
+        :param window: Number of buckets
+        :return: array keys x buckets x metrics, first window-1 buckets are NaN
+        """
+        cumulative = numpy.cumsum(self.values, axis=1)
+        result = numpy.full(self.values.shape, numpy.nan)
+        result[:, window - 1:, :] = cumulative[:, window - 1:, :]
+        result[:, window:, :] -= cumulative[:, :-window, :]
+        result[:, window - 1:, :] /= window
+        return result
+
+
+def batch_ids(campaign_ids: list, batch_size: int = None, max_length: int = None):
+    """
+    Split campaign ids into batches for campaign_id argument of statistics methods
+    :param batch_size: Maximum number of ids in batch, default BATCH_SIZE
+    :param max_length: Maximum length of comma separated ids of batch, default MAX_IDS_LENGTH
+    :return: list of lists of ids
+    """
+    batch_size = batch_size or BATCH_SIZE
+    max_length = max_length or MAX_IDS_LENGTH
+    batches, batch, length = [], [], 0
+    for campaign_id in dict.fromkeys(campaign_ids):
+        if batch and (len(batch) == batch_size or length + 1 + len(campaign_id) > max_length):
+            batches.append(batch)
+            batch, length = [], 0
+        length += len(campaign_id) + (1 if batch else 0)
+        batch.append(campaign_id)
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def _calls(campaigns, kinds, campaign_ids: list, query: list, batch_size: int, max_length: int):
+    """
+    :return: list of (kind, comma separated ids, callable requesting statistics)
+    """
+    calls = []
+    for batch in batch_ids(campaign_ids, batch_size, max_length):
+        campaign_id = ','.join(batch)
+        for kind in kinds:
+            method = getattr(campaigns, KINDS[kind][0])
+            calls.append((kind, campaign_id, lambda method=method, campaign_id=campaign_id:
+                          method(list(query or []), campaign_id)))
+    return calls
+
+
+def _merge(kinds, calls: list, responses: list):
+    frames = {kind: [] for kind in kinds}
+    for (kind, campaign_id, _), response in zip(calls, responses):
+        frames[kind].append(StatisticsFrame.from_response(response, kind, default_key=campaign_id))
+    return {kind: StatisticsFrame.concat(parts) for kind, parts in frames.items()}
+
+
+def fetch_many(campaigns, campaign_ids: list, kinds=('subscriptions',), query: list = None, batch_size: int = None,
+               max_length: int = None, max_workers: int = None):
+    """
+    Fetch statistics of any number of campaigns, ids are split into batches (see batch_ids) and every kind of
+    every batch is requested concurrently from thread pool
+        Examples:
+                fetch_many(account.campaigns, ids, ('subscriptions', 'removals'), ['groupBy=hour'])['removals']
+    :param campaigns: getresponse.getresponsev3.Campaigns section
+    :param campaign_ids: List of campaign ids
+    :param kinds: Keys of KINDS
+    :param query: Query of statistics methods, e.g. ['groupBy=hour']
+    :param max_workers: Number of calls in flight, default MAX_WORKERS
+    :return: dict {kind: StatisticsFrame}, statistics which API does not split by campaign (list_size, balance,
+    origins) are under keys made of comma separated ids of batches. GetresponseError is raised if any call failed
+    """
+    calls = _calls(campaigns, kinds, campaign_ids, query, batch_size, max_length)
+    if len(calls) == 1:
+        return _merge(kinds, calls, [calls[0][2]()])
+    with ThreadPoolExecutor(max_workers=min(max_workers or MAX_WORKERS, len(calls) or 1)) as executor:
+        futures = [executor.submit(copy_context().run, call) for _, _, call in calls]
+        responses = [future.result() for future in futures]
+    return _merge(kinds, calls, responses)
+
+
+async def fetch_many_async(campaigns, campaign_ids: list, kinds=('subscriptions',), query: list = None,
+                           batch_size: int = None, max_length: int = None):
+    """
+    fetch_many for getresponse.aio.AsyncCampaigns, concurrency is bounded by max_concurrency of client
+    """
+    calls = _calls(campaigns, kinds, campaign_ids, query, batch_size, max_length)
+    responses = await asyncio.gather(*(call() for _, _, call in calls))
+    return _merge(kinds, calls, responses)
+
+
+def fetch(campaigns, kind: str, campaign_ids: list, query: list = None):
+    """
+    Fetch one kind of statistics, see fetch_many
+    :param campaigns: getresponse.getresponsev3.Campaigns section
+    :param kind: One of KINDS, e.g. subscriptions
+    :param campaign_ids: List of campaign ids
+    :param query: Query of statistics method, e.g. ['groupBy=hour', 'createdOn][from]=2017-03-10']
+    :return: StatisticsFrame, statistics which API does not split by campaign (list_size, balance, origins) are
+    under keys made of comma separated ids of batches
+    """
+    return fetch_many(campaigns, campaign_ids, (kind,), query)[kind]
@@ -0,0 +1,83 @@
+"""Incremental decoding of JSON arrays returned by list endpoints of the GetResponse API"""
+import codecs
+import json
+from json.decoder import JSONDecodeError
+
+CHUNK_SIZE = 65536
+
+_WHITESPACE = ' \t\n\r'
+_DELIMITERS = _WHITESPACE + ',]'
+_START, _FIRST, _ITEM, _SEPARATOR, _END = range(5)
+
+
+def iter_json_array(chunks, decoder: json.JSONDecoder = None):
+    """
+    Decode top level JSON array from stream of bytes, yielding items one by one as soon as each is complete
+    Besides the item being decoded at most one chunk is held in memory
+        Examples:
+                for contact in iter_json_array(response.iter_content(CHUNK_SIZE)):
+                    print(contact['email'])
+    :param chunks: Iterable of UTF-8 encoded bytes
+    :param decoder: Decoder used for items, default json.JSONDecoder()
+    :return: generator of items
+    :raises JSONDecodeError: when stream is not JSON array
+    """
+    decode = (decoder or json.JSONDecoder()).raw_decode
+    text = codecs.getincrementaldecoder('utf-8')()
+    chunks = iter(chunks)
+    buffer, pos, state, eof = '', 0, _START, False
+
+    def read(length: int):
+        """
+        Drop consumed part of buffer and append chunks until buffer is longer than given length or stream ends
+        """
+        nonlocal buffer, pos, eof
+        parts = [buffer[pos:]]
+        size = len(parts[0])
+        while size <= length and not eof:
+            chunk = next(chunks, None)
+            part = text.decode(b'', final=True) if chunk is None else text.decode(chunk)
+            eof = chunk is None
+            parts.append(part)
+            size += len(part)
+        buffer, pos = ''.join(parts), 0
+
+    while True:
+        while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+            pos += 1
+        if pos == len(buffer):
+            if eof:
+                break
+            read(0)
+            continue
+        char = buffer[pos]
+        if state == _START:
+            if char != '[':
+                raise JSONDecodeError('Expecting JSON array', buffer, pos)
+            pos, state = pos + 1, _FIRST
+        elif state == _END:
+            raise JSONDecodeError('Extra data', buffer, pos)
+        elif state == _SEPARATOR or (state == _FIRST and char == ']'):
+            if char == ']':
+                pos, state = pos + 1, _END
+            elif char == ',' and state == _SEPARATOR:
+                pos, state = pos + 1, _ITEM
+            else:
+                raise JSONDecodeError("Expecting ',' delimiter", buffer, pos)
+        else:
+            try:
+                item, end = decode(buffer, pos)
+            except JSONDecodeError:
+                if eof:
+                    raise
+                # item is not complete yet, at least double what is buffered so long items are not re-parsed often
+                read(2 * (len(buffer) - pos))
+                continue
+            if char not in '{["' and not eof and (end == len(buffer) or buffer[end] not in _DELIMITERS):
+                # number or literal cut by the end of buffer, e.g. 1 of 1.5, may continue in next chunk
+                read(len(buffer) - pos)
+                continue
+            yield item
+            pos, state = end, _SEPARATOR
+    if state != _END:
+        raise JSONDecodeError('Unexpected end of JSON array', buffer, pos)
@@ -0,0 +1,232 @@
+"""Incremental synchronisation of contacts of the GetResponse API
+
+ContactSync keeps high-water mark of createdOn/changedOn per campaign in cursor store. Every run asks only for
+contacts created or changed since the mark minus overlap window, which covers clock skew and contacts committed late
+on server side. Contacts seen inside the window are remembered with their version, so ones fetched again are not
+emitted twice
+"""
+import abc
+import json
+import os
+import tempfile
+import threading
+from collections import deque, namedtuple
+from datetime import datetime, timedelta, timezone
+
+from getresponse.getresponsev3 import Contacts
+from getresponse.models import Contact, convert, format_date, parse_date
+
+INSERT = 'insert'
+UPDATE = 'update'
+
+SyncEvent = namedtuple('SyncEvent', ['kind', 'contact'])
+SyncEvent.__doc__ = '''Change found by sync: INSERT or UPDATE and contact as returned by API'''
+
+
+class CursorStore(abc.ABC):
+    """
+    Storage of sync state per campaign, state is JSON serializable dict
+    """
+
+    @abc.abstractmethod
+    def load(self, key: str):
+        """
+        :return: state saved under key or None
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def save(self, key: str, state: dict):
+        raise NotImplementedError
+
+
+class MemoryCursorStore(CursorStore):
+    """
+    State kept in process, lost when process ends
+    """
+
+    def __init__(self):
+        self._states = {}
+        self._lock = threading.Lock()
+
+    def load(self, key: str):
+        with self._lock:
+            state = self._states.get(key)
+            return None if state is None else json.loads(state)
+
+    def save(self, key: str, state: dict):
+        with self._lock:
+            self._states[key] = json.dumps(state)
+
+
+class FileCursorStore(CursorStore):
+    """
+    State of all campaigns kept in JSON file, which is replaced atomically on every save,
+    so process killed in the middle of sync leaves previous state behind
+    """
+
+    def __init__(self, path: str):
+        """
+        :param path: JSON file, created on first save
+        """
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _read(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def load(self, key: str):
+        with self._lock:
+            return self._read().get(key)
+
+    def save(self, key: str, state: dict):
+        with self._lock:
+            states = self._read()
+            states[key] = state
+            fd, temporary = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)), suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(states, f)
+                os.replace(temporary, self.path)
+            except BaseException:
+                os.unlink(temporary)
+                raise
+
+
+class ContactSync:
+    """
+    Stream of contacts created or changed since previous run
+    First run of campaign emits all its contacts as inserts. State is saved only when stream is consumed to the end,
+    so interrupted run is repeated next time
+        Examples:
+                sync = ContactSync(account.contacts, FileCursorStore('sync.json'))
+                for event in sync.iter_changes('O'):
+                    if event.kind == INSERT: ...
+    """
+    OVERLAP = 600
+    PER_PAGE = 1000
+    SINCE_FORMAT = '%Y-%m-%d'
+    REQUIRED_FIELDS = ('contactId', 'createdOn', 'changedOn')
+
+    def __init__(self, contacts: Contacts, store: CursorStore = None, overlap: float = None, per_page: int = None,
+                 fields: str = None):
+        """
+        :param contacts: Contacts section
+        :param store: Where state is kept, default MemoryCursorStore
+        :param overlap: Seconds subtracted from high-water mark, default OVERLAP
+        :param per_page: Number of contacts fetched per call, default PER_PAGE
+        :param fields: Fields of contacts to fetch, contactId, createdOn and changedOn are always added
+        """
+        self.contacts = contacts
+        self.store = store or MemoryCursorStore()
+        self.overlap = timedelta(seconds=self.OVERLAP if overlap is None else overlap)
+        self.per_page = per_page or self.PER_PAGE
+        self.fields = fields and ','.join(dict.fromkeys(fields.split(',') + list(self.REQUIRED_FIELDS)))
+
+    @staticmethod
+    def _version(contact: dict):
+        """
+        :return: tuple (datetime of last change, raw value), datetime is None when contact has no parsable date
+        """
+        value = contact.get('changedOn') or contact.get('createdOn')
+        parsed = parse_date(value) if isinstance(value, str) else None
+        return (parsed if isinstance(parsed, datetime) else None), value
+
+    def _newer(self, changed: datetime, seen: str):
+        """
+        :return: True if version of contact fetched now is newer than version already emitted
+        """
+        previous, _ = self._version({'changedOn': seen})
+        return changed is not None and (previous is None or changed > previous)
+
+    def _since(self, mark: datetime):
+        """
+        :return: tuple (value of query, datetime from which server returns contacts)
+        Query is given with SINCE_FORMAT precision, so window starts at mark minus overlap rounded down
+        """
+        value = (mark - self.overlap).astimezone(timezone.utc).strftime(self.SINCE_FORMAT)
+        return value, datetime.strptime(value, self.SINCE_FORMAT).replace(tzinfo=timezone.utc)
+
+    def _pages(self, campaign_id: str, since: str):
+        query = ['campaignId=' + campaign_id] if campaign_id else []
+        kwargs = {'fields': self.fields} if self.fields else {}
+        if since is None:
+            yield from self.contacts.iter_contacts(query=query, per_page=self.per_page, stream=True, **kwargs)
+            return
+        for field in ('createdOn', 'changedOn'):
+            yield from self.contacts.iter_contacts(query=query + ['{}][from]={}'.format(field, since)],
+                                                   per_page=self.per_page, stream=True, **kwargs)
+
+    def iter_changes(self, campaign_id: str = None, model=False):
+        """
+        :param campaign_id: Campaign to sync, all contacts of account if None
+        :param model: Emit models instead of dicts, True for Contact or model class, see getresponse.models.convert
+        :return: generator of SyncEvent
+        """
+        if not model:
+            yield from self._changes(campaign_id)
+            return
+        kinds = deque()
+        contacts = convert((kinds.append(event.kind) or event.contact for event in self._changes(campaign_id)),
+                           model, Contact)
+        for contact in contacts:
+            yield SyncEvent(kinds.popleft(), contact)
+
+    def _changes(self, campaign_id: str):
+        """
+        Contacts without parsable createdOn and changedOn are emitted, but not remembered, queries from mark
+        do not return them. When run sees no dated contact, its start becomes the mark
+        :return: generator of SyncEvent with dicts
+        """
+        key = campaign_id or ''
+        state = self.store.load(key) or {}
+        mark = parse_date(state['mark']) if state.get('mark') else None
+        mark = mark if isinstance(mark, datetime) else None
+        seen = state.get('seen', {})
+        since, start = self._since(mark) if mark else (None, None)
+        started = datetime.now(timezone.utc).replace(microsecond=0)
+        emitted = set()
+        for contact in self._pages(campaign_id, since):
+            contact_id = contact.get('contactId')
+            changed, version = self._version(contact)
+            if contact_id in emitted or (contact_id in seen and not self._newer(changed, seen[contact_id])):
+                continue
+            created = contact.get('createdOn')
+            created = parse_date(created) if isinstance(created, str) else None
+            inserted = contact_id not in seen and (start is None or not isinstance(created, datetime) or
+                                                   created >= start)
+            emitted.add(contact_id)
+            if changed is not None:
+                seen[contact_id] = version
+                if mark is None or changed > mark:
+                    mark = changed
+            yield SyncEvent(INSERT if inserted else UPDATE, contact)
+        mark = mark or started
+        _, start = self._since(mark)
+        seen = {contact_id: version for contact_id, version in seen.items()
+                if self._version({'changedOn': version})[0] is not None and
+                self._version({'changedOn': version})[0] >= start}
+        self.store.save(key, {'mark': format_date(mark), 'seen': seen})
+
+    def sync(self, campaign_id: str = None, handler=None, model: bool = False):
+        """
+        Consume changes of campaign passing every event to handler
+        :param handler: Callable taking SyncEvent
+        :return: dict {INSERT: count, UPDATE: count}
+        """
+        counts = {INSERT: 0, UPDATE: 0}
+        for event in self.iter_changes(campaign_id, model=model):
+            counts[event.kind] += 1
+            if handler is not None:
+                handler(event)
+        return counts
+
+    def reset(self, campaign_id: str = None):
+        """
+        Forget state of campaign, next run emits all its contacts again
+        """
+        self.store.save(campaign_id or '', {})
@@ -0,0 +1,69 @@
+"""Building of request urls for the GetResponse API
+
+Filters are given as 'name=value' strings, e.g. query=['createdOn][from]=2017-03-10'], and become
+query[createdOn][from]=2017-03-10. Values are percent-encoded, so '&', '=', '+' or '#' in them are sent as data.
+Encoded path with filters and sort order is memoized, so building url of next page encodes only page parameters
+"""
+from functools import lru_cache
+from urllib.parse import quote
+
+# Characters of values sent as they are, the rest is percent-encoded
+SAFE = ',:@/'
+
+
+@lru_cache(maxsize=1024)
+def _name(group: str, name: str):
+    """
+    :return: Encoded 'group[name]=' or 'name=' when group is empty. Brackets of nested names are kept
+    """
+    name = quote(name, safe='[]')
+    return (group + '[' + name + ']=') if group else (name + '=')
+
+
+@lru_cache(maxsize=4096)
+def _value(value: str):
+    return quote(value, safe=SAFE)
+
+
+def _items(group: str, items):
+    """
+    :param items: 'name=value' strings, value is everything after first '='
+    :return: list of encoded 'group[name]=value'
+    """
+    parts = []
+    for item in items:
+        name, _, value = str(item).partition('=')
+        parts.append(_name(group, name) + _value(value))
+    return parts
+
+
+@lru_cache(maxsize=1024)
+def _static(path: str, query: tuple, sort: tuple):
+    """
+    Encoded path with filters and sort order, which are the same for every page of list
+    :return: tuple (str, True if it ends with '?')
+    """
+    parts = _items('query', query) + _items('sort', sort)
+    path = quote(path, safe='/-')
+    return (path + '?' + '&'.join(parts), False) if parts else (path + '?', True)
+
+
+def build_url(path: str, query: list = None, sort: list = None, params: dict = None):
+    """
+    Build url of request, part made of path, query and sort is memoized
+        Examples:
+                build_url('/contacts', ['email=a+b@test.com'], ['createdOn=desc'], {'page': 2, 'fields': None})
+                gives '/contacts?query[email]=a%2Bb@test.com&sort[createdOn]=desc&page=2'
+    :param path: Path of resource, e.g. /campaigns/O/contacts
+    :param query: Filters like ['name=value'], sent as query[name]=value
+    :param sort: Sort order like ['name=asc'], sent as sort[name]=asc
+    :param params: Other parameters like fields, page or perPage, parameters with None or '' values are left out
+    :return: str
+    """
+    static, empty = _static(path, tuple(query) if query else (), tuple(sort) if sort else ())
+    if params:
+        dynamic = '&'.join([_name('', key) + (str(value) if type(value) is int else _value(str(value)))
+                            for key, value in params.items() if value is not None and value != ''])
+        if dynamic:
+            return static + dynamic if empty else static + '&' + dynamic
+    return static[:-1] if empty else static
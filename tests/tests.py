@@ -1,13 +1,40 @@
+import asyncio
+import io
 import json
 import os
+import sqlite3
+import tempfile
+import threading
+import time
 import unittest
 from unittest import TestCase, skipIf
 import nose
 from collections import defaultdict
+from datetime import datetime, timezone
+from json.decoder import JSONDecodeError
 
 from mock import patch, MagicMock
-
-from getresponse.getresponsev3 import Campaigns, FromFields, CustomFields, Newsletters
+import requests
+
+try:
+    from aiohttp import web
+except ImportError:
+    web = None
+
+from getresponse.getresponsev3 import GetresponseClient, GetresponseError, DeadlineExceeded, deadline, GetResponse, \
+    Campaigns, FromFields, CustomFields, Newsletters, Contacts, Imports
+from getresponse.aio import AsyncGetResponse
+from getresponse.ratelimit import RateLimiter, FileRateLimiter
+from getresponse.retry import RetryPolicy
+from getresponse.cache import CacheBackend, ResponseCache, SQLiteBackend
+from getresponse.streaming import iter_json_array
+from getresponse.codec import get_codec, JSONCodec, OrjsonCodec, orjson
+from getresponse.models import Campaign, Contact, Newsletter, Projection, UnrequestedFieldWarning, convert
+from getresponse import export, statistics
+from getresponse.sync import ContactSync, CursorStore, FileCursorStore, SyncEvent, INSERT, UPDATE
+from getresponse.index import ContactIndex, ContactLookup, MemoryContactIndex, SQLiteContactIndex
+from getresponse.urls import build_url
+from getresponse.bulk import BulkContacts, CREATED, QUEUED, DUPLICATE, UPDATED, SKIPPED, FAILED
 
 API_ENDPOINT = os.getenv('API_ENDPOINT', None)
 API_KEY = os.getenv('API_KEY', None)
@@ -25,9 +52,9 @@ class TestCampaigns(TestCase):
 
     @classmethod
     def setup_class(cls):
-        cls.mock_get_patcher = patch('getresponse.getresponsev3.requests.get')
+        cls.mock_get_patcher = patch('getresponse.getresponsev3.requests.Session.get')
         cls.mock_get = cls.mock_get_patcher.start()
-        cls.mock_post_patcher = patch('getresponse.getresponsev3.requests.post')
+        cls.mock_post_patcher = patch('getresponse.getresponsev3.requests.Session.post')
         cls.mock_post = cls.mock_post_patcher.start()
         cls.getresponse = Campaigns(api_endpoint=API_ENDPOINT, api_key=API_KEY, x_domain=X_DOMAIN)
 
@@ -268,11 +295,11 @@ class TestFromFields(TestCase):
 
     @classmethod
     def setup_class(cls):
-        cls.mock_get_patcher = patch('getresponse.getresponsev3.requests.get')
+        cls.mock_get_patcher = patch('getresponse.getresponsev3.requests.Session.get')
         cls.mock_get = cls.mock_get_patcher.start()
-        cls.mock_post_patcher = patch('getresponse.getresponsev3.requests.post')
+        cls.mock_post_patcher = patch('getresponse.getresponsev3.requests.Session.post')
         cls.mock_post = cls.mock_post_patcher.start()
-        cls.mock_delete_patcher = patch('getresponse.getresponsev3.requests.delete')
+        cls.mock_delete_patcher = patch('getresponse.getresponsev3.requests.Session.delete')
         cls.mock_delete = cls.mock_delete_patcher.start()
         cls.getresponse = FromFields(api_endpoint=API_ENDPOINT, api_key=API_KEY, x_domain=X_DOMAIN)
 
@@ -362,11 +389,11 @@ class TestCustomFields(TestCase):
 
     @classmethod
     def setup_class(cls):
-        cls.mock_get_patcher = patch('getresponse.getresponsev3.requests.get')
+        cls.mock_get_patcher = patch('getresponse.getresponsev3.requests.Session.get')
         cls.mock_get = cls.mock_get_patcher.start()
-        cls.mock_post_patcher = patch('getresponse.getresponsev3.requests.post')
+        cls.mock_post_patcher = patch('getresponse.getresponsev3.requests.Session.post')
         cls.mock_post = cls.mock_post_patcher.start()
-        cls.mock_delete_patcher = patch('getresponse.getresponsev3.requests.delete')
+        cls.mock_delete_patcher = patch('getresponse.getresponsev3.requests.Session.delete')
         cls.mock_delete = cls.mock_delete_patcher.start()
         cls.getresponse = CustomFields(api_endpoint=API_ENDPOINT, api_key=API_KEY, x_domain=X_DOMAIN)
 
@@ -470,11 +497,11 @@ class TestNewsletters(TestCase):
 
     @classmethod
     def setup_class(cls):
-        cls.mock_get_patcher = patch('getresponse.getresponsev3.requests.get')
+        cls.mock_get_patcher = patch('getresponse.getresponsev3.requests.Session.get')
         cls.mock_get = cls.mock_get_patcher.start()
-        cls.mock_post_patcher = patch('getresponse.getresponsev3.requests.post')
+        cls.mock_post_patcher = patch('getresponse.getresponsev3.requests.Session.post')
         cls.mock_post = cls.mock_post_patcher.start()
-        cls.mock_delete_patcher = patch('getresponse.getresponsev3.requests.delete')
+        cls.mock_delete_patcher = patch('getresponse.getresponsev3.requests.Session.delete')
         cls.mock_delete = cls.mock_delete_patcher.start()
         cls.getresponse = Newsletters(api_endpoint=API_ENDPOINT, api_key=API_KEY, x_domain=X_DOMAIN)
 
@@ -547,6 +574,1493 @@ class TestNewsletters(TestCase):
         response = self.getresponse.post_newsletters('test', 'test auch', newsletter_from, newsletter_campaign,
                                                          newsletter_content, Newsletters.prepare_send_settings(selected_campaigns=['e']))
         self.assertEqual(response, data)
-    
+
+
+class TestGetresponseClient(TestCase):
+    """
+    Test transport of base client
+    """
+
+    def test_session_is_reused(self):
+        client = GetresponseClient(api_endpoint='https://api.getresponse.com/v3', api_key='key')
+        with patch.object(client.session, 'get') as mock_get:
+            mock_get.return_value.json.return_value = []
+            client.get('/campaigns')
+            client.get('/from-fields')
+            self.assertEqual(mock_get.call_count, 2)
+            mock_get.assert_called_with('https://api.getresponse.com/v3/from-fields', headers=client.HEADERS,
+                                        timeout=(5, 60))
+
+    def test_pool_size(self):
+        client = GetresponseClient(api_endpoint='https://api.getresponse.com/v3', api_key='key', pool_maxsize=32)
+        adapter = client.session.get_adapter('https://api.getresponse.com/v3')
+        self.assertEqual(adapter._pool_maxsize, 32)
+        self.assertEqual(adapter._pool_connections, GetresponseClient.POOL_CONNECTIONS)
+
+    def test_context_manager_closes_session(self):
+        client = GetresponseClient(api_endpoint='https://api.getresponse.com/v3', api_key='key')
+        with patch.object(client.session, 'close') as mock_close:
+            with client:
+                pass
+        mock_close.assert_called_once_with()
+
+
+class TestGetResponse(TestCase):
+    """
+    Test account level facade
+    """
+
+    def test_sections_share_client(self):
+        account = GetResponse(api_endpoint='https://api.getresponse.com/v3', api_key='key', pool_maxsize=4)
+        self.assertIs(account.campaigns._getresponse_client, account.client)
+        self.assertIs(account.contacts._getresponse_client, account.client)
+        self.assertIs(account.imports._getresponse_client, account.client)
+
+    def test_sections_created_lazily_once(self):
+        account = GetResponse(api_endpoint='https://api.getresponse.com/v3', api_key='key')
+        self.assertEqual(account._sections, {})
+        self.assertIs(account.contacts, account.contacts)
+        self.assertIsInstance(account.contacts, Contacts)
+        self.assertEqual(list(account._sections), ['contacts'])
+
+    def test_section_accepts_client(self):
+        client = GetresponseClient(api_endpoint='https://api.getresponse.com/v3', api_key='key')
+        self.assertIs(Campaigns(client=client)._getresponse_client, client)
+
+
+@skipIf(web is None, 'aiohttp is not installed')
+class TestAsyncGetResponse(TestCase):
+    """
+    Test asyncio sections against local aiohttp server
+    """
+
+    @staticmethod
+    def _run_with_server(routes, coroutine, **client_kwargs):
+        async def run():
+            app = web.Application()
+            app.add_routes(routes)
+            runner = web.AppRunner(app)
+            await runner.setup()
+            site = web.TCPSite(runner, '127.0.0.1', 0)
+            await site.start()
+            port = site._server.sockets[0].getsockname()[1]
+            try:
+                async with AsyncGetResponse(api_endpoint='http://127.0.0.1:{}/v3'.format(port), api_key='key',
+                                            **dict({'max_concurrency': 2}, **client_kwargs)) as account:
+                    return await coroutine(account)
+            finally:
+                await runner.cleanup()
+
+        return asyncio.run(run())
+
+    def test_coalesced_get(self):
+        hits = []
+
+        async def handler(request):
+            hits.append(request.path)
+            await asyncio.sleep(0.05)
+            return web.json_response({'campaignId': 'O'})
+
+        async def fetch(account):
+            return await asyncio.gather(*[account.campaigns.get_campaign('O') for _ in range(5)])
+
+        response = self._run_with_server([web.get('/v3/campaigns/O', handler)], fetch, coalesce=True)
+        self.assertEqual(response, [{'campaignId': 'O'}] * 5)
+        self.assertEqual(hits, ['/v3/campaigns/O'])
+
+    def test_import_file_and_wait(self):
+        bodies = []
+        checks = []
+
+        async def post(request):
+            bodies.append(await request.json())
+            return web.json_response({'importId': str(len(bodies))}, status=201)
+
+        async def get(request):
+            checks.append(request.match_info['import_id'])
+            return web.json_response({'importId': '1', 'status': 'finished' if len(checks) > 1 else 'uploaded'})
+
+        async def run(account):
+            imports = await account.imports.post_import_file('O', io.StringIO('email\na@test.com\n'))
+            return imports, await account.imports.wait_import('1', interval=0.001)
+
+        imports, result = self._run_with_server([web.post('/v3/imports', post),
+                                                 web.get('/v3/imports/{import_id}', get)], run)
+        self.assertEqual(imports, [{'importId': '1'}])
+        self.assertEqual(bodies[0]['contacts'], [['a@test.com']])
+        self.assertEqual(result['status'], 'finished')
+        self.assertEqual(checks, ['1', '1'])
+
+    def test_models(self):
+        async def handler(request):
+            return web.json_response([{'campaignId': 'O', 'name': 'VIP'}], headers={'TotalPages': '1'})
+
+        async def fetch(account):
+            return await account.campaigns.get_campaigns(model=True), \
+                [campaign async for campaign in account.campaigns.iter_campaigns(model=True)]
+
+        listed, iterated = self._run_with_server([web.get('/v3/campaigns', handler)], fetch)
+        self.assertEqual(listed, [Campaign(campaign_id='O', name='VIP')])
+        self.assertEqual(iterated, listed)
+
+    def test_with_statement_rejected(self):
+        async def run():
+            account = AsyncGetResponse(api_endpoint='http://127.0.0.1/v3', api_key='key')
+            try:
+                with self.assertRaisesRegex(TypeError, 'async with'):
+                    with account:
+                        pass  # pragma: no cover
+            finally:
+                await account.close()
+
+        asyncio.run(run())
+
+    def test_stream_rejected(self):
+        async def run():
+            async with AsyncGetResponse(api_endpoint='http://127.0.0.1/v3', api_key='key') as account:
+                with self.assertRaises(ValueError):
+                    account.contacts.iter_contacts(stream=True)
+                with self.assertRaises(ValueError):
+                    account.campaigns.iter_campaign_contacts('O', stream=True)
+
+        asyncio.run(run())
+
+    def test_get_campaigns_builds_same_url(self):
+        seen = []
+
+        async def handler(request):
+            seen.append((request.path_qs, request.headers['X-Auth-Token']))
+            return web.json_response([{'campaignId': 'O'}])
+
+        response = self._run_with_server([web.get('/v3/campaigns', handler)],
+                                         lambda account: account.campaigns.get_campaigns(query=['name=VIP']))
+        self.assertEqual(response, [{'campaignId': 'O'}])
+        self.assertEqual(seen, [('/v3/campaigns?query%5Bname%5D=VIP', 'api-key key')])
+
+    def test_post_contacts_and_concurrency_bound(self):
+        in_flight = []
+        peak = []
+
+        async def handler(request):
+            in_flight.append(await request.json())
+            peak.append(len(in_flight))
+            await asyncio.sleep(0.01)
+            in_flight.pop()
+            return web.Response(status=202, text='')
+
+        async def post_many(account):
+            return await asyncio.gather(*[account.contacts.post_contacts('{}@test.com'.format(i), 'O')
+                                          for i in range(6)])
+
+        response = self._run_with_server([web.post('/v3/contacts', handler)], post_many)
+        self.assertEqual(response, [''] * 6)
+        self.assertLessEqual(max(peak), 2)
+
+    def test_iter_campaign_contacts(self):
+        async def handler(request):
+            page = int(request.query['page'])
+            return web.json_response([{'contactId': str(page)}], headers={'TotalPages': '3'})
+
+        async def collect(account):
+            return [contact['contactId'] async for contact in account.campaigns.iter_campaign_contacts('O')]
+
+        response = self._run_with_server([web.get('/v3/campaigns/O/contacts', handler)], collect)
+        self.assertEqual(response, ['1', '2', '3'])
+
+    def test_export_contacts(self):
+        async def handler(request):
+            page = int(request.query['page'])
+            await asyncio.sleep(0.01 * (5 - page))
+            return web.json_response([{'contactId': str(page)}], headers={'TotalPages': '4'})
+
+        async def collect(account):
+            ordered = [contact['contactId'] async for contact in account.contacts.export_contacts()]
+            completed = [contact['contactId'] async for contact in account.contacts.export_contacts(ordered=False)]
+            return ordered, completed
+
+        ordered, completed = self._run_with_server([web.get('/v3/contacts', handler)], collect)
+        self.assertEqual(ordered, ['1', '2', '3', '4'])
+        self.assertEqual(sorted(completed), ['1', '2', '3', '4'])
+
+
+class TestPagination(TestCase):
+    """
+    Test iter_* methods of sections
+    """
+
+    @staticmethod
+    def _page(items, headers=None):
+        response = MagicMock()
+        response.json.return_value = items
+        response.headers = headers or {}
+        return response
+
+    def test_iter_contacts_stops_on_total_pages(self):
+        contacts = Contacts(api_endpoint='https://api.getresponse.com/v3', api_key='key')
+        pages = [self._page([{'contactId': 'a'}, {'contactId': 'b'}], {'TotalPages': '2'}),
+                 self._page([{'contactId': 'c'}], {'TotalPages': '2'})]
+        with patch.object(contacts._getresponse_client.session, 'get', side_effect=pages) as mock_get:
+            result = [contact['contactId'] for contact in contacts.iter_contacts(query=['name=x'], per_page=2)]
+        self.assertEqual(result, ['a', 'b', 'c'])
+        self.assertEqual([call[0][0] for call in mock_get.call_args_list],
+                         ['https://api.getresponse.com/v3/contacts?query[name]=x&page=1&perPage=2',
+                          'https://api.getresponse.com/v3/contacts?query[name]=x&page=2&perPage=2'])
+
+    def test_iter_custom_fields_without_headers_stops_on_empty_page(self):
+        custom_fields = CustomFields(api_endpoint='https://api.getresponse.com/v3', api_key='key')
+        pages = [self._page([{'customFieldId': 'a'}]), self._page([])]
+        with patch.object(custom_fields._getresponse_client.session, 'get', side_effect=pages):
+            result = list(custom_fields.iter_custom_fields(per_page=1, sort='asc'))
+        self.assertEqual(result, [{'customFieldId': 'a'}])
+
+    def test_export_contacts_fetches_remaining_pages_in_parallel(self):
+        contacts = Contacts(api_endpoint='https://api.getresponse.com/v3', api_key='key')
+
+        def get(url, headers, timeout):
+            page = int(url.split('page=')[1].split('&')[0])
+            return self._page([{'contactId': str(page)}], {'TotalPages': '5'})
+
+        with patch.object(contacts._getresponse_client.session, 'get', side_effect=get) as mock_get:
+            result = [contact['contactId'] for contact in contacts.export_contacts(max_workers=3, max_in_flight=2)]
+        self.assertEqual(result, ['1', '2', '3', '4', '5'])
+        self.assertEqual(mock_get.call_count, 5)
+
+    def test_fetch_pages_as_completed(self):
+        client = GetresponseClient(api_endpoint='https://api.getresponse.com/v3', api_key='key')
+
+        def get(url, headers, timeout):
+            return self._page([url[-1]], {'TotalPages': '4'})
+
+        with patch.object(client.session, 'get', side_effect=get):
+            pages = list(client.fetch_pages(lambda page: '/contacts?page={}'.format(page), ordered=False))
+        self.assertEqual(pages[0], (1, ['1']))
+        self.assertEqual(sorted(pages), [(1, ['1']), (2, ['2']), (3, ['3']), (4, ['4'])])
+
+    def test_iter_raises_on_error_response(self):
+        campaigns = Campaigns(api_endpoint='https://api.getresponse.com/v3', api_key='key')
+        error = {'httpStatus': 401, 'code': 1014, 'message': 'Problem during authentication process'}
+        with patch.object(campaigns._getresponse_client.session, 'get', return_value=self._page(error)):
+            with self.assertRaises(GetresponseError) as context:
+                list(campaigns.iter_campaigns())
+        self.assertEqual(context.exception.response, error)
+
+
+class TestRateLimiter(TestCase):
+    """
+    Test client side throttling
+    """
+
+    def test_paces_after_burst(self):
+        limiter = RateLimiter(limit=10, period=1, burst=2, safety=1)
+        self.assertEqual(limiter.reserve(), 0)
+        self.assertEqual(limiter.reserve(), 0)
+        self.assertAlmostEqual(limiter.reserve(), 0.1, places=2)
+        self.assertAlmostEqual(limiter.reserve(), 0.2, places=2)
+
+    def test_update_spreads_budget_left_until_reset(self):
+        limiter = RateLimiter(burst=1, safety=1)
+        limiter.update({'X-RateLimit-Limit': '30000', 'X-RateLimit-Left': '100', 'X-RateLimit-Reset': '50 seconds'})
+        self.assertEqual(limiter.rate, 2)
+        limiter.update({'X-RateLimit-Limit': '30000', 'X-RateLimit-Left': '0', 'X-RateLimit-Reset': '30 seconds'})
+        self.assertAlmostEqual(limiter.reserve(), 30, places=0)
+
+    def test_waiters_share_reset_after_exhaustion(self):
+        limiter = RateLimiter(limit=600, period=60, burst=10, safety=1)
+        limiter.update({'X-RateLimit-Limit': '600', 'X-RateLimit-Left': '0', 'X-RateLimit-Reset': '300 seconds'})
+        delays = []
+        threads = [threading.Thread(target=lambda: delays.append(limiter.reserve())) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        limiter.update({'X-RateLimit-Limit': '600', 'X-RateLimit-Left': '0', 'X-RateLimit-Reset': '299 seconds'})
+        delays.append(limiter.reserve())
+        for expected, delay in zip([300, 300.1, 300.2, 300.3, 300.4, 300.5], sorted(delays)):
+            self.assertAlmostEqual(delay, expected, places=1)
+
+    def test_tokens_never_exceed_calls_left(self):
+        limiter = RateLimiter(limit=30000, period=600, burst=10, safety=1)
+        limiter.update({'X-RateLimit-Limit': '30000', 'X-RateLimit-Left': '5', 'X-RateLimit-Reset': '50 seconds'})
+        delays = [limiter.reserve() for _ in range(10)]
+        self.assertEqual(delays[:5], [0] * 5)
+        self.assertTrue(all(delay > 0 for delay in delays[5:]))
+        with tempfile.TemporaryDirectory() as directory:
+            limiter = FileRateLimiter(os.path.join(directory, 'budget'), burst=10, safety=1)
+            limiter.update({'X-RateLimit-Limit': '30000', 'X-RateLimit-Left': '2', 'X-RateLimit-Reset': '50 seconds'})
+            self.assertEqual([limiter.reserve() > 0 for _ in range(3)], [False, False, True])
+            limiter.update({'X-RateLimit-Limit': '30000', 'X-RateLimit-Left': '0', 'X-RateLimit-Reset': '40 seconds'})
+            self.assertAlmostEqual(limiter.reserve(), 40, places=0)
+            self.assertAlmostEqual(limiter.reserve(), 40 + 600 / 30000, places=1)
+
+    def test_update_ignores_missing_headers(self):
+        limiter = RateLimiter(limit=600, period=60)
+        limiter.update({})
+        self.assertEqual(limiter.rate, 600 * RateLimiter.SAFETY / 60)
+
+    def test_file_limiter_shares_budget_between_instances(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'budget')
+            first = FileRateLimiter(path, limit=10, period=1, burst=1, safety=1)
+            second = FileRateLimiter(path, limit=10, period=1, burst=1, safety=1)
+            self.assertEqual(first.reserve(), 0)
+            self.assertAlmostEqual(second.reserve(), 0.1, places=2)
+
+    def test_client_waits_for_limiter_and_reports_headers(self):
+        limiter = MagicMock()
+        limiter.reserve.return_value = 0
+        client = GetresponseClient(api_endpoint='https://api.getresponse.com/v3', api_key='key', rate_limiter=limiter)
+        with patch.object(client.session, 'post') as mock_post:
+            mock_post.return_value.headers = {'X-RateLimit-Left': '5'}
+            client.post('/contacts', data='{}')
+        limiter.reserve.assert_called_once_with()
+        limiter.update.assert_called_once_with({'X-RateLimit-Left': '5'})
+
+
+class TestRetryPolicy(TestCase):
+    """
+    Test retries of transient failures
+    """
+
+    @staticmethod
+    def _response(status_code, body=None, headers=None):
+        response = MagicMock()
+        response.status_code = status_code
+        response.json.return_value = body
+        response.headers = headers or {}
+        return response
+
+    def _contacts(self, **policy_kwargs):
+        client = GetresponseClient(api_endpoint='https://api.getresponse.com/v3', api_key='key',
+                                   retry_policy=RetryPolicy(backoff=0, **policy_kwargs))
+        return Contacts(client=client), client
+
+    def test_get_retried_on_503(self):
+        contacts, client = self._contacts()
+        responses = [self._response(503), self._response(502), self._response(200, {'contactId': 'a'})]
+        with patch.object(client.session, 'get', side_effect=responses) as mock_get:
+            self.assertEqual(contacts.get_contact('a'), {'contactId': 'a'})
+        self.assertEqual(mock_get.call_count, 3)
+        self.assertEqual(client.retry_policy.stats(), {'retries': 2, 503: 1, 502: 1})
+
+    def test_post_contacts_retried_only_when_not_processed(self):
+        contacts, client = self._contacts()
+        with patch.object(client.session, 'post', return_value=self._response(503, {})) as mock_post:
+            contacts.post_contacts('a@test.com', 'O')
+        self.assertEqual(mock_post.call_count, 1)
+        with patch.object(client.session, 'post', side_effect=[self._response(429), self._response(202, '')]) \
+                as mock_post:
+            contacts.post_contacts('a@test.com', 'O')
+        self.assertEqual(mock_post.call_count, 2)
+
+    def test_idempotent_post_retried(self):
+        contacts, client = self._contacts()
+        responses = [self._response(500), self._response(200, [])]
+        with patch.object(client.session, 'post', side_effect=responses) as mock_post:
+            contacts.update_contact_customs('a', {'customFieldValues': []})
+        self.assertEqual(mock_post.call_count, 2)
+
+    def test_connection_errors_exhaust_attempts(self):
+        contacts, client = self._contacts(max_attempts=2)
+        with patch.object(client.session, 'get', side_effect=requests.exceptions.ConnectionError) as mock_get:
+            with self.assertRaises(requests.exceptions.ConnectionError):
+                contacts.get_contact('a')
+        self.assertEqual(mock_get.call_count, 2)
+        self.assertEqual(client.retry_policy.stats(), {'retries': 1, 'ConnectionError': 1, 'exhausted': 1})
+
+    def test_non_json_body_raises(self):
+        contacts, client = self._contacts(max_attempts=1)
+        response = self._response(502, headers={})
+        response.json.side_effect = json.JSONDecodeError('Expecting value', '<html>', 0)
+        response.text = '<html>'
+        with patch.object(client.session, 'get', return_value=response):
+            with self.assertRaises(GetresponseError) as context:
+                contacts.get_contact('a')
+        self.assertEqual(context.exception.status_code, 502)
+
+    def test_delay_honors_retry_after_and_jitter(self):
+        policy = RetryPolicy(backoff=1, max_backoff=10)
+        self.assertEqual(policy.delay(1, '3'), 3)
+        self.assertEqual(policy.delay(1, '3600'), 10)
+        self.assertEqual(policy.delay(1, 'Wed, 21 Oct 2015 07:28:00 GMT'), 0)
+        for attempt in range(1, 8):
+            self.assertLessEqual(policy.delay(attempt), min(10, 2 ** (attempt - 1)))
+
+
+class TestTimeouts(TestCase):
+    """
+    Test call timeouts and deadlines
+    """
+
+    @staticmethod
+    def _response(body, headers=None, status_code=200):
+        response = MagicMock()
+        response.status_code = status_code
+        response.json.return_value = body
+        response.headers = headers or {}
+        return response
+
+    def test_per_call_timeout(self):
+        client = GetresponseClient(api_endpoint='https://api.getresponse.com/v3', api_key='key', timeout=(2, 20))
+        with patch.object(client.session, 'get', return_value=self._response([])) as mock_get:
+            client.get('/campaigns')
+            self.assertEqual(mock_get.call_args[1]['timeout'], (2, 20))
+            client.get('/campaigns', timeout=3)
+            self.assertEqual(mock_get.call_args[1]['timeout'], (3, 3))
+
+    def test_deadline_bounds_call_timeout(self):
+        contacts = Contacts(api_endpoint='https://api.getresponse.com/v3', api_key='key')
+        with patch.object(contacts._getresponse_client.session, 'get', return_value=self._response({})) as mock_get:
+            with deadline(2):
+                contacts.get_contact('a')
+        connect, read = mock_get.call_args[1]['timeout']
+        self.assertLessEqual(connect, 2)
+        self.assertLessEqual(read, 2)
+
+    def test_deadline_spans_retries(self):
+        client = GetresponseClient(api_endpoint='https://api.getresponse.com/v3', api_key='key',
+                                   retry_policy=RetryPolicy(max_attempts=5))
+        response = self._response({}, {'Retry-After': '10'}, status_code=503)
+        with patch.object(client.session, 'get', return_value=response) as mock_get:
+            with self.assertRaises(DeadlineExceeded):
+                with deadline(1):
+                    client.get('/contacts/a')
+        self.assertEqual(mock_get.call_count, 1)
+
+    def test_deadline_timeout_applies_to_prefetched_pages(self):
+        contacts = Contacts(api_endpoint='https://api.getresponse.com/v3', api_key='key')
+        pages = [self._response([{'contactId': 'a'}], {'TotalPages': '2'}),
+                 self._response([{'contactId': 'b'}], {'TotalPages': '2'})]
+        with patch.object(contacts._getresponse_client.session, 'get', side_effect=pages) as mock_get:
+            with deadline(timeout=(1, 4)):
+                list(contacts.iter_contacts())
+        self.assertEqual([call[1]['timeout'] for call in mock_get.call_args_list], [(1, 4), (1, 4)])
+
+    def test_nested_deadline_cannot_extend_outer(self):
+        with deadline(1) as outer:
+            with deadline(100) as inner:
+                self.assertEqual(inner.expires, outer.expires)
+
+
+class TestResponseCache(TestCase):
+    """
+    Test caching of GET responses
+    """
+
+    @staticmethod
+    def _response(body, status_code=200):
+        response = MagicMock()
+        response.status_code = status_code
+        response.json.return_value = body
+        response.content = json.dumps(body).encode()
+        response.headers = {}
+        return response
+
+    def setUp(self):
+        self.cache = ResponseCache()
+        client = GetresponseClient(api_endpoint='https://api.getresponse.com/v3', api_key='key', cache=self.cache)
+        self.account = GetResponse(client=client)
+
+    def test_get_campaign_served_from_cache(self):
+        with patch.object(self.account.client.session, 'get', return_value=self._response({'campaignId': 'O'})) \
+                as mock_get:
+            self.assertEqual(self.account.campaigns.get_campaign('O'), {'campaignId': 'O'})
+            self.assertEqual(self.account.campaigns.get_campaign('O'), {'campaignId': 'O'})
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertEqual(self.cache.stats()['hits'], 1)
+        self.assertEqual(self.cache.stats()['misses'], 1)
+
+    def test_uncached_endpoints_and_errors(self):
+        with patch.object(self.account.client.session, 'get', return_value=self._response({'contactId': 'a'})) \
+                as mock_get:
+            self.account.contacts.get_contact('a')
+            self.account.contacts.get_contact('a')
+        self.assertEqual(mock_get.call_count, 2)
+        with patch.object(self.account.client.session, 'get', return_value=self._response({}, 404)) as mock_get:
+            self.account.custom_fields.get_custom_field('x')
+            self.account.custom_fields.get_custom_field('x')
+        self.assertEqual(mock_get.call_count, 2)
+        self.assertEqual(self.cache.stats()['entries'], 0)
+
+    def test_write_invalidates_related_entries(self):
+        with patch.object(self.account.client.session, 'get', return_value=self._response([])):
+            self.account.custom_fields.get_custom_fields()
+            self.account.from_fields.get_from_fields()
+        with patch.object(self.account.client.session, 'post', return_value=self._response({}, 201)):
+            self.account.custom_fields.post_custom_field('field', 'text', False, ['a'])
+        self.assertEqual(self.cache.stats()['entries'], 1)
+        self.assertEqual(self.cache.stats()['invalidations'], 1)
+
+    def test_write_invalidates_entries_of_other_resources(self):
+        cache = ResponseCache(ttls={}, default_ttl=60)
+        for key, path in (('1', '/campaigns/statistics/list-size'), ('2', '/campaigns/O/contacts'),
+                          ('3', '/contacts'), ('4', '/campaigns/O')):
+            cache.set(key, path, [], size=2)
+        cache.invalidate('/contacts/a')
+        self.assertEqual([cache.get(key)[0] for key in '1234'], [False, False, False, True])
+        cache.set('1', '/campaigns/statistics/list-size', [], size=2)
+        cache.invalidate('/newsletters')
+        self.assertEqual(cache.get('1'), (False, None))
+        self.assertEqual(cache.stats()['invalidations'], 4)
+
+    def test_expired_entry_revalidated_with_etag(self):
+        cache = ResponseCache(ttls={'/campaigns*': 0.01})
+        client = GetresponseClient(api_endpoint='https://api.getresponse.com/v3', api_key='key', cache=cache)
+        campaigns = Campaigns(client=client)
+        response = self._response([{'campaignId': 'O'}])
+        response.headers = {'ETag': '"v1"', 'Last-Modified': 'Wed, 21 Oct 2015 07:28:00 GMT'}
+        not_modified = self._response(None, 304)
+        with patch.object(client.session, 'get', side_effect=[response, not_modified]) as mock_get:
+            first = campaigns.get_campaigns()
+            time.sleep(0.02)
+            second = campaigns.get_campaigns()
+        self.assertIs(first, second)
+        self.assertEqual(mock_get.call_args[1]['headers']['If-None-Match'], '"v1"')
+        self.assertEqual(mock_get.call_args[1]['headers']['If-Modified-Since'], 'Wed, 21 Oct 2015 07:28:00 GMT')
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(cache.stats()['misses'], 1)
+        self.assertEqual(cache.stats()['revalidations'], 1)
+
+    def test_changed_entry_replaced_after_revalidation(self):
+        cache = ResponseCache(ttls={'/campaigns*': 0.01})
+        client = GetresponseClient(api_endpoint='https://api.getresponse.com/v3', api_key='key', cache=cache)
+        old, new = self._response(['old']), self._response(['new'])
+        old.headers = {'ETag': '"v1"'}
+        new.headers = {'ETag': '"v2"'}
+        with patch.object(client.session, 'get', side_effect=[old, new]):
+            client.get('/campaigns')
+            time.sleep(0.02)
+            self.assertEqual(client.get('/campaigns'), ['new'])
+        self.assertEqual(cache.validators(client._cache_prefix + '/campaigns'), {'If-None-Match': '"v2"'})
+
+    def test_lru_eviction_and_ttl(self):
+        cache = ResponseCache(ttls={'/a*': 60, '/b*': 0.01}, max_entries=2)
+        cache.set('1', '/a/1', 1)
+        cache.set('2', '/a/2', 2)
+        cache.get('1')
+        cache.set('3', '/a/3', 3)
+        self.assertEqual(cache.get('2'), (False, None))
+        self.assertEqual(cache.get('1'), (True, 1))
+        self.assertEqual(cache.stats()['evictions'], 1)
+        cache.set('4', '/b', 4)
+        time.sleep(0.02)
+        self.assertEqual(cache.get('4'), (False, None))
+        cache.set('5', '/c', 5)
+        self.assertEqual(cache.get('5'), (False, None))
+
+    def test_size_bound(self):
+        cache = ResponseCache(default_ttl=60, max_bytes=10)
+        cache.set('1', '/x', 1, size=6)
+        cache.set('2', '/y', 2, size=6)
+        self.assertEqual(cache.stats()['entries'], 1)
+        self.assertEqual(cache.stats()['bytes'], 6)
+
+
+class TestSQLiteBackend(TestCase):
+    """
+    Test on-disk cache backend shared between processes
+    """
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'cache.sqlite')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_entries_shared_between_caches(self):
+        writer = ResponseCache(backend=SQLiteBackend(self.path))
+        reader = ResponseCache(backend=SQLiteBackend(self.path))
+        writer.set('k', '/custom-fields', [{'customFieldId': 'a'}], size=10, etag='"v1"')
+        self.assertEqual(reader.get('k'), (True, [{'customFieldId': 'a'}]))
+        self.assertEqual(reader.validators('k'), {'If-None-Match': '"v1"'})
+        self.assertEqual(reader.stats()['entries'], 1)
+
+    def test_client_reads_reference_data_from_disk(self):
+        response = MagicMock()
+        response.status_code = 200
+        response.json.return_value = [{'customFieldId': 'a'}]
+        response.content = b'[{"customFieldId": "a"}]'
+        response.headers = {}
+        first = GetresponseClient(api_endpoint='https://api.getresponse.com/v3', api_key='key',
+                                  cache=ResponseCache(backend=SQLiteBackend(self.path)))
+        second = GetresponseClient(api_endpoint='https://api.getresponse.com/v3', api_key='key',
+                                   cache=ResponseCache(backend=SQLiteBackend(self.path)))
+        with patch.object(first.session, 'get', return_value=response):
+            CustomFields(client=first).get_custom_fields()
+        with patch.object(second.session, 'get') as mock_get:
+            self.assertEqual(CustomFields(client=second).get_custom_fields(), [{'customFieldId': 'a'}])
+        mock_get.assert_not_called()
+
+    def test_lru_eviction_and_invalidation(self):
+        backend = SQLiteBackend(self.path, max_entries=2)
+        backend.USED_RESOLUTION = 0
+        cache = ResponseCache(backend=backend, ttls={}, default_ttl=60)
+        cache.set('1', '/campaigns/1', 1, size=1)
+        time.sleep(0.01)
+        cache.set('2', '/campaigns/2/contacts', 2, size=1)
+        time.sleep(0.01)
+        cache.get('1')
+        cache.set('3', '/custom-fields', 3, size=1)
+        self.assertEqual(cache.get('2'), (False, None))
+        self.assertEqual(cache.stats()['evictions'], 1)
+        cache.set('4', '/campaigns/4/contacts', 4, size=1)
+        cache.invalidate('/contacts')
+        self.assertEqual(cache.get('4'), (False, None))
+        self.assertEqual(cache.get('3'), (True, 3))
+
+    def test_load_does_not_wait_for_writers(self):
+        with patch.object(SQLiteBackend, 'BUSY_TIMEOUT', 0.1):
+            backend = SQLiteBackend(self.path)
+        cache = ResponseCache(backend=backend, ttls={}, default_ttl=60)
+        cache.set('1', '/campaigns/1', 1, size=1)
+        writer = sqlite3.connect(self.path, isolation_level=None)
+        writer.execute('BEGIN IMMEDIATE')
+        try:
+            self.assertEqual(cache.get('1'), (True, 1))
+        finally:
+            writer.execute('ROLLBACK')
+            writer.close()
+        used = backend._database.connection().execute('SELECT used FROM entries').fetchone()[0]
+        backend.USED_RESOLUTION = 0
+        cache.get('1')
+        self.assertGreater(backend._database.connection().execute('SELECT used FROM entries').fetchone()[0], used)
+
+    def test_expired_entry_without_validators_removed(self):
+        cache = ResponseCache(backend=SQLiteBackend(self.path), ttls={'/from-fields*': 0.01})
+        cache.set('1', '/from-fields', [], size=2)
+        time.sleep(0.02)
+        self.assertEqual(cache.get('1'), (False, None))
+        self.assertEqual(cache.stats()['entries'], 0)
+
+
+class TestCoalescing(TestCase):
+    """
+    Test single-flight of identical concurrent GET calls
+    """
+
+    def test_concurrent_threads_share_one_request(self):
+        client = GetresponseClient(api_endpoint='https://api.getresponse.com/v3', api_key='key', coalesce=True)
+        contacts = Contacts(client=client)
+        started = threading.Event()
+
+        def get(url, headers, timeout):
+            started.set()
+            time.sleep(0.1)
+            response = MagicMock()
+            response.status_code = 200
+            response.json.return_value = {'contactId': url[-1]}
+            return response
+
+        results = []
+        with patch.object(client.session, 'get', side_effect=get) as mock_get:
+            first = threading.Thread(target=lambda: results.append(contacts.get_contact('a')))
+            first.start()
+            started.wait()
+            others = [threading.Thread(target=lambda: results.append(contacts.get_contact('a'))) for _ in range(4)]
+            for thread in others:
+                thread.start()
+            for thread in [first] + others:
+                thread.join()
+            contacts.get_contact('b')
+        self.assertEqual(results, [{'contactId': 'a'}] * 5)
+        self.assertEqual(mock_get.call_count, 2)
+        self.assertEqual(client.single_flight.coalesced, 4)
+
+    def test_error_raised_in_every_waiting_thread(self):
+        client = GetresponseClient(api_endpoint='https://api.getresponse.com/v3', api_key='key', coalesce=True,
+                                   retry_policy=RetryPolicy(max_attempts=1))
+
+        def get(url, headers, timeout):
+            time.sleep(0.05)
+            raise requests.exceptions.ConnectionError()
+
+        errors = []
+
+        def call():
+            try:
+                client.get('/contacts/a')
+            except requests.exceptions.ConnectionError as e:
+                errors.append(e)
+
+        with patch.object(client.session, 'get', side_effect=get):
+            threads = [threading.Thread(target=call) for _ in range(3)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(len(errors), 3)
+
+    def test_waiting_thread_bounded_by_own_deadline(self):
+        client = GetresponseClient(api_endpoint='https://api.getresponse.com/v3', api_key='key', coalesce=True)
+        started = threading.Event()
+        response = MagicMock(status_code=200, headers={})
+        response.json.return_value = {'contactId': 'a'}
+
+        def get(url, headers, timeout):
+            started.set()
+            time.sleep(0.5)
+            return response
+
+        results = []
+        with patch.object(client.session, 'get', side_effect=get):
+            leader = threading.Thread(target=lambda: results.append(client.get('/contacts/a')))
+            leader.start()
+            started.wait()
+            begin = time.monotonic()
+            with self.assertRaises(DeadlineExceeded):
+                with deadline(0.05):
+                    client.get('/contacts/a')
+            self.assertLess(time.monotonic() - begin, 0.3)
+            leader.join()
+        self.assertEqual(results, [{'contactId': 'a'}])
+        self.assertEqual(client.single_flight.coalesced, 1)
+
+
+class TestBulkContacts(TestCase):
+    def setUp(self):
+        self.contacts = Contacts(api_endpoint='https://api.getresponse.com/v3', api_key='key')
+        self.client = self.contacts._getresponse_client
+
+    @staticmethod
+    def _response(status, body=''):
+        response = requests.Response()
+        response.status_code = status
+        response._content = body.encode()
+        return response
+
+    def test_records_validated_and_reported(self):
+        def post(url, data, headers, timeout):
+            email = json.loads(data)['email']
+            if email == 'dup@test.com':
+                return self._response(409, '{"message": "Contact already added"}')
+            if email == 'bad@test.com':
+                return self._response(400, '{"message": "Invalid customFieldId"}')
+            return self._response(202)
+
+        records = [{'email': 'a@test.com', 'name': 'A'}, {'email': 'not an email'},
+                   {'email': 'dup@test.com'}, {'email': 'bad@test.com'},
+                   {'email': 'b@test.com', 'campaignId': 'X'}, {'email': 'c@test.com', 'customFieldValues': {}}]
+        with patch.object(self.client.session, 'post', side_effect=post) as mock_post:
+            report = BulkContacts(self.contacts, batch_size=2).post_contacts(iter(records), campaign_id='O')
+        self.assertEqual(mock_post.call_count, 4)
+        self.assertEqual([result.status for result in report.results],
+                         [QUEUED, FAILED, DUPLICATE, FAILED, QUEUED, FAILED])
+        self.assertEqual(report.results[2].reason, 'Contact already added')
+        self.assertEqual(report.results[3].reason, 'Invalid customFieldId')
+        self.assertEqual(report.counts[FAILED], 3)
+        payloads = sorted(json.loads(call[1]['data'])['campaign']['campaignId'] for call in mock_post.call_args_list)
+        self.assertEqual(payloads, ['O', 'O', 'O', 'X'])
+
+    def test_missing_campaign_and_transport_errors(self):
+        def post(url, data, headers, timeout):
+            raise requests.exceptions.ReadTimeout()
+
+        self.client.retry_policy = RetryPolicy(max_attempts=1)
+        with patch.object(self.client.session, 'post', side_effect=post):
+            results = list(BulkContacts(self.contacts).iter_post_contacts([{'email': 'a@test.com'},
+                                                                           {'email': 'b@test.com', 'campaignId': 'O'}]))
+        results.sort()
+        self.assertEqual(results[0].reason, 'Missing campaignId')
+        self.assertEqual(results[1].status, FAILED)
+        self.assertTrue(results[1].reason.startswith('ReadTimeout'))
+
+    def test_calls_in_flight_bounded(self):
+        lock = threading.Lock()
+        in_flight = [0, 0]
+
+        def post(url, data, headers, timeout):
+            with lock:
+                in_flight[0] += 1
+                in_flight[1] = max(in_flight)
+            time.sleep(0.01)
+            with lock:
+                in_flight[0] -= 1
+            return self._response(201)
+
+        records = ({'email': 'c{}@test.com'.format(i)} for i in range(40))
+        with patch.object(self.client.session, 'post', side_effect=post):
+            report = BulkContacts(self.contacts, max_workers=4).post_contacts(records, campaign_id='O')
+        self.assertEqual(report.counts[CREATED], 40)
+        self.assertLessEqual(in_flight[1], 4)
+
+    def test_custom_field_updates_merged_and_no_op_skipped(self):
+        def post(url, data, headers, timeout):
+            if url.endswith('/contacts/Z/custom-fields'):
+                return self._response(404, '{"message": "Contact not found"}')
+            return self._response(200, '{}')
+
+        bulk = BulkContacts(self.contacts)
+        bulk.remember([{'contactId': 'V', 'customFieldValues': [{'customFieldId': 'n', 'value': ['gold']}]},
+                       {'contactId': 'W', 'customFieldValues': [{'customFieldId': 'n', 'value': ['gold']}]}])
+        updates = [('V', {'n': 'gold'}), ('W', {'n': 'silver'}), ('V', {'k': ['a', 'b']}), ('W', {'n': 'gold'}),
+                   ('Z', {'n': 'gold'})]
+        progress = []
+        with patch.object(self.client.session, 'post', side_effect=post) as mock_post:
+            report = bulk.update_contact_customs(iter(updates), progress=lambda done, total: progress.append(total))
+        self.assertEqual([(result.key, result.status) for result in report.results],
+                         [('V', UPDATED), ('W', SKIPPED), ('Z', FAILED)])
+        self.assertEqual(report.results[2].reason, 'Contact not found')
+        self.assertEqual(progress, [3, 3, 3])
+        self.assertEqual(mock_post.call_count, 2)
+        data = [json.loads(call[1]['data']) for call in mock_post.call_args_list
+                if call[0][0].endswith('/contacts/V/custom-fields')][0]
+        self.assertEqual(data, {'customFieldValues': [{'customFieldId': 'k', 'value': ['a', 'b']}]})
+        self.assertEqual(bulk.custom_field_values['V'], {'n': ['gold'], 'k': ['a', 'b']})
+        self.assertNotIn('Z', bulk.custom_field_values)
+
+        with patch.object(self.client.session, 'post', side_effect=post) as mock_post:
+            report = bulk.update_contact_customs([('V', {'k': ['a', 'b']})])
+        self.assertEqual(report.counts[SKIPPED], 1)
+        self.assertFalse(mock_post.called)
+
+    def test_custom_field_updates_dispatched_by_window(self):
+        read = []
+
+        def updates():
+            for i in range(7):
+                read.append(i)
+                yield ('V' if i % 3 == 0 else str(i)), {'n': str(i)}
+
+        bulk = BulkContacts(self.contacts, max_workers=1)
+        sent = []
+
+        def post(url, data, headers, timeout):
+            sent.append((url.split('/')[-2], json.loads(data)['customFieldValues'][0]['value'], len(read)))
+            return self._response(200, '{}')
+
+        with patch.object(self.client.session, 'post', side_effect=post):
+            results = list(bulk.iter_update_contact_customs(updates(), window=2))
+        self.assertEqual([result.index for result in results], list(range(7)))
+        self.assertEqual(sent[0], ('V', ['0'], 2))
+        self.assertEqual([contact_id for contact_id, _, _ in sent], ['V', '1', '2', 'V', '4', '5', 'V'])
+        self.assertEqual(bulk.custom_field_values['V'], {'n': ['6']})
+
+
+class TestImports(TestCase):
+    def setUp(self):
+        self.imports = Imports(api_endpoint='https://api.getresponse.com/v3', api_key='key')
+        self.client = self.imports._getresponse_client
+
+    def test_post_import_file_in_chunks(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, newline='') as f:
+            f.write('email,name\n' + ''.join('c{0}@test.com,C{0}\n'.format(i) for i in range(5)))
+        self.addCleanup(os.unlink, f.name)
+        mock_response = MagicMock(status_code=201)
+        mock_response.json.return_value = {'importId': 'I'}
+        with patch.object(self.client.session, 'post', return_value=mock_response) as mock_post:
+            result = self.imports.post_import_file('O', f.name, chunk_size=2)
+        self.assertEqual(result, [{'importId': 'I'}] * 3)
+        bodies = [json.loads(call[1]['data']) for call in mock_post.call_args_list]
+        self.assertEqual([len(body['contacts']) for body in bodies], [2, 2, 1])
+        self.assertEqual(bodies[0], {'campaign': {'campaignId': 'O'}, 'fieldMapping': ['email', 'name'],
+                                     'contacts': [['c0@test.com', 'C0'], ['c1@test.com', 'C1']]})
+        self.assertTrue(all(call[0][0].endswith('/imports') for call in mock_post.call_args_list))
+
+    def test_post_import_file_closes_file_on_error(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, newline='') as f:
+            f.write('email\nc0@test.com\n')
+        self.addCleanup(os.unlink, f.name)
+        opened = []
+
+        def open_csv(file):
+            opened.append(open(file, newline=''))
+            return opened[-1]
+
+        with patch.object(Imports, '_open_csv', side_effect=open_csv), \
+                patch.object(self.client, 'post', side_effect=requests.exceptions.ConnectionError()):
+            with self.assertRaises(requests.exceptions.ConnectionError):
+                self.imports.post_import_file('O', f.name)
+        self.assertTrue(opened[0].closed)
+        with open(f.name, newline='') as given:
+            with patch.object(self.client, 'post', side_effect=requests.exceptions.ConnectionError()):
+                with self.assertRaises(requests.exceptions.ConnectionError):
+                    self.imports.post_import_file('O', given)
+            self.assertFalse(given.closed)
+
+    def test_wait_import_polls_with_backoff(self):
+        statuses = iter(['uploaded', 'approved', 'finished'])
+
+        def get(url, headers, timeout):
+            response = MagicMock(status_code=200, headers={})
+            response.json.return_value = {'importId': 'I', 'status': next(statuses)}
+            return response
+
+        seen = []
+        with patch.object(self.client.session, 'get', side_effect=get) as mock_get, \
+                patch.object(self.client, 'sleep') as mock_sleep:
+            result = self.imports.wait_import('I', interval=1, max_interval=1.5, progress=seen.append)
+        self.assertEqual(result['status'], 'finished')
+        self.assertEqual([item['status'] for item in seen], ['uploaded', 'approved', 'finished'])
+        self.assertEqual([call[0][0] for call in mock_sleep.call_args_list], [1, 1.5])
+        self.assertEqual(mock_get.call_args[0][0], 'https://api.getresponse.com/v3/imports/I')
+
+    def test_wait_import_timeout(self):
+        response = MagicMock(status_code=200, headers={})
+        response.json.return_value = {'importId': 'I', 'status': 'uploaded'}
+        with patch.object(self.client.session, 'get', return_value=response):
+            with self.assertRaises(DeadlineExceeded):
+                self.imports.wait_import('I', timeout=0.05, interval=0.02)
+
+
+class TestStreaming(TestCase):
+    @staticmethod
+    def _response(status, body, headers=None):
+        response = requests.Response()
+        response.status_code = status
+        response.raw = io.BytesIO(body.encode())
+        response.headers.update(headers or {})
+        return response
+
+    def test_iter_json_array_across_chunk_boundaries(self):
+        items = [{'contactId': 'a', 'name': 'Zoë', 'values': [1, 2.5, None]}, -12.5e3, 'x"]', True, [], {}]
+        raw = json.dumps(items, ensure_ascii=False, indent=2).encode()
+        for size in (1, 3, 7, len(raw)):
+            self.assertEqual(list(iter_json_array(raw[i:i + size] for i in range(0, len(raw), size))), items)
+        self.assertEqual(list(iter_json_array([b' [ ] '])), [])
+        for invalid in (b'{"message": "error"}', b'[1, 2', b'[1 2]', b'[1]x'):
+            with self.assertRaises(JSONDecodeError):
+                list(iter_json_array([invalid]))
+
+    def test_iter_contacts_stream(self):
+        pages = {1: [{'contactId': 'a'}, {'contactId': 'b'}], 2: [{'contactId': 'c'}]}
+        contacts = Contacts(api_endpoint='https://api.getresponse.com/v3', api_key='key')
+
+        def get(url, headers, timeout, stream):
+            self.assertTrue(stream)
+            page = int(url.split('page=')[1].split('&')[0])
+            return self._response(200, json.dumps(pages[page]), {'TotalPages': '2'})
+
+        with patch.object(contacts._getresponse_client.session, 'get', side_effect=get) as mock_get:
+            result = list(contacts.iter_contacts(per_page=2, stream=True))
+        self.assertEqual([contact['contactId'] for contact in result], ['a', 'b', 'c'])
+        self.assertEqual(mock_get.call_count, 2)
+
+    def test_stream_page_error(self):
+        client = GetresponseClient(api_endpoint='https://api.getresponse.com/v3', api_key='key')
+        with patch.object(client.session, 'get', return_value=self._response(400, '{"message": "Bad query"}')):
+            with self.assertRaises(GetresponseError) as raised:
+                client.stream_page('/contacts')
+        self.assertEqual(raised.exception.status_code, 400)
+        self.assertEqual(raised.exception.response, {'message': 'Bad query'})
+
+
+class TestCodec(TestCase):
+    def test_get_codec(self):
+        self.assertIsInstance(get_codec(), JSONCodec)
+        self.assertIsInstance(get_codec('json'), JSONCodec)
+        codec = JSONCodec()
+        self.assertIs(get_codec(codec), codec)
+        with self.assertRaises(ValueError):
+            get_codec('yaml')
+
+    def test_default_codec_keeps_request_body(self):
+        client = GetresponseClient(api_endpoint='https://api.getresponse.com/v3', api_key='key')
+        mock_response = MagicMock(status_code=200)
+        mock_response.json.return_value = {'contactId': 'a'}
+        with patch.object(client.session, 'post', return_value=mock_response) as mock_post:
+            self.assertEqual(client.post('/contacts', data={'email': 'ż@test.com'}), {'contactId': 'a'})
+            client.post('/contacts', data='{}')
+        self.assertEqual(json.loads(mock_post.call_args_list[0][1]['data']), {'email': 'ż@test.com'})
+        self.assertEqual(mock_post.call_args_list[1][1]['data'], '{}')
+
+    @skipIf(orjson is None, 'orjson is not installed')
+    def test_orjson_codec(self):
+        self.assertIsInstance(get_codec('auto'), OrjsonCodec)
+        contacts = Contacts(client=GetresponseClient(api_endpoint='https://api.getresponse.com/v3', api_key='key',
+                                                     codec='orjson', retry_policy=RetryPolicy(max_attempts=1)))
+        client = contacts._getresponse_client
+        mock_response = MagicMock(status_code=201, content=b'{"contactId": "a"}')
+        with patch.object(client.session, 'post', return_value=mock_response) as mock_post:
+            self.assertEqual(contacts.post_contacts('a@test.com', 'O'), {'contactId': 'a'})
+        data = mock_post.call_args[1]['data']
+        self.assertIsInstance(data, bytes)
+        self.assertEqual(json.loads(data), {'email': 'a@test.com', 'campaign': {'campaignId': 'O'}})
+        mock_response = MagicMock(status_code=502, content=b'<html>Bad gateway</html>', text='<html>Bad gateway</html>')
+        with patch.object(client.session, 'get', return_value=mock_response):
+            with self.assertRaises(GetresponseError) as raised:
+                client.get_page('/contacts')
+        self.assertEqual(raised.exception.status_code, 502)
+
+
+class TestModels(TestCase):
+    CONTACT = {'contactId': 'pV3r', 'name': 'John', 'email': 'john@test.com', 'origin': 'api', 'note': None,
+               'createdOn': '2017-03-13T19:24:59+0000', 'dayOfCycle': '2', 'unknownField': 1,
+               'campaign': {'campaignId': 'O', 'href': 'https://api.getresponse.com/v3/campaigns/O', 'name': 'VIP'},
+               'customFieldValues': [{'customFieldId': 'n', 'value': ['gold'], 'values': ['gold']}]}
+
+    @staticmethod
+    def _open_test_data(section, filename):
+        directory = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+        with open(os.path.join(directory, 'testdata', section, filename + '.json')) as f:
+            return json.load(f)
+
+    def test_campaign_round_trip(self):
+        data = self._open_test_data('campaigns', 'get_campaign_id')
+        campaign = Campaign.from_dict(data)
+        self.assertEqual(campaign.campaign_id, 'O')
+        self.assertEqual(campaign.language_code, 'RU')
+        self.assertEqual(campaign.created_on.year, 2017)
+        self.assertEqual(campaign.created_on.utcoffset().total_seconds(), 0)
+        self.assertFalse(hasattr(campaign, '__dict__'))
+        self.assertEqual(campaign.to_dict(), {key: value for key, value in data.items() if value is not None})
+
+    def test_contact_lazy_nested_values(self):
+        first, second = convert([self.CONTACT, dict(self.CONTACT, contactId='x',
+                                                    campaign=dict(self.CONTACT['campaign']))], True, Contact)
+        self.assertIs(second._campaign, first._campaign)
+        self.assertIsNot(Contact.from_dict(dict(self.CONTACT, campaign=dict(self.CONTACT['campaign'])))._campaign,
+                         first._campaign)
+        self.assertIsInstance(first._created_on, str)
+        self.assertEqual(first.created_on.day, 13)
+        self.assertEqual(first.campaign, Campaign(campaign_id='O', name='VIP',
+                                                  href='https://api.getresponse.com/v3/campaigns/O'))
+        self.assertEqual(first.custom_field_values, {'n': ['gold']})
+        self.assertEqual(first.extra, {'unknownField': 1})
+        self.assertIsNone(first.note)
+        data = first.to_dict()
+        self.assertEqual(data['createdOn'], self.CONTACT['createdOn'])
+        self.assertEqual(data['customFieldValues'], self.CONTACT['customFieldValues'])
+        self.assertEqual(data['unknownField'], 1)
+        self.assertEqual(first, Contact.from_dict(self.CONTACT))
+        first.custom_field_values['k'] = ['a']
+        self.assertEqual(first.to_dict()['customFieldValues'], self.CONTACT['customFieldValues'] +
+                         [{'customFieldId': 'k', 'value': ['a']}])
+
+    def test_to_dict_returns_copies(self):
+        first, second = convert(iter([self.CONTACT, dict(self.CONTACT, contactId='x')]), True, Contact)
+        self.assertIs(second._campaign, first._campaign)
+        first.to_dict()['campaign']['name'] = 'changed'
+        first.to_dict()['customFieldValues'][0]['value'].append('silver')
+        self.assertEqual(second.to_dict()['campaign']['name'], 'VIP')
+        self.assertEqual(first.to_dict(), Contact.from_dict(self.CONTACT).to_dict())
+
+    def test_sections_return_models_on_request(self):
+        contacts = Contacts(api_endpoint='https://api.getresponse.com/v3', api_key='key')
+        client = contacts._getresponse_client
+        mock_response = MagicMock(status_code=200, headers={'TotalPages': '1'})
+        mock_response.json.return_value = [self.CONTACT]
+        with patch.object(client.session, 'get', return_value=mock_response):
+            self.assertEqual(contacts.get_contacts(), [self.CONTACT])
+            listed = contacts.get_contacts(model=True)
+            iterated = list(contacts.iter_contacts(model=True))
+        self.assertEqual([contact.email for contact in listed], ['john@test.com'])
+        self.assertEqual(iterated, listed)
+        mock_response.json.return_value = {'httpStatus': 404, 'message': 'Resource not found'}
+        with patch.object(client.session, 'get', return_value=mock_response):
+            self.assertEqual(contacts.get_contact('x', model=True)['httpStatus'], 404)
+        newsletters = Newsletters(client=client)
+        mock_response.json.return_value = self._open_test_data('newsletters', 'get_newsletters')
+        with patch.object(client.session, 'get', return_value=mock_response):
+            newsletter, = newsletters.get_newsletters(model=True)
+        self.assertIsInstance(newsletter, Newsletter)
+        self.assertEqual(newsletter.campaign.campaign_id, 'O')
+        self.assertEqual(newsletter.send_on.hour, 19)
+
+    def test_projection(self):
+        projection = Projection(Contact, 'email, createdOn,unknownField')
+        self.assertEqual(projection.fields, 'contactId,email,createdOn,unknownField')
+        contacts = Contacts(api_endpoint='https://api.getresponse.com/v3', api_key='key')
+        mock_response = MagicMock(status_code=200, headers={'TotalPages': '1'})
+        mock_response.json.return_value = [self.CONTACT]
+        with patch.object(contacts._getresponse_client.session, 'get', return_value=mock_response) as mock_get:
+            contact, = projection(contacts.iter_contacts, query=['name=John'], per_page=10)
+        self.assertEqual(mock_get.call_args[0][0], 'https://api.getresponse.com/v3/contacts?query[name]=John'
+                                                   '&fields=contactId,email,createdOn,unknownField&page=1&perPage=10')
+        self.assertIsInstance(contact, projection.model)
+        self.assertFalse(hasattr(contact, '__dict__'))
+        self.assertEqual((contact.contact_id, contact.email, contact.created_on.day), ('pV3r', 'john@test.com', 13))
+        self.assertEqual(contact.to_dict(), {'contactId': 'pV3r', 'email': 'john@test.com',
+                                             'createdOn': '2017-03-13T19:24:59+0000', 'unknownField': 1})
+        with self.assertWarns(UnrequestedFieldWarning):
+            self.assertIsNone(contact.name)
+        with self.assertWarns(UnrequestedFieldWarning):
+            self.assertIsNone(contact.campaign)
+        self.assertIsNone(contact.name)
+        self.assertEqual(projection.unrequested, {'name': 2, 'campaign': 1})
+        with self.assertRaises(AttributeError):
+            contact.missing
+
+
+class TestExport(TestCase):
+    RECORDS = [{'contactId': str(i), 'email': 'c{}@test.com'.format(i), 'scoring': i, 'note': None,
+                'campaign': {'campaignId': 'O'}, 'tags': [{'tagId': 't'}]} for i in range(5)]
+
+    def test_columns_in_chunks(self):
+        chunks = list(export.iter_columns(iter(self.RECORDS), chunk_size=2))
+        self.assertEqual([len(chunk['contactId']) for chunk in chunks], [2, 2, 1])
+        self.assertEqual(list(chunks[0]), ['contactId', 'email', 'scoring', 'note', 'campaign.campaignId', 'tags'])
+        self.assertEqual(chunks[0]['tags'], ['[{"tagId": "t"}]'] * 2)
+        chunks = list(export.iter_columns([Contact.from_dict(record) for record in self.RECORDS],
+                                          columns=['email', 'campaign.campaignId', 'missing']))
+        self.assertEqual(chunks, [{'email': [record['email'] for record in self.RECORDS],
+                                   'campaign.campaignId': ['O'] * 5, 'missing': [None] * 5}])
+
+    def test_csv(self):
+        f = io.StringIO()
+        rows = export.to_csv(iter(self.RECORDS), f, columns=['contactId', 'scoring', 'note'], chunk_size=2)
+        self.assertEqual(rows, 5)
+        self.assertEqual(f.getvalue().splitlines(),
+                         ['contactId,scoring,note'] + ['{0},{0},'.format(i) for i in range(5)])
+
+    def test_statistics_rows(self):
+        response = {'3': {'2017-03-10': {'import': 2, 'api': 1}, '2017-03-11': {'import': 1, 'api': 0}},
+                    'd': {'2017-03-10': {'import': 5, 'api': 0}}}
+        self.assertEqual(list(export.iter_statistics_rows(response)),
+                         [{'campaignId': '3', 'date': '2017-03-10', 'import': 2, 'api': 1},
+                          {'campaignId': '3', 'date': '2017-03-11', 'import': 1, 'api': 0},
+                          {'campaignId': 'd', 'date': '2017-03-10', 'import': 5, 'api': 0}])
+        self.assertEqual(list(export.iter_statistics_rows([{'totalSubscribers': 3}])), [{'totalSubscribers': 3}])
+
+    @skipIf(export.pyarrow is None, 'pyarrow is not installed')
+    def test_arrow_and_parquet(self):
+        table = export.to_arrow(self.RECORDS, chunk_size=2)
+        self.assertEqual(table.num_rows, 5)
+        self.assertEqual(str(table.schema.field('scoring').type), 'int64')
+        self.assertEqual(str(table.schema.field('note').type), 'string')
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'contacts.parquet')
+            self.assertEqual(export.to_parquet(iter(self.RECORDS), path, chunk_size=2), 5)
+            self.assertEqual(export.pyarrow.parquet.read_table(path).to_pydict(), table.to_pydict())
+
+    @skipIf(export.pyarrow is None, 'pyarrow is not installed')
+    def test_arrow_types_drifting_between_chunks(self):
+        records = [{'id': 'a', 'score': 1, 'extra': None}, {'id': 'b', 'score': 2, 'extra': None},
+                   {'id': 'c', 'score': 1.5, 'extra': 7}]
+        table = export.to_arrow(records, chunk_size=2)
+        self.assertEqual(str(table.schema.field('score').type), 'double')
+        self.assertEqual(str(table.schema.field('extra').type), 'int64')
+        self.assertEqual(table.to_pydict()['score'], [1, 2, 1.5])
+        self.assertEqual(table.to_pydict()['extra'], [None, None, 7])
+        with self.assertRaises(TypeError):
+            export.to_arrow(records + [{'id': 'd', 'score': 'high'}], chunk_size=1)
+        with self.assertRaises(export.pyarrow.ArrowInvalid):
+            export.to_arrow(records, schema=table.schema.set(1, table.schema.field('score').with_type(
+                export.pyarrow.int64())))
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'contacts.parquet')
+            self.assertEqual(export.to_parquet(iter(records), path, chunk_size=2), 3)
+            self.assertEqual(export.pyarrow.parquet.read_table(path).to_pydict(), table.to_pydict())
+            self.assertEqual(export.pyarrow.parquet.read_table(path).schema, table.schema)
+            os.remove(path)
+            with self.assertRaises(TypeError):
+                export.to_parquet(records, path, chunk_size=2, sample_size=2)
+            self.assertEqual(os.listdir(directory), [])
+            self.assertEqual(export.to_parquet(records, path, chunk_size=2, schema=table.schema, sample_size=2), 3)
+            self.assertEqual(export.pyarrow.parquet.read_table(path).to_pydict(), table.to_pydict())
+
+    @skipIf(export.pyarrow is None, 'pyarrow is not installed')
+    def test_ipc(self):
+        table = export.to_arrow(self.RECORDS)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'contacts.arrow')
+            self.assertEqual(export.to_ipc(iter(self.RECORDS), path, chunk_size=2), 5)
+            with export.pyarrow.ipc.open_file(path) as reader:
+                self.assertEqual(reader.num_record_batches, 3)
+                self.assertEqual(reader.read_all().to_pydict(), table.to_pydict())
+            self.assertEqual(export.to_ipc(iter(self.RECORDS), path, chunk_size=2, stream=True), 5)
+            with export.pyarrow.ipc.open_stream(path) as reader:
+                self.assertEqual(reader.read_all().to_pydict(), table.to_pydict())
+            self.assertEqual(export.to_ipc([], path, columns=['email']), 0)
+            self.assertEqual(sorted(os.listdir(directory)), ['contacts.arrow'])
+
+    @skipIf(export.numpy is None or export.pandas is None, 'numpy and pandas are not installed')
+    def test_numpy_and_pandas(self):
+        columns = export.to_numpy(self.RECORDS, chunk_size=2)
+        self.assertEqual(columns['scoring'].dtype.kind, 'i')
+        self.assertEqual(columns['scoring'].sum(), 10)
+        self.assertEqual(list(columns['email']), [record['email'] for record in self.RECORDS])
+        frame = export.to_pandas(self.RECORDS, columns=['contactId', 'scoring'])
+        self.assertEqual(list(frame.columns), ['contactId', 'scoring'])
+        self.assertEqual(frame['scoring'].sum(), 10)
+
+
+@skipIf(statistics.numpy is None, 'numpy is not installed')
+class TestStatistics(TestCase):
+    ROWS = [{'campaignId': campaign, 'date': '2017-{:02d}-{:02d} {:02d}:00:00'.format(month, day, hour),
+             'import': 1, 'totalSubscribers': hour + day}
+            for campaign in ('3', 'd') for month in (1, 2) for day in (1, 2) for hour in (0, 5)]
+
+    def test_from_response(self):
+        response = {'3': {'2017-03-11': {'import': 1, 'api': 0}, '2017-03-10': {'import': 2, 'api': 1}},
+                    'd': {'2017-03-10': {'import': 5, 'api': 0}}}
+        frame = statistics.StatisticsFrame.from_response(response, 'subscriptions')
+        self.assertEqual(list(frame.keys), ['3', 'd'])
+        self.assertEqual([str(bucket) for bucket in frame.buckets], ['2017-03-10T00:00:00', '2017-03-11T00:00:00'])
+        self.assertEqual(frame.metrics, ('import', 'api'))
+        self.assertEqual(frame.metric('import').tolist(), [[2, 1], [5, 0]])
+        self.assertEqual(frame.total().tolist(), [[3, 1], [5, 0]])
+        self.assertEqual(frame.combined().tolist(), [[7, 1], [1, 0]])
+        locations = statistics.StatisticsFrame.from_response(
+            TestCampaigns._open_test_data('get_campaigns_statistics_locations'), 'locations')
+        self.assertEqual((list(locations.keys), locations.metrics, locations.total().tolist()),
+                         (['RU'], ('amount',), [[3]]))
+        with self.assertRaises(GetresponseError):
+            statistics.StatisticsFrame.from_response({'httpStatus': 400}, 'removals')
+
+    def test_resample_and_growth(self):
+        frame = statistics.StatisticsFrame.from_rows(self.ROWS)
+        self.assertEqual(frame.values.shape, (2, 8, 2))
+        days = frame.resample('day')
+        self.assertEqual(len(days.buckets), 4)
+        self.assertEqual(days.metric('import').tolist(), [[2] * 4] * 2)
+        months = days.resample('month')
+        self.assertEqual([str(bucket) for bucket in months.buckets], ['2017-01-01T00:00:00', '2017-02-01T00:00:00'])
+        self.assertEqual(months.metric('import').tolist(), [[4, 4], [4, 4]])
+        levels = frame.resample('month', how='last')
+        self.assertEqual(levels.metric('totalSubscribers').tolist(), [[7, 7], [7, 7]])
+        self.assertEqual(frame.resample('day', how='mean').metric('totalSubscribers')[0].tolist(), [3.5, 4.5] * 2)
+        growth = frame.select(keys=['d'], metrics=['totalSubscribers']).growth()
+        self.assertEqual(growth.shape, (1, 7, 1))
+        self.assertEqual(growth[0, :2, 0].tolist(), [5, -4 / 6])
+        self.assertTrue(statistics.numpy.isnan(frame.select(metrics=['import']).rolling_mean(3)[0, :2, 0]).all())
+        self.assertEqual(frame.rolling_mean(2)[0, 1:, 1].tolist(), [3.5, 4, 4.5, 4, 3.5, 4, 4.5])
+
+    def test_last_value_and_totals_apart_from_buckets(self):
+        rows = [{'campaignId': '3', 'date': '2017-01-01', 'totalSubscribers': 5},
+                {'campaignId': '3', 'date': '2017-01-20', 'totalSubscribers': 8},
+                {'campaignId': 'd', 'date': '2017-01-01', 'totalSubscribers': 4},
+                {'campaignId': 'd', 'date': '2017-02-01', 'totalSubscribers': 6},
+                {'campaignId': '3', 'date': 'total', 'totalSubscribers': 100}]
+        frame = statistics.StatisticsFrame.from_rows(rows)
+        self.assertEqual([str(bucket) for bucket in frame.buckets],
+                         ['2017-01-01T00:00:00', '2017-01-20T00:00:00', '2017-02-01T00:00:00'])
+        self.assertEqual(frame.totals.tolist(), [[100], [0]])
+        self.assertEqual(frame.total().tolist(), [[113], [10]])
+        self.assertEqual(frame.delta().shape, (2, 2, 1))
+        months = frame.resample('month', how='last')
+        self.assertEqual(months.metric('totalSubscribers').tolist(), [[8, 0], [4, 6]])
+        self.assertEqual(months.present[:, :, 0].tolist(), [[True, False], [True, True]])
+        self.assertEqual(months.resample('year', how='last').metric('totalSubscribers').tolist(), [[8], [6]])
+        self.assertEqual(frame.resample('year', how='mean').metric('totalSubscribers').tolist(), [[6.5], [5]])
+        merged = statistics.StatisticsFrame.concat([frame.select(keys=['3']), frame.select(keys=['d'])])
+        self.assertEqual(merged.resample('year', how='last').metric('totalSubscribers').tolist(), [[8], [6]])
+        self.assertEqual(merged.totals.tolist(), [[100], [0]])
+
+    def test_fetch(self):
+        campaigns = MagicMock()
+        campaigns.get_campaigns_statistics_balance.return_value = TestCampaigns._open_test_data(
+            'get_campaigns_statistics_balance')
+        frame = statistics.fetch(campaigns, 'balance', ['3', 'd'], ['groupBy=total'])
+        campaigns.get_campaigns_statistics_balance.assert_called_once_with(['groupBy=total'], '3,d')
+        self.assertEqual(list(frame.keys), ['3,d'])
+        self.assertEqual(frame.total()[0, frame.metrics.index('subscriptions.import')], 9905)
+
+    def test_batch_ids(self):
+        self.assertEqual(statistics.batch_ids(['a', 'bb', 'a', 'ccc', 'dd'], batch_size=2),
+                         [['a', 'bb'], ['ccc', 'dd']])
+        self.assertEqual(statistics.batch_ids(['aaa', 'bbb', 'ccc'], max_length=7), [['aaa', 'bbb'], ['ccc']])
+        self.assertEqual(statistics.batch_ids([]), [])
+
+    def test_fetch_many(self):
+        def subscriptions(query, campaign_id):
+            return {campaign: {'2017-03-10': {'import': int(campaign)}, '2017-03-1' + campaign: {'api': 1}}
+                    for campaign in campaign_id.split(',')}
+
+        campaigns = MagicMock()
+        campaigns.get_campaigns_statistics_subscriptions.side_effect = subscriptions
+        campaigns.get_campaigns_statistics_list_size.return_value = [{'totalSubscribers': 3}]
+        ids = [str(i) for i in range(1, 8)]
+        frames = statistics.fetch_many(campaigns, ids, ('subscriptions', 'list_size'), ['groupBy=day'], batch_size=3)
+        self.assertEqual(sorted(call[0][1] for call in campaigns.get_campaigns_statistics_subscriptions.call_args_list),
+                         ['1,2,3', '4,5,6', '7'])
+        self.assertEqual(campaigns.get_campaigns_statistics_list_size.call_count, 3)
+        frame = frames['subscriptions']
+        self.assertEqual(list(frame.keys), ids)
+        self.assertEqual(frame.metrics, ('import', 'api'))
+        self.assertEqual(len(frame.buckets), 8)
+        self.assertEqual(frame.metric('import')[:, 0].tolist(), list(range(1, 8)))
+        self.assertEqual(frame.combined()[:, 1].tolist(), [0] + [1] * 7)
+        self.assertEqual(list(frames['list_size'].keys), ['1,2,3', '4,5,6', '7'])
+        campaigns.get_campaigns_statistics_removals.return_value = {'httpStatus': 400, 'message': 'Too many ids'}
+        with self.assertRaises(GetresponseError):
+            statistics.fetch_many(campaigns, ids, ('removals',))
+
+    def test_fetch_many_async(self):
+        calls = []
+
+        class Campaigns:
+            async def get_campaigns_statistics_removals(self, query, campaign_id):
+                calls.append(campaign_id)
+                return {campaign: {'total': {'bounce': 1}} for campaign in campaign_id.split(',')}
+
+        frames = asyncio.run(statistics.fetch_many_async(Campaigns(), ['a', 'b', 'c'], ('removals',), batch_size=2))
+        self.assertEqual(calls, ['a,b', 'c'])
+        self.assertEqual(frames['removals'].total().tolist(), [[1], [1], [1]])
+
+
+class TestContactSync(TestCase):
+    @staticmethod
+    def _contact(contact_id, created, changed=None):
+        contact = {'contactId': contact_id, 'email': contact_id + '@test.com',
+                   'createdOn': '2017-03-10T{}:00:00+0000'.format(created)}
+        if changed:
+            contact['changedOn'] = '2017-03-10T{}:00:00+0000'.format(changed)
+        return contact
+
+    def _sync(self, sync, pages, campaign_id='O'):
+        def iter_contacts(query, **kwargs):
+            calls.append((query, kwargs))
+            return iter(pages[len(calls) - 1])
+
+        calls = []
+        sync.contacts.iter_contacts.side_effect = iter_contacts
+        events = list(sync.iter_changes(campaign_id))
+        return [(event.kind, event.contact['contactId']) for event in events], calls
+
+    def test_incremental_runs(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'sync.json')
+            sync = ContactSync(MagicMock(), FileCursorStore(path), fields='email')
+            a, b = self._contact('a', 10), self._contact('b', 11)
+            events, calls = self._sync(sync, [[a, b]])
+            self.assertEqual(events, [(INSERT, 'a'), (INSERT, 'b')])
+            self.assertEqual(calls, [(['campaignId=O'], {'per_page': 1000, 'stream': True,
+                                                          'fields': 'email,contactId,createdOn,changedOn'})])
+            self.assertEqual(FileCursorStore(path).load('O')['mark'], '2017-03-10T11:00:00+0000')
+
+            c, a_changed = self._contact('c', 12), self._contact('a', 10, 13)
+            sync = ContactSync(MagicMock(), FileCursorStore(path))
+            events, calls = self._sync(sync, [[a, b, c], [a_changed, c]])
+            self.assertEqual(events, [(INSERT, 'c'), (UPDATE, 'a')])
+            self.assertEqual([query for query, _ in calls], [['campaignId=O', 'createdOn][from]=2017-03-10'],
+                                                             ['campaignId=O', 'changedOn][from]=2017-03-10']])
+            events, _ = self._sync(sync, [[a, b, c], [a_changed]])
+            self.assertEqual(events, [])
+
+    def test_interrupted_run_is_repeated(self):
+        sync = ContactSync(MagicMock(), overlap=0)
+        changes = sync.iter_changes()
+        sync.contacts.iter_contacts.return_value = iter([self._contact('a', 10), self._contact('b', 11)])
+        self.assertEqual(next(changes).contact['contactId'], 'a')
+        changes.close()
+        self.assertIsNone(sync.store.load(''))
+        events, _ = self._sync(sync, [[self._contact('a', 10)]], campaign_id=None)
+        self.assertEqual(events, [(INSERT, 'a')])
+        sync.contacts.iter_contacts.side_effect = None
+        sync.contacts.iter_contacts.return_value = iter([])
+        self.assertEqual(sync.sync(), {INSERT: 0, UPDATE: 0})
+        sync.reset()
+        self.assertEqual(sync.store.load(''), {})
+
+    def test_empty_run_and_contacts_without_dates(self):
+        sync = ContactSync(MagicMock(), overlap=0)
+        self._sync(sync, [[]])
+        mark = sync.store.load('O')['mark']
+        self.assertEqual(mark[:10], datetime.now(timezone.utc).strftime('%Y-%m-%d'))
+        undated = {'contactId': 'u', 'email': 'u@test.com', 'createdOn': None}
+        events, calls = self._sync(sync, [[undated, self._contact('a', 10)], []])
+        self.assertEqual([query for query, _ in calls], [['campaignId=O', 'createdOn][from]=' + mark[:10]],
+                                                         ['campaignId=O', 'changedOn][from]=' + mark[:10]]])
+        self.assertEqual(events, [(INSERT, 'u'), (UPDATE, 'a')])
+        self.assertEqual(sync.store.load('O'), {'mark': mark, 'seen': {}})
+
+    def test_models_follow_convert(self):
+        sync = ContactSync(MagicMock())
+        sync.contacts.iter_contacts.return_value = iter([self._contact('a', 10), self._contact('b', 11)])
+        emails = Projection(Contact, ['email'])
+        events = list(sync.iter_changes(model=emails.model))
+        self.assertEqual([(event.kind, type(event.contact), event.contact.email) for event in events],
+                         [(INSERT, emails.model, 'a@test.com'), (INSERT, emails.model, 'b@test.com')])
+        sync.contacts.iter_contacts.return_value = iter([self._contact('c', 12)])
+        event, = sync.iter_changes('O', model=True)
+        self.assertIsInstance(event.contact, Contact)
+
+
+class TestContactIndex(TestCase):
+    CONTACTS = [{'contactId': 'a', 'email': 'John@test.com', 'campaign': {'campaignId': 'O'}},
+                {'contactId': 'b', 'email': 'john@test.com', 'campaign': {'campaignId': '3'}},
+                {'contactId': 'c', 'email': 'ann@test.com', 'campaign': {'campaignId': 'O'}}]
+
+    def _lookup(self, index):
+        contacts = MagicMock()
+        contacts.export_contacts.side_effect = lambda query, **kwargs: iter(
+            [contact for contact in self.CONTACTS if 'campaignId=' + contact['campaign']['campaignId'] in query])
+        contacts.get_contacts.return_value = [{'contactId': 'd', 'email': 'new@test.com',
+                                               'campaign': {'campaignId': 'O'}}]
+        lookup = ContactLookup(contacts, index)
+        self.assertEqual(sorted(lookup.get_contact_ids_for_campaign('O')), ['a', 'c'])
+        self.assertEqual(sorted(lookup.get_contact_ids_for_campaign('O')), ['a', 'c'])
+        self.assertEqual(contacts.export_contacts.call_count, 1)
+        self.assertEqual(contacts.export_contacts.call_args[1]['fields'], 'email,campaign')
+        self.assertEqual(lookup.get_contact_by_email('JOHN@test.com'),
+                         {'contactId': 'a', 'email': 'john@test.com', 'campaign': {'campaignId': 'O'}})
+        self.assertEqual(lookup.get_contact_by_email('new@test.com')['contactId'], 'd')
+        contacts.get_contacts.assert_called_once_with(query=['email=new@test.com'], additionalFlags='exactMatch',
+                                                      fields='email,campaign')
+        self.assertEqual(lookup.get_contact_by_email('new@test.com')['contactId'], 'd')
+        self.assertEqual(contacts.get_contacts.call_count, 1)
+        self.assertEqual((lookup.hits, lookup.misses), (3, 2))
+
+        lookup.index.add([{'contactId': 'c', 'email': 'ann@test.com', 'campaign': {'campaignId': '3'}}])
+        lookup.forget(['d'])
+        self.assertEqual(sorted(lookup.get_contact_ids_for_campaign('O')), ['a'])
+        self.assertEqual(len(lookup.index), 2)
+        contacts.get_contacts.return_value = []
+        calls = contacts.get_contacts.call_count
+        for _ in range(3):
+            self.assertIsNone(lookup.get_contact_by_email('john@test.com', campaign_id='3'))
+            self.assertIsNone(lookup.get_contact_by_email('nobody@test.com', campaign_id='O'))
+        self.assertEqual(contacts.get_contacts.call_count, calls + 1)
+        lookup.negative_ttl = 0
+        contacts.get_contacts.return_value = {'httpStatus': 429, 'message': 'Too many requests'}
+        with self.assertRaises(GetresponseError) as raised:
+            lookup.get_contact_by_email('other@test.com', campaign_id='3')
+        self.assertEqual(raised.exception.status_code, 429)
+        self.assertEqual(contacts.get_contacts.call_count, calls + 2)
+        contacts.get_contacts.return_value = []
+        self.assertIsNone(lookup.get_contact_by_email('other@test.com', campaign_id='3'))
+        self.assertIsNone(lookup.get_contact_by_email('other@test.com', campaign_id='3'))
+        self.assertEqual(contacts.get_contacts.call_count, calls + 4)
+
+        sync = MagicMock()
+        sync.iter_changes.return_value = iter([SyncEvent(INSERT, self.CONTACTS[1])])
+        self.assertEqual(lookup.refresh(sync), 1)
+        self.assertEqual(lookup.get_contact_by_email('john@test.com', campaign_id='3')['contactId'], 'b')
+        return lookup
+
+    def test_incomplete_storage_rejected(self):
+        for base in (ContactIndex, CacheBackend, CursorStore):
+            incomplete = type('Incomplete', (base,), {'load': lambda self, key: None})
+            with self.assertRaises(TypeError):
+                incomplete()
+
+    def test_memory(self):
+        self._lookup(MemoryContactIndex())
+
+    def test_sqlite(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'contacts.db')
+            self._lookup(SQLiteContactIndex(path))
+            index = SQLiteContactIndex(path)
+            self.assertTrue(index.is_loaded('O'))
+            self.assertEqual(len(index), 3)
+            index.clear()
+            self.assertFalse(index.is_loaded('O'))
+
+
+class TestUrls(TestCase):
+    def test_build_url(self):
+        self.assertEqual(build_url('/contacts', ['name=x', 'createdOn][from]=2017-03-10'], ['email=asc'],
+                                   {'page': 1, 'perPage': 2}),
+                         '/contacts?query[name]=x&query[createdOn][from]]=2017-03-10&sort[email]=asc&page=1&perPage=2')
+        self.assertEqual(build_url('/contacts', ['email=a+b@test.com', 'name=Tom & Jerry=1']),
+                         '/contacts?query[email]=a%2Bb@test.com&query[name]=Tom%20%26%20Jerry%3D1')
+        self.assertEqual(build_url('/from-fields/O', params={'fields': None}), '/from-fields/O')
+        self.assertEqual(build_url('/custom-fields', params={'sort[name]': 'asc', 'fields': ''}),
+                         '/custom-fields?sort[name]=asc')
+
+    def test_sections_use_builder(self):
+        self.assertEqual(Contacts._contacts_url(['email=a&b@test.com'], None, fields='email,name', page=2),
+                         '/contacts?query[email]=a%26b@test.com&fields=email,name&page=2')
+        self.assertEqual(Campaigns._statistics_url('list-size', ['groupBy=hour'], 'O,3', None),
+                         '/campaigns/statistics/list-size?query[campaignId]=O,3&query[groupBy]=hour')
+        self.assertEqual(FromFields._from_fields_url(['name=x'], sort='desc', perPage='5'),
+                         '/from-fields?query[name]=x&sort[createdOn]=desc&perPage=5')
+        campaigns = Campaigns(api_endpoint='https://api.getresponse.com/v3', api_key='key')
+        with patch.object(campaigns._getresponse_client, 'get') as mock_get:
+            campaigns.get_campaign_blacklist('O', 'a+b@gmail.com')
+        mock_get.assert_called_once_with('/campaigns/O/blacklists?query[mask]=a%2Bb@gmail.com')
+
+
 if __name__ == '__main__':
     nose.run()